@@ -21,6 +21,7 @@ from app.apps.alerts.models import Alert
 from app.apps.children.models import Child
 from app.apps.schemes.models import Scheme
 from app.apps.enrollments.models import Enrollment
+from app.core.counters import ActivityCounter
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,55 @@
+"""Add activity counters for dashboard counts
+
+Revision ID: 004_add_activity_counters
+Revises: 003_add_ai_chat_history
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '004_add_activity_counters'
+down_revision = '003_add_ai_chat_history'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Running counts per (counter, subject), all-time ('total') and per UTC day
+    op.create_table(
+        'activity_counters',
+        sa.Column('name', sa.String(50), nullable=False),
+        sa.Column('subject', sa.String(255), nullable=False),
+        sa.Column('bucket', sa.String(10), nullable=False),
+        sa.Column('count', sa.BigInteger(), nullable=False, server_default='0'),
+        
+        sa.PrimaryKeyConstraint('name', 'subject', 'bucket'),
+    )
+    
+    # Backfill from existing rows; the app keeps them current from here on
+    op.execute("""
+        INSERT INTO activity_counters (name, subject, bucket, count)
+        SELECT 'emergency_chats', user_id::text, to_char(timezone('UTC', created_at), 'YYYY-MM-DD'), count(*)
+        FROM ai_chat_history
+        WHERE is_emergency AND user_id IS NOT NULL AND created_at IS NOT NULL
+        GROUP BY 1, 2, 3
+        UNION ALL
+        SELECT 'emergency_chats', user_id::text, 'total', count(*)
+        FROM ai_chat_history
+        WHERE is_emergency AND user_id IS NOT NULL
+        GROUP BY 1, 2, 3
+        UNION ALL
+        SELECT 'beneficiary_alerts', beneficiary_id::text, to_char(timezone('UTC', created_at), 'YYYY-MM-DD'), count(*)
+        FROM alerts
+        WHERE created_at IS NOT NULL
+        GROUP BY 1, 2, 3
+        UNION ALL
+        SELECT 'beneficiary_alerts', beneficiary_id::text, 'total', count(*)
+        FROM alerts
+        GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade():
+    op.drop_table('activity_counters')
@@ -0,0 +1,42 @@
+"""Add full-text search vector to AI chat history
+
+Revision ID: 005_add_chat_search
+Revises: 004_add_activity_counters
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic
+revision = '005_add_chat_search'
+down_revision = '004_add_activity_counters'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Lexemes come from the app's tokenizer (app/apps/voice/search.py), so
+    # existing rows are left NULL here and indexed by the app's backfill job
+    op.add_column('ai_chat_history', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    
+    # Build the index without blocking chat log inserts on a large table
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_ai_chat_history_search_vector',
+            'ai_chat_history',
+            ['search_vector'],
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_ai_chat_history_search_vector',
+            table_name='ai_chat_history',
+            postgresql_concurrently=True,
+        )
+    op.drop_column('ai_chat_history', 'search_vector')
@@ -0,0 +1,52 @@
+"""Add indexes for keyset (cursor) pagination
+
+Revision ID: 006_add_keyset_indexes
+Revises: 005_add_chat_search
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '006_add_keyset_indexes'
+down_revision = '005_add_chat_search'
+branch_labels = None
+depends_on = None
+
+# (index, table, expressions) matching the ORDER BY built by
+# app.core.pagination for each list endpoint's sort keys
+KEYSET_INDEXES = [
+    ('ix_alerts_keyset', 'alerts',
+     ["COALESCE(created_at, CAST('-infinity' AS TIMESTAMP WITH TIME ZONE)) DESC", "id DESC"]),
+    ('ix_beneficiary_profiles_keyset', 'beneficiary_profiles',
+     ["COALESCE(created_at, CAST('-infinity' AS TIMESTAMP WITH TIME ZONE)) DESC", "id DESC"]),
+    ('ix_health_logs_keyset', 'health_logs',
+     ["COALESCE(date, CAST('-infinity' AS TIMESTAMP WITH TIME ZONE)) DESC", "id DESC"]),
+    ('ix_scheme_beneficiaries_keyset', 'scheme_beneficiaries',
+     ["COALESCE(enrollment_date, CAST('-infinity' AS TIMESTAMP WITH TIME ZONE)) DESC", "id DESC"]),
+    ('ix_daily_logs_keyset', 'daily_logs',
+     ["COALESCE(date, CAST('-infinity' AS DATE)) DESC", "id DESC"]),
+    ('ix_ai_chat_history_keyset', 'ai_chat_history',
+     ["COALESCE(created_at, CAST('-infinity' AS TIMESTAMP WITH TIME ZONE)) DESC", "id DESC"]),
+    ('ix_visits_keyset', 'visits',
+     ["COALESCE(scheduled_date, CAST('-infinity' AS DATE))", "priority DESC NULLS LAST", "id"]),
+]
+
+
+def upgrade():
+    # Built without blocking writes to the (large) listed tables
+    with op.get_context().autocommit_block():
+        for name, table, expressions in KEYSET_INDEXES:
+            op.create_index(
+                name,
+                table,
+                [sa.text(expression) for expression in expressions],
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in KEYSET_INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,30 @@
+"""Record when each activity counter was last reconciled
+
+Revision ID: 007_add_counter_reconciliations
+Revises: 006_add_keyset_indexes
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '007_add_counter_reconciliations'
+down_revision = '006_add_keyset_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # One row per counter; workers claim a reconcile run by moving reconciled_at
+    op.create_table(
+        'counter_reconciliations',
+        sa.Column('name', sa.String(50), nullable=False),
+        sa.Column('reconciled_at', sa.DateTime(timezone=True), nullable=False),
+        
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+
+def downgrade():
+    op.drop_table('counter_reconciliations')
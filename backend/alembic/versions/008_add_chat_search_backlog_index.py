@@ -0,0 +1,37 @@
+"""Index the chat rows that still need a search vector
+
+Revision ID: 008_add_chat_search_backlog_index
+Revises: 007_add_counter_reconciliations
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '008_add_chat_search_backlog_index'
+down_revision = '007_add_counter_reconciliations'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The search backfill walks this in id order; once every row has a
+    # vector the index is empty and the startup check costs nothing
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_ai_chat_history_unindexed',
+            'ai_chat_history',
+            ['id'],
+            postgresql_where=sa.text('search_vector IS NULL'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_ai_chat_history_unindexed',
+            table_name='ai_chat_history',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,61 @@
+"""
+Multi-pattern keyword matching for chat messages.
+
+Emergency and intent detection look for dozens of Hindi (Devanagari and
+romanized) and English keywords in every message. The matcher is built once
+at import: keywords are grouped by label, and a keyword that contains
+another keyword of the same label is dropped since it can never decide the
+result. Matching is on Unicode code points, so Devanagari needs no special
+case.
+
+Each keyword is still tested with `in`. CPython's substring search runs in
+C; a pure-Python Aho-Corasick automaton or a `re` alternation of all
+keywords measured 1.5-3x slower on chat-length messages
+(see benchmarks/keywords.py). What the matcher saves is work around the
+`in` tests: keywords are lowercased and deduplicated once, and `first()`
+stops at the first matching label like the original checks did.
+"""
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class KeywordMatcher:
+    """
+    Matcher over (keyword, label) pairs.
+
+    `labels(text)` returns the label of every keyword occurring anywhere in
+    `text` as a substring - the same result as testing `keyword in text`
+    for each keyword. `first(text)` returns only the first such label in
+    the order labels were first given, without testing the labels after it.
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, str]]):
+        keywords: Dict[str, List[str]] = {}
+        for keyword, label in patterns:
+            if keyword and keyword not in keywords.setdefault(label, []):
+                keywords[label].append(keyword)
+
+        self._groups: List[Tuple[str, Tuple[str, ...]]] = [
+            (label, tuple(
+                word for word in words
+                if not any(other != word and other in word for other in words)
+            ))
+            for label, words in keywords.items()
+        ]
+
+    def labels(self, text: str) -> Set[str]:
+        """Labels of all keywords found in text"""
+        found: Set[str] = set()
+        for label, words in self._groups:
+            for word in words:
+                if word in text:
+                    found.add(label)
+                    break
+        return found
+
+    def first(self, text: str) -> Optional[str]:
+        """First label (in pattern order) with a keyword in text, or None"""
+        for label, words in self._groups:
+            for word in words:
+                if word in text:
+                    return label
+        return None
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
-from app.core.security import get_current_user
+from app.core.security import get_current_user, require_roles
 from app.apps.users.models import User
 from app.apps.ai.schemas import (
     PromptRequest,
@@ -133,6 +133,22 @@ async def extract_visit_data(
         }
 
 
+@router.get("/cache")
+async def get_cache_stats(
+    current_user: User = Depends(require_roles('admin'))
+):
+    """Response cache size and hit rate (admin only)"""
+    return gemini_service.response_cache.stats()
+
+
+@router.delete("/cache")
+async def purge_cache(
+    current_user: User = Depends(require_roles('admin'))
+):
+    """Purge cached AI responses, e.g. after changing prompts (admin only)"""
+    return {"purged": gemini_service.purge_cache()}
+
+
 @router.get("/health")
 async def health_check():
     """Check if AI service is healthy"""
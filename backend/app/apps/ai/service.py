@@ -1,8 +1,14 @@
+import asyncio
+import copy
 import httpx
 import json
 import re
-from typing import Optional, List, Dict, Any
+import unicodedata
+from typing import Optional, List, Dict, Any, AsyncIterator, Hashable, NamedTuple, Tuple
+from app.core import metrics
+from app.core.cache import TTLCache
 from app.core.config import get_settings
+from app.apps.ai.keywords import KeywordMatcher
 from app.apps.ai.schemas import (
     PromptRequest,
     AIResponse,
@@ -12,6 +18,11 @@ from app.apps.ai.schemas import (
 
 settings = get_settings()
 
+coalesced_requests = metrics.counter(
+    "ai_coalesced_requests_total",
+    "Calls answered by an identical upstream request already in flight"
+)
+
 # Emergency keywords in Hindi and English
 EMERGENCY_KEYWORDS = [
     # Hindi
@@ -27,30 +38,121 @@ EMERGENCY_KEYWORDS = [
 ]
 
 
+# Intent keywords, in priority order - the first matching intent wins
+INTENT_KEYWORDS = [
+    ('menstrual_query', ['period', 'mahina', 'माहवारी', 'mc', 'पीरियड']),
+    ('pregnancy_query', ['pregnant', 'garbh', 'गर्भ', 'baby', 'बच्चा', 'पेट में']),
+    ('nutrition_query', ['food', 'khana', 'खाना', 'diet', 'iron', 'आयरन', 'खाने']),
+    ('mental_health_query', ['sad', 'udas', 'उदास', 'tension', 'stress', 'थकान', 'नींद']),
+    ('scheme_query', ['scheme', 'yojana', 'योजना', 'benefit', 'सरकार']),
+    ('ifa_query', ['ifa', 'tablet', 'goli', 'गोली', 'दवाई']),
+]
+
+_EMERGENCY_LABEL = 'emergency'
+
+# Built once at import. Emergency and intent keywords get separate matchers
+# so the common checks can stop at the first hit; scan_message uses both.
+_emergency_matcher = KeywordMatcher(
+    [(keyword.lower(), _EMERGENCY_LABEL) for keyword in EMERGENCY_KEYWORDS]
+)
+_intent_matcher = KeywordMatcher(
+    [(word.lower(), intent) for intent, words in INTENT_KEYWORDS for word in words]
+)
+
+
+class KeywordScan(NamedTuple):
+    """Result of scanning a message for emergency and intent keywords"""
+    is_emergency: bool
+    intents: Tuple[str, ...]  # matched intents in priority order
+
+
+def scan_message(message: str) -> KeywordScan:
+    """Detect emergency status and every matched intent (not just the first)"""
+    lower_message = message.lower()
+    labels = _intent_matcher.labels(lower_message)
+    return KeywordScan(
+        is_emergency=_emergency_matcher.first(lower_message) is not None,
+        intents=tuple(intent for intent, _ in INTENT_KEYWORDS if intent in labels)
+    )
+
+
+def _is_emergency(lower_message: str) -> bool:
+    return _emergency_matcher.first(lower_message) is not None
+
+
+def _first_intent(lower_message: str) -> str:
+    return _intent_matcher.first(lower_message) or 'general_query'
+
+
 def detect_emergency(message: str) -> bool:
     """Check if message contains emergency keywords"""
-    lower_message = message.lower()
-    return any(keyword.lower() in lower_message for keyword in EMERGENCY_KEYWORDS)
+    return _is_emergency(message.lower())
 
 
 def detect_intent(message: str) -> str:
     """Detect intent from message"""
-    lower_message = message.lower()
+    return _first_intent(message.lower())
+
+
+def _emergency_message(language: str) -> str:
+    return (
+        'यह गंभीर लग रहा है। कृपया तुरंत Red Zone बटन दबाएं या अपनी ASHA दीदी को बुलाएं। क्या आप ठीक हैं?'
+        if language == 'hi' else
+        'This sounds serious. Please press the Red Zone button immediately or call your ASHA worker. Are you okay?'
+    )
+
+
+def _fallback_message(language: str) -> str:
+    return (
+        'माफ़ करें, अभी कुछ तकनीकी समस्या है। कृपया थोड़ी देर बाद कोशिश करें।'
+        if language == 'hi' else
+        'Sorry, there is a technical issue. Please try again later.'
+    )
+
+
+# Speaker prefixes the model sometimes echoes at the start of a reply
+CHAT_PREFIXES = ('आशा दीदी:', 'Asha Didi:')
+CHAT_PREFIX_PATTERN = re.compile(r'^(आशा दीदी:|Asha Didi:)\s*')
+
+
+class ChatPrefixStripper:
+    """
+    Removes a leading speaker prefix from a reply that arrives in chunks.
+    
+    Text is held back only while it could still turn out to be a prefix,
+    so everything after the first few characters streams through as-is.
+    """
+    
+    def __init__(self):
+        self._buffer = ''
+        self._done = False
+    
+    def feed(self, text: str) -> str:
+        """Return the part of text that can be sent on now"""
+        if self._done:
+            return text
+        self._buffer += text
+        candidate = self._buffer.lstrip()
+        for prefix in CHAT_PREFIXES:
+            if candidate.startswith(prefix):
+                rest = candidate[len(prefix):].lstrip()
+                if not rest:
+                    return ''
+                return self._release(rest)
+            if prefix.startswith(candidate):
+                return ''
+        return self._release(candidate)
     
-    if any(word in lower_message for word in ['period', 'mahina', 'माहवारी', 'mc', 'पीरियड']):
-        return 'menstrual_query'
-    if any(word in lower_message for word in ['pregnant', 'garbh', 'गर्भ', 'baby', 'बच्चा', 'पेट में']):
-        return 'pregnancy_query'
-    if any(word in lower_message for word in ['food', 'khana', 'खाना', 'diet', 'iron', 'आयरन', 'खाने']):
-        return 'nutrition_query'
-    if any(word in lower_message for word in ['sad', 'udas', 'उदास', 'tension', 'stress', 'थकान', 'नींद']):
-        return 'mental_health_query'
-    if any(word in lower_message for word in ['scheme', 'yojana', 'योजना', 'benefit', 'सरकार']):
-        return 'scheme_query'
-    if any(word in lower_message for word in ['ifa', 'tablet', 'goli', 'गोली', 'दवाई']):
-        return 'ifa_query'
+    def flush(self) -> str:
+        """Return anything still held back once the reply has ended"""
+        if self._done:
+            return ''
+        return self._release(CHAT_PREFIX_PATTERN.sub('', self._buffer.strip()))
     
-    return 'general_query'
+    def _release(self, text: str) -> str:
+        self._done = True
+        self._buffer = ''
+        return text
 
 
 def detect_category(intent: str) -> str:
@@ -67,26 +169,255 @@ def detect_category(intent: str) -> str:
     return category_map.get(intent, 'general')
 
 
+def normalize_query(text: str) -> str:
+    """
+    Normalize free text for cache keys so trivially different phrasings of
+    the same question ("What to eat in 7th month?" / "what to eat in 7th
+    month") share one entry.
+    """
+    text = unicodedata.normalize("NFC", text).casefold()
+    text = " ".join(text.split())
+    return text.strip(" ?.!,;:।")
+
+
+def _cached_size(value: Any) -> int:
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+_SEVERITY_ORDER = {"mild": 1, "moderate": 2, "severe": 3}
+
+
+def merge_visit_data(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge extract_visit_data results for consecutive pieces of one
+    dictation into a single result of the same shape.
+
+    The first value wins for names and dates, and emergency wins over
+    other visit types. The latest reading wins for each vital. Lists are
+    unioned, free-text notes joined, flags OR-ed, and the highest
+    severity kept.
+    """
+    parts = [part for part in parts if part]
+    if not parts:
+        return {}
+
+    def first(field: str) -> Any:
+        return next((p.get(field) for p in parts if p.get(field)), None)
+
+    def joined(field: str) -> Optional[str]:
+        texts = [p[field].strip() for p in parts if isinstance(p.get(field), str) and p[field].strip()]
+        return " ".join(texts) or None
+
+    def union(field: str) -> List[Any]:
+        seen = set()
+        items = []
+        for part in parts:
+            for item in part.get(field) or []:
+                key = item.casefold() if isinstance(item, str) else json.dumps(item, sort_keys=True, default=str)
+                if key not in seen:
+                    seen.add(key)
+                    items.append(item)
+        return items
+
+    visit_types = [p.get("visit_type") for p in parts if p.get("visit_type")]
+    severities = [p.get("symptom_severity") for p in parts if p.get("symptom_severity") in _SEVERITY_ORDER]
+
+    vitals: Dict[str, Any] = {"blood_pressure": None, "weight_kg": None, "temperature_celsius": None}
+    for part in parts:
+        part_vitals = part.get("vitals")
+        for key, value in (part_vitals.items() if isinstance(part_vitals, dict) else ()):
+            if value is not None:
+                vitals[key] = value
+
+    return {
+        "patient_name": first("patient_name"),
+        "visit_type": "emergency" if "emergency" in visit_types else (visit_types[0] if visit_types else None),
+        "vitals": vitals,
+        "symptoms": union("symptoms"),
+        "symptom_severity": max(severities, key=_SEVERITY_ORDER.get) if severities else None,
+        "services_provided": union("services_provided"),
+        "medicines_distributed": union("medicines_distributed"),
+        "counseling_topics": union("counseling_topics"),
+        "observations": joined("observations"),
+        "concerns_noted": joined("concerns_noted"),
+        "follow_up_required": any(p.get("follow_up_required") for p in parts),
+        "next_visit_date": first("next_visit_date"),
+        "referral_needed": any(p.get("referral_needed") for p in parts),
+        "referral_reason": joined("referral_reason"),
+    }
+
+
 class GeminiService:
     """Service for interacting with hosted Gemini API"""
     
     def __init__(self):
         self.api_url = settings.GEMINI_API_URL
+        self._client: Optional[httpx.AsyncClient] = None
+        self._in_flight = 0
+        # Upstream calls in progress keyed by prompt, shared by identical callers
+        self._pending_prompts: Dict[str, "asyncio.Task[AIResponse]"] = {}
+        # Answers for endpoints whose output depends only on their inputs
+        self.response_cache = TTLCache(
+            maxsize=settings.AI_CACHE_MAX_ENTRIES,
+            ttl=settings.AI_CACHE_TTL_SECONDS,
+            max_bytes=settings.AI_CACHE_MAX_BYTES,
+            sizeof=_cached_size
+        )
+    
+    @staticmethod
+    def _cache_key(endpoint: str, language: Optional[str], *inputs: Any) -> Tuple[Hashable, ...]:
+        return (endpoint, normalize_query(language or ""), *(
+            normalize_query(value) if isinstance(value, str) else value
+            for value in inputs
+        ))
+    
+    def purge_cache(self) -> int:
+        """Drop every cached response, returning how many were removed"""
+        return self.response_cache.clear()
+    
+    def _create_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=settings.GEMINI_HTTP2,
+            limits=httpx.Limits(
+                max_connections=settings.GEMINI_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.GEMINI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.GEMINI_KEEPALIVE_EXPIRY_SECONDS
+            ),
+            timeout=httpx.Timeout(
+                connect=settings.GEMINI_CONNECT_TIMEOUT_SECONDS,
+                read=settings.GEMINI_READ_TIMEOUT_SECONDS,
+                write=settings.GEMINI_WRITE_TIMEOUT_SECONDS,
+                pool=settings.GEMINI_POOL_TIMEOUT_SECONDS
+            )
+        )
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Pooled client reused for every upstream call"""
+        if self._client is None:
+            # Normally created at startup; lazily covers scripts and tests
+            self._client = self._create_client()
+        return self._client
+    
+    async def startup(self):
+        """Open the pooled HTTP client (called from the app lifespan)"""
+        if self._client is None:
+            self._client = self._create_client()
+    
+    async def aclose(self):
+        """Close the pooled HTTP client and its keep-alive connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        """Connection pool utilisation for the metrics endpoint"""
+        stats = {
+            "open": self._client is not None,
+            "max_connections": settings.GEMINI_MAX_CONNECTIONS,
+            "in_flight_requests": self._in_flight,
+            "distinct_pending_prompts": len(self._pending_prompts),
+            "utilisation": round(self._in_flight / settings.GEMINI_MAX_CONNECTIONS, 4),
+        }
+        # httpx doesn't expose its pool; read httpcore's when available
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is not None:
+            stats["connections"] = len(connections)
+            stats["idle_connections"] = sum(1 for c in connections if c.is_idle())
+        return stats
     
     async def generate(self, prompt: str) -> AIResponse:
-        """Call the Gemini API to generate a response"""
+        """
+        Call the Gemini API to generate a response.
+        
+        Concurrent calls with the same prompt (e.g. a health camp asking the
+        same question) share a single upstream request and its result.
+        """
+        task = self._pending_prompts.get(prompt)
+        if task is not None:
+            coalesced_requests.inc()
+        else:
+            task = asyncio.ensure_future(self._generate(prompt))
+            self._pending_prompts[prompt] = task
+            task.add_done_callback(lambda done: self._forget_prompt(prompt, done))
+        # Shielded so one caller disconnecting doesn't cancel the others
+        return await asyncio.shield(task)
+    
+    def _forget_prompt(self, prompt: str, task: "asyncio.Task[AIResponse]"):
+        if self._pending_prompts.get(prompt) is task:
+            del self._pending_prompts[prompt]
+    
+    async def stream_generate(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Stream response text from the Gemini API as it arrives.
+        
+        Asks the upstream to stream and accepts Server-Sent Events
+        (`data:` lines holding text or {"text"/"response": ...} JSON) or
+        chunked plain text. An upstream that only returns a JSON body is
+        yielded as a single chunk. Raises on HTTP errors.
+        """
+        self._in_flight += 1
+        try:
+            async with self.client.stream(
+                "POST",
+                self.api_url,
+                json={"text": prompt, "stream": True}
+            ) as response:
+                response.raise_for_status()
+                content_type = response.headers.get("content-type", "")
+                
+                if content_type.startswith("text/event-stream"):
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:]
+                        if data.startswith(" "):
+                            data = data[1:]
+                        if data.strip() == "[DONE]":
+                            break
+                        text = self._stream_chunk_text(data)
+                        if text:
+                            yield text
+                elif content_type.startswith("text/plain"):
+                    async for text in response.aiter_text():
+                        if text:
+                            yield text
+                else:
+                    data = json.loads(await response.aread())
+                    yield data.get("response", data.get("text", str(data)))
+        finally:
+            self._in_flight -= 1
+    
+    @staticmethod
+    def _stream_chunk_text(data: str) -> str:
+        try:
+            payload = json.loads(data)
+        except ValueError:
+            return data
+        if isinstance(payload, dict):
+            return payload.get("text") or payload.get("response") or ""
+        if isinstance(payload, str):
+            return payload
+        return data
+    
+    async def _generate(self, prompt: str) -> AIResponse:
+        """Single upstream call to the Gemini API"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
+            self._in_flight += 1
+            try:
+                response = await self.client.post(
                     self.api_url,
                     json={"text": prompt}
                 )
-                response.raise_for_status()
-                data = response.json()
-                return AIResponse(
-                    response=data.get("response", data.get("text", str(data))),
-                    success=True
-                )
+            finally:
+                self._in_flight -= 1
+            response.raise_for_status()
+            data = response.json()
+            return AIResponse(
+                response=data.get("response", data.get("text", str(data))),
+                success=True
+            )
         except httpx.HTTPError as e:
             return AIResponse(
                 response="",
@@ -100,35 +431,13 @@ class GeminiService:
                 error=f"Unexpected error: {str(e)}"
             )
     
-    async def chat_with_asha_didi(
-        self, 
-        user_message: str, 
-        conversation_history: List[Dict[str, str]] = None,
-        language: str = 'hi'
-    ) -> Dict[str, Any]:
-        """
-        Chat with ASHA Didi AI assistant.
-        Returns structured response with message, emergency status, intent, and category.
-        """
-        is_emergency = detect_emergency(user_message)
-        intent = detect_intent(user_message)
-        category = detect_category(intent)
-        
-        # If emergency detected, return immediate response
-        if is_emergency:
-            emergency_response = (
-                'यह गंभीर लग रहा है। कृपया तुरंत Red Zone बटन दबाएं या अपनी ASHA दीदी को बुलाएं। क्या आप ठीक हैं?'
-                if language == 'hi' else
-                'This sounds serious. Please press the Red Zone button immediately or call your ASHA worker. Are you okay?'
-            )
-            
-            return {
-                'message': emergency_response,
-                'isEmergency': True,
-                'intent': 'emergency',
-                'category': 'emergency'
-            }
-        
+    def _build_chat_prompt(
+        self,
+        user_message: str,
+        conversation_history: Optional[List[Dict[str, str]]],
+        language: str
+    ) -> str:
+        """Build the ASHA Didi prompt with persona, recent history and the new message"""
         # Build system prompt based on language
         if language == 'hi':
             system_prompt = """आप "आशा दीदी" हैं, ग्रामीण भारतीय महिलाओं के लिए एक विश्वसनीय मातृ स्वास्थ्य साथी। आप एक देखभाल करने वाली बड़ी बहन की तरह हैं।
@@ -186,13 +495,41 @@ CULTURAL CONTEXT: You understand rural Indian healthcare. Use familiar terms lik
         else:
             full_prompt += f"\nUser: {user_message}\n\nAsha Didi:"
         
+        return full_prompt
+    
+    async def chat_with_asha_didi(
+        self, 
+        user_message: str, 
+        conversation_history: List[Dict[str, str]] = None,
+        language: str = 'hi'
+    ) -> Dict[str, Any]:
+        """
+        Chat with ASHA Didi AI assistant.
+        Returns structured response with message, emergency status, intent, and category.
+        """
+        lower_message = user_message.lower()
+        
+        # If emergency detected, return immediate response
+        if _is_emergency(lower_message):
+            return {
+                'message': _emergency_message(language),
+                'isEmergency': True,
+                'intent': 'emergency',
+                'category': 'emergency'
+            }
+        
+        intent = _first_intent(lower_message)
+        category = detect_category(intent)
+        
+        full_prompt = self._build_chat_prompt(user_message, conversation_history, language)
+        
         try:
             response = await self.generate(full_prompt)
             
             if response.success and response.response:
                 ai_message = response.response.strip()
                 # Clean up any prefixes the model might add
-                ai_message = re.sub(r'^(आशा दीदी:|Asha Didi:)\s*', '', ai_message)
+                ai_message = CHAT_PREFIX_PATTERN.sub('', ai_message)
                 
                 return {
                     'message': ai_message,
@@ -201,13 +538,8 @@ CULTURAL CONTEXT: You understand rural Indian healthcare. Use familiar terms lik
                     'category': category
                 }
             else:
-                fallback = (
-                    'माफ़ करें, अभी कुछ तकनीकी समस्या है। कृपया थोड़ी देर बाद कोशिश करें।'
-                    if language == 'hi' else
-                    'Sorry, there is a technical issue. Please try again later.'
-                )
                 return {
-                    'message': fallback,
+                    'message': _fallback_message(language),
                     'isEmergency': False,
                     'intent': None,
                     'category': None
@@ -215,18 +547,65 @@ CULTURAL CONTEXT: You understand rural Indian healthcare. Use familiar terms lik
                 
         except Exception as e:
             print(f"Chat error: {e}")
-            fallback = (
-                'माफ़ करें, अभी कुछ तकनीकी समस्या है। कृपया थोड़ी देर बाद कोशिश करें।'
-                if language == 'hi' else
-                'Sorry, there is a technical issue. Please try again later.'
-            )
             return {
-                'message': fallback,
+                'message': _fallback_message(language),
                 'isEmergency': False,
                 'intent': None,
                 'category': None
             }
     
+    async def stream_chat_with_asha_didi(
+        self,
+        user_message: str,
+        conversation_history: List[Dict[str, str]] = None,
+        language: str = 'hi'
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Streaming variant of chat_with_asha_didi.
+        
+        Yields (event, data) pairs: one `meta` event with emergency status,
+        intent and category, `token` events as reply text arrives, then a
+        `done` event with the full message. Emergencies are answered before
+        any upstream call; upstream failures end with an `error` event
+        carrying the fallback message.
+        """
+        lower_message = user_message.lower()
+        
+        if _is_emergency(lower_message):
+            message = _emergency_message(language)
+            yield 'meta', {'isEmergency': True, 'intent': 'emergency', 'category': 'emergency'}
+            yield 'token', {'text': message}
+            yield 'done', {'message': message}
+            return
+        
+        intent = _first_intent(lower_message)
+        yield 'meta', {'isEmergency': False, 'intent': intent, 'category': detect_category(intent)}
+        
+        full_prompt = self._build_chat_prompt(user_message, conversation_history, language)
+        stripper = ChatPrefixStripper()
+        parts: List[str] = []
+        
+        try:
+            async for chunk in self.stream_generate(full_prompt):
+                text = stripper.feed(chunk)
+                if text:
+                    parts.append(text)
+                    yield 'token', {'text': text}
+            text = stripper.flush()
+            if text:
+                parts.append(text)
+                yield 'token', {'text': text}
+        except Exception as e:
+            print(f"Chat stream error: {e}")
+            yield 'error', {'message': _fallback_message(language)}
+            return
+        
+        message = ''.join(parts).strip()
+        if not message:
+            yield 'error', {'message': _fallback_message(language)}
+            return
+        yield 'done', {'message': message}
+    
     async def extract_medical_data(self, transcript: str) -> MedicalDataExtraction:
         """Extract structured medical data from voice transcript using AI"""
         prompt = f"""
@@ -298,6 +677,10 @@ CULTURAL CONTEXT: You understand rural Indian healthcare. Use familiar terms lik
     
     async def get_health_guidance(self, query: str, language: str = "hi") -> str:
         """Get health guidance for a query in the specified language"""
+        cache_key = self._cache_key("health_guidance", language, query)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            return cached
         
         if language == "hi":
             prompt = f"""आप ASHA AI हैं - ग्रामीण भारतीय महिलाओं की स्वास्थ्य सहेली।
@@ -331,6 +714,7 @@ Please respond in English:"""
         response = await self.generate(prompt)
         
         if response.success and response.response:
+            self.response_cache.set(cache_key, response.response)
             return response.response
         
         # Fallback messages
@@ -494,6 +878,13 @@ Return a JSON object with:
         pregnancy_week: Optional[int] = None
     ) -> dict:
         """Generate a personalized nutrition plan"""
+        cache_key = self._cache_key(
+            "nutrition_plan", None, user_type, age, anemia_status, pregnancy_week
+        )
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+        
         context = f"User type: {user_type}"
         if age:
             context += f", Age: {age}"
@@ -523,7 +914,9 @@ Return a JSON object with:
         
         if response.success:
             try:
-                return json.loads(response.response)
+                plan = json.loads(response.response)
+                self.response_cache.set(cache_key, copy.deepcopy(plan))
+                return plan
             except:
                 pass
         
@@ -545,3 +938,5 @@ Return a JSON object with:
 
 # Singleton instance
 gemini_service = GeminiService()
+metrics.register_collector("gemini_http_pool", gemini_service.pool_stats)
+metrics.register_collector("ai_response_cache", gemini_service.response_cache.stats)
@@ -1,10 +1,13 @@
+import uuid
 from typing import List, Optional
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from datetime import date, datetime
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from app.core import counters
 from app.core.database import get_db
+from app.core.pagination import paginate, set_next_cursor
 from app.core.security import get_current_user, require_roles
 from app.apps.users.models import User
 from app.apps.beneficiaries.models import BeneficiaryProfile
@@ -18,13 +21,29 @@ from app.apps.alerts.schemas import (
 
 router = APIRouter(prefix="/alerts", tags=["Alerts"])
 
+# Newest alerts first; the primary key makes the order total for cursors
+ALERT_SORT_KEYS = (
+    (Alert.created_at, True),
+    (Alert.id, True),
+)
+
+# Alerts raised per beneficiary, maintained on create
+BENEFICIARY_ALERTS = "beneficiary_alerts"
+counters.register_source(BENEFICIARY_ALERTS, counters.CounterSource(
+    model=Alert,
+    subject=Alert.beneficiary_id,
+    timestamp=Alert.created_at
+))
+
 
 @router.get("/", response_model=List[AlertRead])
 async def list_alerts(
+    response: Response,
     status_filter: Optional[str] = Query(None, alias="status"),
     severity: Optional[str] = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -46,9 +65,11 @@ async def list_alerts(
     if severity:
         query = query.where(Alert.severity == severity)
     
-    query = query.order_by(Alert.created_at.desc()).offset(skip).limit(limit)
+    query = paginate(query, ALERT_SORT_KEYS, cursor, skip, limit)
     result = await db.execute(query)
-    return result.scalars().all()
+    alerts = result.scalars().all()
+    set_next_cursor(response, alerts, ALERT_SORT_KEYS, limit)
+    return alerts
 
 
 @router.get("/active", response_model=List[AlertWithDetails])
@@ -109,7 +130,9 @@ async def create_alert(
         **alert_data.model_dump()
     )
     
+    new_alert.created_at = datetime.utcnow()
     db.add(new_alert)
+    await counters.increment(db, BENEFICIARY_ALERTS, [(beneficiary.id, new_alert.created_at)])
     await db.commit()
     await db.refresh(new_alert)
     
@@ -151,13 +174,45 @@ async def trigger_sos(
         triggered_by=current_user.id
     )
     
+    new_alert.created_at = datetime.utcnow()
     db.add(new_alert)
+    await counters.increment(db, BENEFICIARY_ALERTS, [(beneficiary.id, new_alert.created_at)])
     await db.commit()
     await db.refresh(new_alert)
     
     return new_alert
 
 
+@router.get("/beneficiary/{beneficiary_id}/count")
+async def get_beneficiary_alert_count(
+    beneficiary_id: str,
+    day: Optional[date] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Number of alerts raised for a beneficiary, all-time or for one UTC day"""
+    try:
+        beneficiary_uuid = uuid.UUID(beneficiary_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Beneficiary not found"
+        )
+    
+    if current_user.role == 'beneficiary':
+        result = await db.execute(
+            select(BeneficiaryProfile.user_id).where(BeneficiaryProfile.id == beneficiary_id)
+        )
+        if result.scalar_one_or_none() != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access denied"
+            )
+    
+    count = await counters.read(db, BENEFICIARY_ALERTS, beneficiary_uuid, day)
+    return {"beneficiary_id": str(beneficiary_uuid), "alert_count": count}
+
+
 @router.get("/{alert_id}", response_model=AlertWithDetails)
 async def get_alert(
     alert_id: str,
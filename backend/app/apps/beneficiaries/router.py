@@ -1,9 +1,10 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, or_
 
 from app.core.database import get_db
+from app.core.pagination import paginate, set_next_cursor
 from app.core.security import get_current_user, require_roles
 from app.apps.users.models import User
 from app.apps.beneficiaries.models import BeneficiaryProfile
@@ -16,11 +17,19 @@ from app.apps.beneficiaries.schemas import (
 
 router = APIRouter(prefix="/beneficiaries", tags=["Beneficiaries"])
 
+# Newest profiles first; the primary key makes the order total for cursors
+BENEFICIARY_SORT_KEYS = (
+    (BeneficiaryProfile.created_at, True),
+    (BeneficiaryProfile.id, True),
+)
+
 
 @router.get("/", response_model=List[BeneficiaryRead])
 async def list_beneficiaries(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
     risk_level: Optional[str] = None,
     user_type: Optional[str] = None,
     search: Optional[str] = None,
@@ -54,9 +63,11 @@ async def list_beneficiaries(
     if search:
         query = query.where(BeneficiaryProfile.name.ilike(f"%{search}%"))
     
-    query = query.offset(skip).limit(limit)
+    query = paginate(query, BENEFICIARY_SORT_KEYS, cursor, skip, limit)
     result = await db.execute(query)
-    return result.scalars().all()
+    profiles = result.scalars().all()
+    set_next_cursor(response, profiles, BENEFICIARY_SORT_KEYS, limit)
+    return profiles
 
 
 @router.get("/my-profile", response_model=BeneficiaryRead)
@@ -1,10 +1,11 @@
 from typing import List, Optional
 from datetime import date
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
 
 from app.core.database import get_db
+from app.core.pagination import paginate, set_next_cursor
 from app.core.security import get_current_user
 from app.apps.users.models import User
 from app.apps.daily_logs.models import DailyLog
@@ -16,13 +17,21 @@ from app.apps.daily_logs.schemas import (
 
 router = APIRouter(prefix="/daily-logs", tags=["Daily Logs"])
 
+# Latest days first; the primary key makes the order total for cursors
+DAILY_LOG_SORT_KEYS = (
+    (DailyLog.date, True),
+    (DailyLog.id, True),
+)
+
 
 @router.get("/", response_model=List[DailyLogRead])
 async def list_daily_logs(
+    response: Response,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -34,9 +43,11 @@ async def list_daily_logs(
     if end_date:
         query = query.where(DailyLog.date <= end_date)
     
-    query = query.order_by(DailyLog.date.desc()).offset(skip).limit(limit)
+    query = paginate(query, DAILY_LOG_SORT_KEYS, cursor, skip, limit)
     result = await db.execute(query)
-    return result.scalars().all()
+    logs = result.scalars().all()
+    set_next_cursor(response, logs, DAILY_LOG_SORT_KEYS, limit)
+    return logs
 
 
 @router.get("/today", response_model=Optional[DailyLogRead])
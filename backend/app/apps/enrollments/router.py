@@ -1,9 +1,10 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
 
 from app.core.database import get_db
+from app.core.pagination import paginate, set_next_cursor
 from app.core.security import get_current_user, require_roles
 from app.apps.users.models import User
 from app.apps.beneficiaries.models import BeneficiaryProfile
@@ -18,14 +19,22 @@ from app.apps.enrollments.schemas import (
 
 router = APIRouter(prefix="/enrollments", tags=["Enrollments"])
 
+# Latest enrollments first; the primary key makes the order total for cursors
+ENROLLMENT_SORT_KEYS = (
+    (Enrollment.enrollment_date, True),
+    (Enrollment.id, True),
+)
+
 
 @router.get("/", response_model=List[EnrollmentRead])
 async def list_enrollments(
+    response: Response,
     scheme_id: Optional[str] = None,
     beneficiary_id: Optional[str] = None,
     status_filter: Optional[str] = Query(None, alias="status"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -48,9 +57,11 @@ async def list_enrollments(
     if status_filter:
         query = query.where(Enrollment.status == status_filter)
     
-    query = query.order_by(Enrollment.enrollment_date.desc()).offset(skip).limit(limit)
+    query = paginate(query, ENROLLMENT_SORT_KEYS, cursor, skip, limit)
     result = await db.execute(query)
-    return result.scalars().all()
+    enrollments = result.scalars().all()
+    set_next_cursor(response, enrollments, ENROLLMENT_SORT_KEYS, limit)
+    return enrollments
 
 
 @router.get("/my-enrollments", response_model=List[EnrollmentWithDetails])
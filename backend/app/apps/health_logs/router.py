@@ -1,10 +1,11 @@
 from typing import List, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, or_
 
 from app.core.database import get_db
+from app.core.pagination import paginate, set_next_cursor
 from app.core.security import get_current_user, require_roles
 from app.apps.users.models import User
 from app.apps.beneficiaries.models import BeneficiaryProfile
@@ -18,13 +19,21 @@ from app.apps.health_logs.schemas import (
 
 router = APIRouter(prefix="/health-logs", tags=["Health Logs"])
 
+# Latest logs first; the primary key makes the order total for cursors
+HEALTH_LOG_SORT_KEYS = (
+    (HealthLog.date, True),
+    (HealthLog.id, True),
+)
+
 
 @router.get("/", response_model=List[HealthLogRead])
 async def list_health_logs(
+    response: Response,
     beneficiary_id: Optional[str] = None,
     is_emergency: Optional[bool] = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -46,9 +55,11 @@ async def list_health_logs(
     if is_emergency is not None:
         query = query.where(HealthLog.is_emergency == is_emergency)
     
-    query = query.order_by(HealthLog.date.desc()).offset(skip).limit(limit)
+    query = paginate(query, HEALTH_LOG_SORT_KEYS, cursor, skip, limit)
     result = await db.execute(query)
-    return result.scalars().all()
+    logs = result.scalars().all()
+    set_next_cursor(response, logs, HEALTH_LOG_SORT_KEYS, limit)
+    return logs
 
 
 @router.post("/", response_model=HealthLogRead, status_code=status.HTTP_201_CREATED)
@@ -4,12 +4,13 @@ from sqlalchemy import select
 
 from app.core.database import get_db
 from app.core.security import (
-    get_password_hash, 
-    verify_password, 
+    get_password_hash_async,
+    verify_password_async,
     create_access_token, 
     create_refresh_token,
     decode_token,
-    get_current_user
+    get_current_user,
+    invalidate_cached_user
 )
 from app.apps.users.models import User
 from app.apps.users.schemas import (
@@ -38,7 +39,7 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     new_user = User(
         email=user_data.email,
         password_hash=hashed_password,
@@ -62,7 +63,7 @@ async def login(login_data: LoginRequest, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.email == login_data.email))
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(login_data.password, user.password_hash):
+    if not user or not await verify_password_async(login_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -119,6 +120,9 @@ async def update_me(
         setattr(current_user, field, value)
     
     await db.commit()
+    # Also dropped on flush; repeat after commit so a concurrent request
+    # can't re-cache the pre-commit row
+    invalidate_cached_user(current_user.id)
     await db.refresh(current_user)
     
     return current_user
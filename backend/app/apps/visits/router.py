@@ -2,9 +2,10 @@ from typing import List, Optional
 from datetime import date, datetime
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func
+from sqlalchemy import select, and_, or_
 
 from app.core.database import get_db
+from app.core.pagination import paginate, next_cursor
 from app.core.security import get_current_user, require_roles
 from app.apps.users.models import User
 from app.apps.beneficiaries.models import BeneficiaryProfile
@@ -17,9 +18,22 @@ from app.apps.visits.schemas import (
     VisitWithDetails,
     VisitListResponse
 )
+from app.apps.visits.service import (
+    enriched_visit_query,
+    visit_with_details,
+    visit_summary_columns,
+    visit_summary_query
+)
 
 router = APIRouter(prefix="/visits", tags=["Visits"])
 
+# Listing order, ending with the primary key so cursors are unambiguous
+VISIT_SORT_KEYS = (
+    (Visit.scheduled_date, False),
+    (Visit.priority, True),
+    (Visit.id, False),
+)
+
 
 @router.get("/", response_model=VisitListResponse)
 async def list_visits(
@@ -29,113 +43,68 @@ async def list_visits(
     to_date: Optional[date] = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
     List visits - ASHA workers see their own visits, partners/admins see all.
     Returns visits with summary counts.
+    Pass the returned next_cursor as `cursor` to page without offsets.
     """
-    query = select(Visit)
+    conditions = []
     
     # Role-based filtering
     if current_user.role == 'asha_worker':
-        query = query.where(Visit.asha_worker_id == current_user.id)
+        conditions.append(Visit.asha_worker_id == current_user.id)
     elif current_user.role == 'beneficiary':
         # Beneficiaries can see their own scheduled visits
-        result = await db.execute(
+        conditions.append(Visit.beneficiary_id.in_(
             select(BeneficiaryProfile.id).where(BeneficiaryProfile.user_id == current_user.id)
-        )
-        beneficiary = result.scalar_one_or_none()
-        if beneficiary:
-            query = query.where(Visit.beneficiary_id == beneficiary)
-        else:
-            return VisitListResponse(visits=[], total=0, today_count=0, overdue_count=0)
+        ))
     
     # Apply filters
     if status:
-        query = query.where(Visit.status == status)
+        conditions.append(Visit.status == status)
     if beneficiary_id:
-        query = query.where(Visit.beneficiary_id == beneficiary_id)
+        conditions.append(Visit.beneficiary_id == beneficiary_id)
     if from_date:
-        query = query.where(Visit.scheduled_date >= from_date)
+        conditions.append(Visit.scheduled_date >= from_date)
     if to_date:
-        query = query.where(Visit.scheduled_date <= to_date)
-    
-    # Order by date
-    query = query.order_by(Visit.scheduled_date.asc(), Visit.priority.desc())
-    
-    # Get total count
-    count_query = select(func.count()).select_from(query.subquery())
-    total = await db.scalar(count_query) or 0
+        conditions.append(Visit.scheduled_date <= to_date)
     
-    # Count today's visits
     today = date.today()
-    today_query = select(func.count()).select_from(Visit).where(
-        and_(
-            Visit.scheduled_date == today,
-            Visit.asha_worker_id == current_user.id if current_user.role == 'asha_worker' else True
-        )
-    )
-    today_count = await db.scalar(today_query) or 0
-    
-    # Count overdue visits
-    overdue_query = select(func.count()).select_from(Visit).where(
-        and_(
-            Visit.scheduled_date < today,
-            Visit.status == VisitStatus.SCHEDULED,
-            Visit.asha_worker_id == current_user.id if current_user.role == 'asha_worker' else True
+    page_query = enriched_visit_query().where(*conditions)
+    
+    if cursor:
+        # The keyset condition narrows the WHERE clause, so window counts
+        # would only cover the rows after the cursor - count separately
+        query = paginate(page_query, VISIT_SORT_KEYS, cursor, skip, limit)
+        rows = (await db.execute(query)).all()
+        counts = (await db.execute(visit_summary_query(today, *conditions))).one()
+    else:
+        # Page rows carry the summary counts as window aggregates over the
+        # filtered set, so the whole dashboard call is a single round trip
+        query = paginate(
+            page_query.add_columns(*visit_summary_columns(today)),
+            VISIT_SORT_KEYS, None, skip, limit
         )
-    )
-    overdue_count = await db.scalar(overdue_query) or 0
-    
-    # Apply pagination
-    query = query.offset(skip).limit(limit)
-    result = await db.execute(query)
-    visits = result.scalars().all()
-    
-    # Enrich with details
-    enriched_visits = []
-    for visit in visits:
-        # Get beneficiary details
-        ben_result = await db.execute(
-            select(BeneficiaryProfile).where(BeneficiaryProfile.id == visit.beneficiary_id)
-        )
-        beneficiary = ben_result.scalar_one_or_none()
+        rows = (await db.execute(query)).all()
         
-        # Get ASHA worker name
-        asha_result = await db.execute(
-            select(User).where(User.id == visit.asha_worker_id)
-        )
-        asha = asha_result.scalar_one_or_none()
-        
-        enriched_visits.append(VisitWithDetails(
-            id=visit.id,
-            beneficiary_id=visit.beneficiary_id,
-            asha_worker_id=visit.asha_worker_id,
-            scheduled_date=visit.scheduled_date,
-            scheduled_time=visit.scheduled_time,
-            visit_type=visit.visit_type,
-            purpose=visit.purpose,
-            notes=visit.notes,
-            status=visit.status,
-            priority=visit.priority,
-            completed_at=visit.completed_at,
-            health_log_id=visit.health_log_id,
-            created_at=visit.created_at,
-            updated_at=visit.updated_at,
-            beneficiary_name=beneficiary.name if beneficiary else None,
-            beneficiary_user_type=beneficiary.user_type if beneficiary else None,
-            beneficiary_risk_level=beneficiary.risk_level if beneficiary else None,
-            beneficiary_address=beneficiary.address if beneficiary else None,
-            asha_worker_name=asha.name if asha else None
-        ))
+        if rows:
+            counts = rows[0]
+        elif skip:
+            # Paged past the end - the counts still describe the filtered set
+            counts = (await db.execute(visit_summary_query(today, *conditions))).one()
+        else:
+            return VisitListResponse(visits=[], total=0, today_count=0, overdue_count=0)
     
     return VisitListResponse(
-        visits=enriched_visits,
-        total=total,
-        today_count=today_count,
-        overdue_count=overdue_count
+        visits=[visit_with_details(row) for row in rows],
+        total=counts.total_count,
+        today_count=counts.today_count,
+        overdue_count=counts.overdue_count,
+        next_cursor=next_cursor([row[0] for row in rows], VISIT_SORT_KEYS, limit)
     )
 
 
@@ -147,7 +116,7 @@ async def get_today_visits(
     """Get today's scheduled visits for the ASHA worker"""
     today = date.today()
     
-    query = select(Visit).where(
+    query = enriched_visit_query().where(
         and_(
             Visit.asha_worker_id == current_user.id,
             Visit.scheduled_date == today
@@ -155,38 +124,7 @@ async def get_today_visits(
     ).order_by(Visit.priority.desc(), Visit.scheduled_time.asc())
     
     result = await db.execute(query)
-    visits = result.scalars().all()
-    
-    enriched_visits = []
-    for visit in visits:
-        ben_result = await db.execute(
-            select(BeneficiaryProfile).where(BeneficiaryProfile.id == visit.beneficiary_id)
-        )
-        beneficiary = ben_result.scalar_one_or_none()
-        
-        enriched_visits.append(VisitWithDetails(
-            id=visit.id,
-            beneficiary_id=visit.beneficiary_id,
-            asha_worker_id=visit.asha_worker_id,
-            scheduled_date=visit.scheduled_date,
-            scheduled_time=visit.scheduled_time,
-            visit_type=visit.visit_type,
-            purpose=visit.purpose,
-            notes=visit.notes,
-            status=visit.status,
-            priority=visit.priority,
-            completed_at=visit.completed_at,
-            health_log_id=visit.health_log_id,
-            created_at=visit.created_at,
-            updated_at=visit.updated_at,
-            beneficiary_name=beneficiary.name if beneficiary else None,
-            beneficiary_user_type=beneficiary.user_type if beneficiary else None,
-            beneficiary_risk_level=beneficiary.risk_level if beneficiary else None,
-            beneficiary_address=beneficiary.address if beneficiary else None,
-            asha_worker_name=current_user.name
-        ))
-    
-    return enriched_visits
+    return [visit_with_details(row) for row in result.all()]
 
 
 @router.get("/overdue", response_model=List[VisitWithDetails])
@@ -197,7 +135,7 @@ async def get_overdue_visits(
     """Get overdue visits (scheduled but not completed, date has passed)"""
     today = date.today()
     
-    query = select(Visit).where(
+    query = enriched_visit_query().where(
         and_(
             Visit.asha_worker_id == current_user.id,
             Visit.scheduled_date < today,
@@ -206,38 +144,7 @@ async def get_overdue_visits(
     ).order_by(Visit.scheduled_date.asc())
     
     result = await db.execute(query)
-    visits = result.scalars().all()
-    
-    enriched_visits = []
-    for visit in visits:
-        ben_result = await db.execute(
-            select(BeneficiaryProfile).where(BeneficiaryProfile.id == visit.beneficiary_id)
-        )
-        beneficiary = ben_result.scalar_one_or_none()
-        
-        enriched_visits.append(VisitWithDetails(
-            id=visit.id,
-            beneficiary_id=visit.beneficiary_id,
-            asha_worker_id=visit.asha_worker_id,
-            scheduled_date=visit.scheduled_date,
-            scheduled_time=visit.scheduled_time,
-            visit_type=visit.visit_type,
-            purpose=visit.purpose,
-            notes=visit.notes,
-            status=visit.status,
-            priority=visit.priority,
-            completed_at=visit.completed_at,
-            health_log_id=visit.health_log_id,
-            created_at=visit.created_at,
-            updated_at=visit.updated_at,
-            beneficiary_name=beneficiary.name if beneficiary else None,
-            beneficiary_user_type=beneficiary.user_type if beneficiary else None,
-            beneficiary_risk_level=beneficiary.risk_level if beneficiary else None,
-            beneficiary_address=beneficiary.address if beneficiary else None,
-            asha_worker_name=current_user.name
-        ))
-    
-    return enriched_visits
+    return [visit_with_details(row) for row in result.all()]
 
 
 @router.post("/", response_model=VisitRead, status_code=status.HTTP_201_CREATED)
@@ -289,56 +196,24 @@ async def get_visit(
 ):
     """Get a specific visit by ID"""
     result = await db.execute(
-        select(Visit).where(Visit.id == visit_id)
+        enriched_visit_query().where(Visit.id == visit_id)
     )
-    visit = result.scalar_one_or_none()
+    row = result.one_or_none()
     
-    if not visit:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Visit not found"
         )
     
     # Permission check
-    if current_user.role == 'asha_worker' and visit.asha_worker_id != current_user.id:
+    if current_user.role == 'asha_worker' and row[0].asha_worker_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied"
         )
     
-    # Get beneficiary details
-    ben_result = await db.execute(
-        select(BeneficiaryProfile).where(BeneficiaryProfile.id == visit.beneficiary_id)
-    )
-    beneficiary = ben_result.scalar_one_or_none()
-    
-    # Get ASHA worker details
-    asha_result = await db.execute(
-        select(User).where(User.id == visit.asha_worker_id)
-    )
-    asha = asha_result.scalar_one_or_none()
-    
-    return VisitWithDetails(
-        id=visit.id,
-        beneficiary_id=visit.beneficiary_id,
-        asha_worker_id=visit.asha_worker_id,
-        scheduled_date=visit.scheduled_date,
-        scheduled_time=visit.scheduled_time,
-        visit_type=visit.visit_type,
-        purpose=visit.purpose,
-        notes=visit.notes,
-        status=visit.status,
-        priority=visit.priority,
-        completed_at=visit.completed_at,
-        health_log_id=visit.health_log_id,
-        created_at=visit.created_at,
-        updated_at=visit.updated_at,
-        beneficiary_name=beneficiary.name if beneficiary else None,
-        beneficiary_user_type=beneficiary.user_type if beneficiary else None,
-        beneficiary_risk_level=beneficiary.risk_level if beneficiary else None,
-        beneficiary_address=beneficiary.address if beneficiary else None,
-        asha_worker_name=asha.name if asha else None
-    )
+    return visit_with_details(row)
 
 
 @router.put("/{visit_id}", response_model=VisitRead)
@@ -68,3 +68,4 @@ class VisitListResponse(BaseModel):
     total: int
     today_count: int
     overdue_count: int
+    next_cursor: Optional[str] = None
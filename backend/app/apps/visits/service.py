@@ -0,0 +1,86 @@
+"""
+Visit query helpers shared by the visit endpoints.
+
+Visits are always shown together with the beneficiary's name, type, risk
+level and address plus the ASHA worker's name. These helpers fetch all of
+that in a single joined SELECT instead of one lookup per visit.
+
+The summary counts shown on the ASHA home screen (total, today, overdue)
+are computed in the same statement as the page, either as window
+aggregates over the filtered rows or, when the page is empty, as one
+COUNT(*) FILTER (...) aggregate.
+"""
+from datetime import date
+from typing import Tuple
+
+from sqlalchemy import ColumnElement, Select, and_, func, select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import aliased
+
+from app.apps.users.models import User
+from app.apps.beneficiaries.models import BeneficiaryProfile
+from app.apps.visits.models import Visit, VisitStatus
+from app.apps.visits.schemas import VisitWithDetails
+
+def enriched_visit_query() -> Select:
+    """Select visits joined with beneficiary and ASHA worker details"""
+    # Built per call: aliasing at import time would configure the mappers
+    # before every related model module has been imported
+    AshaWorker = aliased(User, name="asha_worker")
+    return (
+        select(
+            Visit,
+            BeneficiaryProfile.name.label("beneficiary_name"),
+            BeneficiaryProfile.user_type.label("beneficiary_user_type"),
+            BeneficiaryProfile.risk_level.label("beneficiary_risk_level"),
+            BeneficiaryProfile.address.label("beneficiary_address"),
+            AshaWorker.full_name.label("asha_worker_name"),
+        )
+        .outerjoin(BeneficiaryProfile, BeneficiaryProfile.id == Visit.beneficiary_id)
+        .outerjoin(AshaWorker, AshaWorker.id == Visit.asha_worker_id)
+    )
+
+
+def visit_with_details(row: Row) -> VisitWithDetails:
+    """Build a VisitWithDetails from a row of enriched_visit_query()"""
+    visit = row[0]
+    return VisitWithDetails(
+        **{c.name: getattr(visit, c.name) for c in visit.__table__.columns},
+        beneficiary_name=row.beneficiary_name,
+        beneficiary_user_type=row.beneficiary_user_type,
+        beneficiary_risk_level=row.beneficiary_risk_level,
+        beneficiary_address=row.beneficiary_address,
+        asha_worker_name=row.asha_worker_name
+    )
+
+
+def _today_condition(today: date) -> ColumnElement[bool]:
+    return Visit.scheduled_date == today
+
+
+def _overdue_condition(today: date) -> ColumnElement[bool]:
+    return and_(
+        Visit.scheduled_date < today,
+        Visit.status == VisitStatus.SCHEDULED
+    )
+
+
+def visit_summary_columns(today: date) -> Tuple[ColumnElement[int], ...]:
+    """
+    Window aggregates giving total/today/overdue counts over every row that
+    matches the query's WHERE clause, independent of OFFSET/LIMIT.
+    """
+    return (
+        func.count().over().label("total_count"),
+        func.count().filter(_today_condition(today)).over().label("today_count"),
+        func.count().filter(_overdue_condition(today)).over().label("overdue_count"),
+    )
+
+
+def visit_summary_query(today: date, *conditions: ColumnElement[bool]) -> Select:
+    """Single aggregate query for total/today/overdue counts"""
+    return select(
+        func.count().label("total_count"),
+        func.count().filter(_today_condition(today)).label("today_count"),
+        func.count().filter(_overdue_condition(today)).label("overdue_count"),
+    ).select_from(Visit).where(*conditions)
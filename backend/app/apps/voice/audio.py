@@ -0,0 +1,209 @@
+"""
+In-memory audio decoding for Whisper.
+
+Uploads are decoded straight into the 16 kHz mono float32 array that
+Whisper's model.transcribe accepts, without touching the disk: 16 kHz
+PCM WAV is parsed directly, and everything else is piped through ffmpeg
+(stdin -> raw float32 PCM on stdout). FFmpegStreamDecoder keeps one ffmpeg
+process open for audio that arrives in pieces.
+"""
+import asyncio
+import io
+import subprocess
+import wave
+from typing import List, Optional
+
+import numpy as np
+
+# Whisper's expected input sample rate
+SAMPLE_RATE = 16000
+
+# numpy sample types for the PCM widths WAV files commonly use
+_PCM_DTYPES = {1: np.uint8, 2: np.dtype("<i2"), 4: np.dtype("<i4")}
+
+# Bytes handed to ffprobe - container headers sit at the start of the file
+PROBE_BYTES = 1024 * 1024
+
+
+class AudioDecodeError(Exception):
+    """Raised when an upload can't be decoded to PCM"""
+
+
+def decode_wav(data: bytes) -> Optional[np.ndarray]:
+    """
+    Decode a 16 kHz PCM WAV file without ffmpeg.
+    Returns None for WAV files that need resampling or aren't plain PCM.
+    """
+    try:
+        with wave.open(io.BytesIO(data)) as wav:
+            sample_width = wav.getsampwidth()
+            if wav.getframerate() != SAMPLE_RATE or sample_width not in _PCM_DTYPES:
+                return None
+            channels = wav.getnchannels()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+
+    samples = np.frombuffer(frames, dtype=_PCM_DTYPES[sample_width])
+    if sample_width == 1:
+        # 8-bit WAV is unsigned
+        samples = (samples.astype(np.float32) - 128.0) / 128.0
+    else:
+        samples = samples.astype(np.float32) / float(2 ** (8 * sample_width - 1))
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+def probe_duration(data: bytes, ext: str, timeout: float = 10) -> Optional[float]:
+    """
+    Duration in seconds from the container header, without decoding.
+    None when the header doesn't say (e.g. MediaRecorder webm) or can't be read.
+    """
+    if ext == ".wav":
+        try:
+            with wave.open(io.BytesIO(data)) as wav:
+                return wav.getnframes() / wav.getframerate()
+        except (wave.Error, EOFError, ZeroDivisionError):
+            return None
+
+    cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        "-i", "pipe:0"
+    ]
+    try:
+        result = subprocess.run(cmd, input=data[:PROBE_BYTES], capture_output=True, timeout=timeout)
+        return float(result.stdout.decode().strip())
+    except (subprocess.TimeoutExpired, FileNotFoundError, ValueError):
+        return None
+
+
+def _ffmpeg_command(max_seconds: Optional[float] = None) -> List[str]:
+    cmd = [
+        "ffmpeg",
+        "-hide_banner", "-loglevel", "error",
+        "-i", "pipe:0",
+        "-f", "f32le",         # Raw 32-bit float PCM
+        "-ac", "1",            # Mono channel
+        "-ar", str(SAMPLE_RATE),
+        "pipe:1"
+    ]
+    if max_seconds is not None:
+        cmd[-1:-1] = ["-t", str(max_seconds + 1)]
+    return cmd
+
+
+def decode_with_ffmpeg(data: bytes, timeout: float = 30, max_seconds: Optional[float] = None) -> np.ndarray:
+    """
+    Pipe encoded audio through ffmpeg into 16 kHz mono float32 samples.
+    With max_seconds, output stops just past that length so an over-long
+    recording can be detected without decoding all of it.
+    """
+    try:
+        result = subprocess.run(_ffmpeg_command(max_seconds), input=data, capture_output=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise AudioDecodeError("FFmpeg conversion timed out")
+    except FileNotFoundError:
+        raise AudioDecodeError("FFmpeg not found. Install with: sudo apt install ffmpeg")
+
+    if result.returncode != 0:
+        error = result.stderr.decode("utf-8", errors="replace").strip()
+        raise AudioDecodeError(error or f"FFmpeg exited with code {result.returncode}")
+
+    # Copy out of the immutable stdout buffer so torch can use the array
+    return np.frombuffer(result.stdout, dtype=np.float32).copy()
+
+
+def decode_audio(data: bytes, ext: str, max_seconds: Optional[float] = None) -> np.ndarray:
+    """Decode an uploaded audio file to Whisper's input format in memory"""
+    if ext == ".wav":
+        samples = decode_wav(data)
+        if samples is not None:
+            return samples
+    return decode_with_ffmpeg(data, max_seconds=max_seconds)
+
+
+class FFmpegStreamDecoder:
+    """
+    One ffmpeg process decoding a container stream (e.g. MediaRecorder
+    webm/ogg) as its chunks arrive.
+
+    `feed()` writes a chunk to ffmpeg's stdin, `take()` returns the samples
+    decoded since the previous call, and `close()` ends the input and
+    returns whatever is left. Each byte is decoded once, however long the
+    recording gets. Runs on the event loop with no worker threads.
+    """
+
+    def __init__(self):
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._pcm = bytearray()
+        self._reader: Optional[asyncio.Task] = None
+        self._errors: Optional[asyncio.Task] = None
+
+    async def _start(self) -> None:
+        try:
+            self._process = await asyncio.create_subprocess_exec(
+                *_ffmpeg_command(),
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except FileNotFoundError:
+            raise AudioDecodeError("FFmpeg not found. Install with: sudo apt install ffmpeg")
+        self._reader = asyncio.ensure_future(self._read_pcm())
+        self._errors = asyncio.ensure_future(self._process.stderr.read())
+
+    async def _read_pcm(self) -> None:
+        while True:
+            data = await self._process.stdout.read(64 * 1024)
+            if not data:
+                return
+            self._pcm.extend(data)
+
+    async def _failure(self) -> AudioDecodeError:
+        await self._process.wait()
+        error = (await self._errors).decode("utf-8", errors="replace").strip()
+        return AudioDecodeError(error or f"FFmpeg exited with code {self._process.returncode}")
+
+    async def feed(self, chunk: bytes) -> None:
+        """Send a chunk to ffmpeg. Raises AudioDecodeError if ffmpeg has failed."""
+        if self._process is None:
+            await self._start()
+        try:
+            self._process.stdin.write(chunk)
+            await self._process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            raise await self._failure()
+
+    def take(self) -> np.ndarray:
+        """Samples decoded since the last call (whole float32 samples only)"""
+        usable = len(self._pcm) - len(self._pcm) % 4
+        samples = np.frombuffer(bytes(self._pcm[:usable]), dtype=np.float32).copy()
+        del self._pcm[:usable]
+        return samples
+
+    async def close(self, timeout: float = 30) -> np.ndarray:
+        """End the input, wait for ffmpeg to flush and return the remaining samples"""
+        if self._process is None:
+            return np.zeros(0, dtype=np.float32)
+        try:
+            self._process.stdin.close()
+            await asyncio.wait_for(asyncio.shield(self._reader), timeout)
+        except asyncio.TimeoutError:
+            self.kill()
+            raise AudioDecodeError("FFmpeg conversion timed out")
+        await self._process.wait()
+        if self._process.returncode != 0:
+            raise await self._failure()
+        return self.take()
+
+    def kill(self) -> None:
+        """Stop ffmpeg if it's still running (e.g. the client disconnected)"""
+        if self._process is not None and self._process.returncode is None:
+            self._process.kill()
+        for task in (self._reader, self._errors):
+            if task is not None:
+                task.cancel()
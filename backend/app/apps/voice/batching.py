@@ -0,0 +1,193 @@
+"""
+Micro-batching for Whisper inference.
+
+Short voice notes tend to arrive in bursts, and running them through the
+model one at a time leaves most of the encoder's batch capacity unused.
+The batcher holds each clip for a few milliseconds, groups clips that
+share decoding options, and decodes the group as one padded log-mel
+batch. Every caller then gets its own result back.
+
+Only clips that fit in a single 30 second Whisper window can be batched.
+Longer audio still goes through model.transcribe, which walks the clip
+window by window.
+
+Batched decoding keeps model.transcribe's temperature fallback: clips whose
+greedy decode looks like a repetition loop (high compression ratio) or has
+a low average log-probability are decoded again, together, at the next
+temperature. Results can still differ slightly from model.transcribe,
+which conditions each window on the previous text and emits timestamped
+segments; a batched clip comes back as a single segment.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core import metrics
+from app.apps.voice.audio import SAMPLE_RATE
+
+# Length of one Whisper input window
+WINDOW_SECONDS = 30
+WINDOW_SAMPLES = WINDOW_SECONDS * SAMPLE_RATE
+
+# Same defaults model.transcribe uses for fallback and silent windows
+TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+COMPRESSION_RATIO_THRESHOLD = 2.4
+NO_SPEECH_THRESHOLD = 0.6
+LOGPROB_THRESHOLD = -1.0
+
+batch_size_histogram = metrics.histogram(
+    "transcription_batch_size",
+    "Clips decoded together in one batch",
+    (1, 2, 4, 8, 16, 32)
+)
+
+BatchKey = Tuple[int, Tuple[Tuple[str, Any], ...]]
+RunBatch = Callable[[Any, List[np.ndarray], Dict[str, Any]], Awaitable[List[Dict[str, Any]]]]
+
+
+def decode_batch(model, clips: List[np.ndarray], options: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Decode clips of at most 30 seconds in one batched forward pass.
+    Blocking. Returns results shaped like model.transcribe output.
+    """
+    import torch
+    import whisper
+    from whisper.tokenizer import LANGUAGES, TO_LANGUAGE_CODE
+
+    options = dict(options)
+    language = options.get("language")
+    if language and language.lower() not in LANGUAGES:
+        # model.transcribe accepts names like "Hindi"; decode needs the code
+        options["language"] = TO_LANGUAGE_CODE.get(language.lower(), language)
+
+    mel = torch.stack([
+        whisper.log_mel_spectrogram(whisper.pad_or_trim(clip), model.dims.n_mels)
+        for clip in clips
+    ]).to(model.device)
+    decoded = _decode_with_fallback(model, mel, options)
+
+    results = []
+    for clip, result in zip(clips, decoded):
+        text = result.text.strip()
+        if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD:
+            text = ""
+        duration = len(clip) / SAMPLE_RATE
+        results.append({
+            "text": text,
+            "language": result.language,
+            "segments": [{
+                "id": 0,
+                "start": 0.0,
+                "end": duration,
+                "text": text,
+                "avg_logprob": result.avg_logprob,
+                "no_speech_prob": result.no_speech_prob,
+            }] if text else [],
+        })
+    return results
+
+
+def _needs_fallback(result) -> bool:
+    """model.transcribe's test for retrying a window at a higher temperature"""
+    if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD:
+        return False  # silence: the low log-probability is expected
+    return (
+        result.compression_ratio > COMPRESSION_RATIO_THRESHOLD
+        or result.avg_logprob < LOGPROB_THRESHOLD
+    )
+
+
+def _decode_with_fallback(model, mel, options: Dict[str, Any]) -> list:
+    """
+    Batched equivalent of model.transcribe's decode_with_fallback: decode
+    every clip at temperature 0, then re-decode only the clips that still
+    need it at each higher temperature, keeping the last attempt.
+    """
+    import whisper
+
+    decoded = [None] * len(mel)
+    remaining = list(range(len(mel)))
+    for temperature in TEMPERATURES:
+        kwargs = dict(options, temperature=temperature)
+        if temperature > 0:
+            # Sampling replaces beam search, as in model.transcribe
+            kwargs.pop("beam_size", None)
+            kwargs.pop("patience", None)
+        else:
+            kwargs.pop("best_of", None)
+        results = whisper.decode(model, mel[remaining], whisper.DecodingOptions(**kwargs))
+        retry = []
+        for index, result in zip(remaining, results):
+            decoded[index] = result
+            if _needs_fallback(result):
+                retry.append(index)
+        if not retry:
+            break
+        remaining = retry
+    return decoded
+
+
+class _Batch:
+    __slots__ = ("model", "options", "clips", "futures", "timer")
+
+    def __init__(self, model, options: Dict[str, Any]):
+        self.model = model
+        self.options = options
+        self.clips: List[np.ndarray] = []
+        self.futures: List[asyncio.Future] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class TranscriptionBatcher:
+    """
+    Collects clips for up to `max_wait_ms` or until `max_batch_size` are
+    waiting, then hands the batch to `run_batch`. Clips are only grouped
+    with others that use the same model and decoding options.
+    """
+
+    def __init__(self, run_batch: RunBatch, max_batch_size: int, max_wait_ms: int):
+        self._run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._batches: Dict[BatchKey, _Batch] = {}
+        self._tasks: set = set()
+
+    async def submit(self, model, clip: np.ndarray, options: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a clip for the next batch and wait for its result"""
+        loop = asyncio.get_running_loop()
+        key = (id(model), tuple(sorted(options.items())))
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = self._batches[key] = _Batch(model, options)
+            batch.timer = loop.call_later(self.max_wait, self._flush, key)
+
+        future = loop.create_future()
+        batch.clips.append(clip)
+        batch.futures.append(future)
+        if len(batch.clips) >= self.max_batch_size:
+            self._flush(key)
+        return await future
+
+    def _flush(self, key: BatchKey) -> None:
+        batch = self._batches.pop(key, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: _Batch) -> None:
+        batch_size_histogram.observe(len(batch.clips))
+        try:
+            results = await self._run_batch(batch.model, batch.clips, batch.options)
+        except Exception as e:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result in zip(batch.futures, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,96 @@
+"""
+Content-addressed cache of transcription results.
+
+Clients on flaky networks retry the same upload, and each retry used to
+run ffmpeg and Whisper again. Results are now keyed by a hash of the
+audio bytes, the requested language and the model name. An identical
+retry is answered from memory, or from an optional on-disk copy that
+survives restarts and is shared by workers on the same host.
+"""
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional
+
+from app.core.cache import TTLCache
+
+# Prune the disk directory after this many writes
+_PRUNE_EVERY = 64
+
+
+def transcription_key(digest: str, language: Optional[str], model_name: str) -> str:
+    """Cache key for an upload: its audio digest, the language and the model"""
+    return hashlib.sha256(f"{model_name}\0{language or 'auto'}\0{digest}".encode()).hexdigest()
+
+
+class TranscriptionCache:
+    """
+    LRU cache of transcription results with optional disk persistence.
+    Blocking when a directory is set - call from a worker thread.
+    """
+
+    def __init__(self, maxsize: int, directory: Optional[str] = None):
+        self.memory = TTLCache(maxsize)
+        self.directory = directory
+        self.disk_hits = 0
+        self._writes = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        result = self.memory.get(key)
+        if result is not None or not self.directory:
+            return result
+
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                result = json.load(f)
+            os.utime(path)  # Keep recently used files through pruning
+        except (OSError, ValueError):
+            return None
+        self.disk_hits += 1
+        self.memory.set(key, result)
+        return result
+
+    def set(self, key: str, result: Dict[str, Any]) -> None:
+        if self.memory.maxsize <= 0:
+            return
+        self.memory.set(key, result)
+        if not self.directory:
+            return
+
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[TranscriptionCache] Write failed: {e}")
+            return
+
+        self._writes += 1
+        if self._writes % _PRUNE_EVERY == 0:
+            self._prune()
+
+    def _prune(self) -> None:
+        """Delete the least recently used files beyond maxsize"""
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.name.endswith(".json")]
+            if len(entries) <= self.memory.maxsize:
+                return
+            entries.sort(key=lambda e: e.stat().st_mtime)
+            for entry in entries[:len(entries) - self.memory.maxsize]:
+                os.remove(entry.path)
+        except OSError as e:
+            print(f"[TranscriptionCache] Prune failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.memory.stats()
+        if self.directory:
+            stats["disk_hits"] = self.disk_hits
+        return stats
@@ -0,0 +1,199 @@
+"""
+Write-behind buffer for chat interaction logs.
+
+POST /voice/log is called for every chat turn. An INSERT, commit and
+refresh per turn made it one of the busiest write paths. Rows are now
+given their id and timestamp up front and queued in memory. A background
+task writes them as one multi-row INSERT when CHAT_LOG_BUFFER_MAX_ROWS
+are waiting or every CHAT_LOG_FLUSH_SECONDS, and again on shutdown.
+
+Each flush also bumps the emergency_chats counter for its emergency rows
+in the same transaction (see app.core.counters), and sets each row's
+full-text search vector (see search.py).
+
+Trade-off: a queued row is not visible in /voice/history until the next
+flush, and rows still queued when a worker crashes (rather than shutting
+down) are lost. A row the database rejects (e.g. its user was deleted
+meanwhile) has already been acknowledged with 201; a failed batch is split
+until the bad rows are isolated, and only those are dropped.
+"""
+import asyncio
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+from app.core import counters, metrics
+from app.core.config import get_settings
+from app.core.database import async_session_maker
+from app.apps.voice.models import ChatLog
+from app.apps.voice.search import memory_index, search_vector
+
+settings = get_settings()
+
+buffered_rows = metrics.gauge("chat_log_buffer_rows", "Chat log rows waiting to be written")
+flushed_rows = metrics.counter("chat_log_rows_flushed_total", "Chat log rows written in bulk")
+dropped_rows = metrics.counter("chat_log_rows_dropped_total", "Chat log rows dropped with the buffer full")
+rejected_rows = metrics.counter("chat_log_rows_rejected_total", "Chat log rows the database refused")
+flush_failures = metrics.counter("chat_log_flush_failures_total", "Failed bulk writes (rows are retried)")
+flush_time = metrics.histogram("chat_log_flush_seconds", "Time to write one batch of chat logs")
+
+# Emergency chat turns per user, read by /voice/emergency-count
+EMERGENCY_CHATS = "emergency_chats"
+counters.register_source(EMERGENCY_CHATS, counters.CounterSource(
+    model=ChatLog,
+    subject=ChatLog.user_id,
+    timestamp=ChatLog.created_at,
+    condition=ChatLog.is_emergency == True
+))
+
+
+def _is_connection_failure(error: DBAPIError) -> bool:
+    """The database could not be reached, as opposed to it refusing the rows"""
+    return error.connection_invalidated or isinstance(error, (OperationalError, InterfaceError))
+
+
+class ChatLogBuffer:
+    """In-process queue of ChatLog rows written in bulk"""
+
+    def __init__(self, max_rows: int, flush_seconds: float, limit: int):
+        self.max_rows = max_rows
+        self.flush_seconds = flush_seconds
+        self.limit = limit  # rows kept while the database is unreachable
+        self._rows: List[Dict[str, Any]] = []
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue a ChatLog row (column -> value). Fills in id and created_at
+        and returns the row.
+        """
+        row.setdefault("id", uuid.uuid4())
+        if row.get("created_at") is None:
+            row["created_at"] = datetime.utcnow()
+        self._rows.append(row)
+        if len(self._rows) > self.limit:
+            overflow = len(self._rows) - self.limit
+            del self._rows[:overflow]
+            dropped_rows.inc(overflow)
+            print(f"[ChatLogBuffer] Buffer full, dropped {overflow} oldest row(s)")
+        buffered_rows.set(len(self._rows))
+        if len(self._rows) >= self.max_rows:
+            self._wakeup.set()
+        return row
+
+    async def flush(self) -> int:
+        """Write every queued row; returns how many were written"""
+        async with self._flush_lock:
+            rows, self._rows = self._rows, []
+            if not rows:
+                return 0
+            started = time.perf_counter()
+            for row in rows:
+                if "search_vector" not in row:
+                    row["search_vector"] = search_vector(row["user_message"], row["ai_response"])
+            written, unwritten = await self._write(rows)
+            flushed_rows.inc(len(written))
+            if unwritten:
+                # Put them back in front of anything queued meanwhile
+                self._rows = unwritten + self._rows
+                overflow = len(self._rows) - self.limit
+                if overflow > 0:
+                    del self._rows[:overflow]
+                    dropped_rows.inc(overflow)
+                buffered_rows.set(len(self._rows))
+                return len(written)
+            flush_time.observe(time.perf_counter() - started)
+            buffered_rows.set(len(self._rows))
+            return len(written)
+
+    @staticmethod
+    async def _insert(rows: List[Dict[str, Any]]) -> None:
+        async with async_session_maker() as session:
+            # executemany of a plain INSERT is sent as multi-row VALUES batches
+            await session.execute(insert(ChatLog), rows)
+            await counters.increment(session, EMERGENCY_CHATS, [
+                (row["user_id"], row["created_at"]) for row in rows if row.get("is_emergency")
+            ])
+            await session.commit()
+
+    async def _write(self, rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Insert rows, halving any batch the database rejects until the bad
+        rows are found and dropped. Returns (written, unwritten): unwritten
+        rows hit some other failure (e.g. the database is down) and should
+        be retried, in order.
+
+        Any DBAPIError other than a connection failure counts as a
+        rejection: the asyncpg adapter reports most server-side errors
+        (a NUL byte in a message, an over-long tsvector lexeme) as a plain
+        DBAPIError, not IntegrityError or DataError.
+        """
+        written: List[Dict[str, Any]] = []
+        pending = [rows]  # stack, next batch last
+        while pending:
+            batch = pending.pop()
+            try:
+                await self._insert(batch)
+            except Exception as e:
+                if isinstance(e, DBAPIError) and not _is_connection_failure(e):
+                    if len(batch) > 1:
+                        middle = len(batch) // 2
+                        pending += [batch[middle:], batch[:middle]]
+                        continue
+                    rejected_rows.inc()
+                    print(f"[ChatLogBuffer] Dropped chat log {batch[0]['id']}: {e.orig or e}")
+                    continue
+                flush_failures.inc()
+                unwritten = batch + [row for later in reversed(pending) for row in later]
+                print(f"[ChatLogBuffer] Flush of {len(unwritten)} row(s) failed: {e}")
+                return written, unwritten
+            written.extend(batch)
+            if settings.CHAT_SEARCH_BACKEND == "memory":
+                for row in batch:
+                    memory_index.add(row)
+        return written, []
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if not await self.flush() and self._rows:
+                # Database unavailable - back off instead of retrying on every add
+                await asyncio.sleep(self.flush_seconds)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task and write whatever is still queued"""
+        if self._task is not None:
+            # Cancel between flushes so a batch is never cut off mid-write
+            async with self._flush_lock:
+                self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+# Singleton instance
+chat_log_buffer = ChatLogBuffer(
+    max_rows=settings.CHAT_LOG_BUFFER_MAX_ROWS,
+    flush_seconds=settings.CHAT_LOG_FLUSH_SECONDS,
+    limit=settings.CHAT_LOG_BUFFER_LIMIT
+)
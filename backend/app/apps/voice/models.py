@@ -5,9 +5,9 @@ Stores chat history between users and AI assistant
 import uuid
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, Text, Boolean, DateTime, ForeignKey
+from sqlalchemy import String, Text, Boolean, DateTime, ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
 
 from app.core.database import Base
 
@@ -51,6 +51,18 @@ class ChatLog(Base):
     # Timestamps
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
     
+    # Full-text search lexemes, built by app.apps.voice.search (not loaded by default)
+    search_vector: Mapped[Optional[str]] = mapped_column(TSVECTOR, nullable=True, deferred=True)
+    
+    __table_args__ = (
+        Index('ix_ai_chat_history_search_vector', 'search_vector', postgresql_using='gin'),
+        # Rows the search backfill still has to index; empty once it's done
+        Index(
+            'ix_ai_chat_history_unindexed', 'id',
+            postgresql_where=text('search_vector IS NULL')
+        ),
+    )
+    
     def __repr__(self):
         return f"<ChatLog {self.id}>"
 
@@ -0,0 +1,93 @@
+"""
+INT8 dynamic quantization of Whisper for CPU-only nodes.
+
+With WHISPER_QUANTIZE on, the Linear layers (attention projections and
+MLPs, where most of the FLOPs are) hold INT8 weights, and activations are
+quantized on the fly at inference time. The quantized weights are saved
+to a cache directory as a plain state_dict, so later restarts load them
+into a freshly quantized skeleton instead of loading the FP32 checkpoint
+and quantizing it again. The cache is read with `weights_only=True`: it
+holds tensors only, never pickled code.
+"""
+import os
+from dataclasses import asdict
+from typing import Optional
+
+import torch
+
+# whisper's default download root, so quantized models sit next to the checkpoints
+DEFAULT_CACHE_DIR = os.path.join(
+    os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "whisper"
+)
+
+
+def _plain_linears(module: torch.nn.Module) -> None:
+    """
+    Replace whisper's Linear subclass with torch.nn.Linear in place.
+    quantize_dynamic only swaps exact nn.Linear modules; the subclass only
+    adds a dtype cast that FP32 CPU inference never needs.
+    """
+    for name, child in module.named_children():
+        if isinstance(child, torch.nn.Linear) and type(child) is not torch.nn.Linear:
+            plain = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+            plain.weight = child.weight
+            plain.bias = child.bias
+            setattr(module, name, plain)
+        else:
+            _plain_linears(child)
+
+
+def quantize_model(model):
+    """Quantize a loaded FP32 Whisper model's Linear layers to INT8"""
+    model = model.cpu().float().eval()
+    _plain_linears(model)
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _cache_path(name: str, cache_dir: str) -> str:
+    # Packed INT8 weights are tied to the torch version that wrote them
+    return os.path.join(cache_dir, f"{name}-int8-torch{torch.__version__}.state.pt")
+
+
+def _skeleton(name: str, dims):
+    """An INT8 model with the right shapes, ready for load_state_dict"""
+    import whisper
+    from whisper.model import ModelDimensions, Whisper
+
+    model = Whisper(ModelDimensions(**dims))
+    alignment_heads = whisper._ALIGNMENT_HEADS.get(name)
+    if alignment_heads is not None:
+        model.set_alignment_heads(alignment_heads)
+    return quantize_model(model)
+
+
+def load_quantized(name: str, cache_dir: Optional[str] = None):
+    """
+    Load the INT8 model for a Whisper model name, from the cache when
+    present. Otherwise load FP32 weights, quantize them and write the cache.
+    """
+    import whisper
+
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    path = _cache_path(name, cache_dir)
+    if os.path.exists(path):
+        try:
+            print(f"[Whisper] Loading quantized model from {path}")
+            checkpoint = torch.load(path, map_location="cpu", weights_only=True)
+            model = _skeleton(name, checkpoint["dims"])
+            model.load_state_dict(checkpoint["model_state_dict"])
+            return model
+        except Exception as e:
+            print(f"[Whisper] Quantized cache unreadable, rebuilding: {e}")
+
+    fp32 = whisper.load_model(name, device="cpu")
+    model = quantize_model(fp32)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        torch.save({"dims": asdict(fp32.dims), "model_state_dict": model.state_dict()}, tmp_path)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"[Whisper] Could not cache quantized model: {e}")
+    return model
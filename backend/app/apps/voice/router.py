@@ -3,91 +3,169 @@ Voice API Router - Whisper STT and Voice Processing
 
 This module provides endpoints for:
 1. /transcribe - Audio transcription using OpenAI Whisper
-2. /chat - AI chat with ASHA Didi
+   (/stream - WebSocket transcription while recording)
+2. /chat - AI chat with ASHA Didi (/chat/stream for Server-Sent Events)
 3. /process - Combined voice processing (transcribe + extract data)
-4. /log - Log voice interactions
-5. /history - Get chat history
+4. /log - Log voice interactions (/log/batch for offline backlogs)
+5. /history - Get chat history (/search for full-text search)
 """
 
+import asyncio
+import hashlib
 import json
-import tempfile
-import subprocess
-import os
-from datetime import datetime
-from typing import Optional, List
+import time
+import uuid
+from datetime import date, datetime
+from typing import Callable, Optional, List, Tuple
 from pathlib import Path
 
-from fastapi import APIRouter, Depends, File, Form, UploadFile, HTTPException, status
+from fastapi import (
+    APIRouter, Depends, File, Form, Query, UploadFile, HTTPException, Response,
+    WebSocket, WebSocketDisconnect, status
+)
 from fastapi.concurrency import run_in_threadpool
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
-from pydantic import BaseModel
+from sqlalchemy import or_, select
+from pydantic import BaseModel, Field
 
+from app.core import counters, metrics
+from app.core.concurrency import ExecutorSaturated
 from app.core.database import get_db
 from app.core.config import get_settings
+from app.core.pagination import paginate, set_next_cursor
 from app.core.security import get_current_user, get_current_user_optional
 from app.apps.users.models import User
-from app.apps.ai.service import gemini_service
+from app.apps.beneficiaries.models import BeneficiaryProfile
+from app.apps.ai.service import gemini_service, merge_visit_data
+from app.apps.voice.audio import SAMPLE_RATE, AudioDecodeError, decode_audio, probe_duration
+from app.apps.voice.cache import transcription_key
+from app.apps.voice.log_buffer import EMERGENCY_CHATS, chat_log_buffer
+from app.apps.voice.search import search_chats
+from app.apps.voice.service import transcription_cache, whisper_service
+from app.apps.voice.streaming import StreamingTranscriber, StreamTooLong
+from app.apps.voice.vad import merge_results, speech_chunks
 
 router = APIRouter(prefix="/voice", tags=["Voice"])
 
+chat_stream_ttfb = metrics.histogram(
+    "voice_chat_stream_ttfb_seconds",
+    "Time from a /voice/chat/stream request to its first reply token"
+)
+silent_uploads = metrics.counter(
+    "voice_silent_uploads_total",
+    "Uploads rejected by voice activity detection before inference"
+)
+trimmed_silence = metrics.counter(
+    "voice_trimmed_silence_seconds_total",
+    "Seconds of silence removed before inference"
+)
+transcribe_peak_bytes = metrics.histogram(
+    "voice_transcribe_peak_bytes",
+    "Largest audio buffers held at once by a /voice/transcribe request",
+    [2 ** n * 1024 * 1024 for n in range(9)]  # 1MB - 256MB
+)
+
+# Uploads are read from the spooled request file in chunks of this size
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
 # ============================================================================
 # Whisper Model Management
 # ============================================================================
 
-# Global Whisper model cache
-_whisper_model = None
 settings = get_settings()
 
 
-def get_whisper_model():
-    """Get cached Whisper model or load it"""
-    global _whisper_model
-    
-    if _whisper_model is None:
-        try:
-            import whisper
-            model_name = settings.WHISPER_MODEL
-            print(f"[Whisper] Loading model: {model_name}")
-            _whisper_model = whisper.load_model(model_name)
-            print(f"[Whisper] Model loaded successfully")
-        except ImportError:
-            raise HTTPException(
-                status_code=503,
-                detail="Whisper is not installed. Run: pip install openai-whisper"
-            )
-        except Exception as e:
-            raise HTTPException(
-                status_code=503,
-                detail=f"Failed to load Whisper model: {str(e)}"
-            )
+def get_whisper_model(tier: Optional[str] = None):
+    """Get a Whisper model tier, loading it if startup preloading hasn't yet (blocking)"""
+    try:
+        return whisper_service.load(tier=tier)
+    except ImportError:
+        raise HTTPException(
+            status_code=503,
+            detail="Whisper is not installed. Run: pip install openai-whisper"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Failed to load Whisper model: {str(e)}"
+        )
+
+
+def _transcription_busy(retry_after: int) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Transcription service is busy. Please try again shortly.",
+        headers={"Retry-After": str(retry_after)}
+    )
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail=f"Audio file too large (max {settings.VOICE_MAX_UPLOAD_BYTES // (1024 * 1024)}MB)"
+    )
+
+
+def _too_long() -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail=f"Audio too long (max {settings.VOICE_MAX_AUDIO_SECONDS // 60} minutes)"
+    )
+
+
+async def _read_upload(audio: UploadFile) -> Tuple[bytearray, str]:
+    """
+    Read an already-received upload in chunks, hashing as it goes, and
+    reject it once it passes VOICE_MAX_UPLOAD_BYTES. Returns the data and
+    its sha256. The body as a whole is capped while it arrives, before
+    FastAPI spools the form, by BodySizeLimitMiddleware (see main.py);
+    this check catches the file part alone being over the limit.
+    """
+    max_bytes = settings.VOICE_MAX_UPLOAD_BYTES
+    if audio.size is not None and audio.size > max_bytes:
+        raise _too_large()
     
-    return _whisper_model
+    digest = hashlib.sha256()
+    data = bytearray()
+    while True:
+        chunk = await audio.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            break
+        if len(data) + len(chunk) > max_bytes:
+            raise _too_large()
+        digest.update(chunk)
+        data.extend(chunk)
+    return data, digest.hexdigest()
+
+
+def _cached_transcription(digest: str, language: Optional[str]) -> Optional[dict]:
+    """Cached result for an upload from any tier, most accurate first (blocking)"""
+    for tier in reversed(whisper_service.tiers):
+        cached = transcription_cache.get(
+            transcription_key(digest, language, whisper_service.variant(tier))
+        )
+        if cached is not None:
+            return cached
+    return None
 
 
-def convert_audio_to_wav(input_path: str, output_path: str) -> bool:
-    """Convert audio file to WAV format using FFmpeg"""
-    try:
-        cmd = [
-            "ffmpeg", "-y",
-            "-i", input_path,
-            "-ar", "16000",  # 16kHz sample rate (Whisper requirement)
-            "-ac", "1",       # Mono channel
-            "-c:a", "pcm_s16le",  # 16-bit PCM
-            output_path
-        ]
-        result = subprocess.run(cmd, capture_output=True, timeout=30)
-        return result.returncode == 0
-    except subprocess.TimeoutExpired:
-        print("[FFmpeg] Conversion timed out")
-        return False
-    except FileNotFoundError:
-        print("[FFmpeg] FFmpeg not found. Install with: sudo apt install ffmpeg")
-        return False
-    except Exception as e:
-        print(f"[FFmpeg] Error: {e}")
-        return False
+def _whisper_options(language: Optional[str]) -> dict:
+    """Whisper transcribe options for a client language code"""
+    options = {
+        "fp16": False,  # Use FP32 for better compatibility
+    }
+    
+    # Set language if provided
+    if language:
+        lang_map = {
+            'hi': 'Hindi',
+            'en': 'English',
+            'hi-IN': 'Hindi',
+            'en-US': 'English',
+        }
+        options['language'] = lang_map.get(language, language)
+    return options
 
 
 # ============================================================================
@@ -99,6 +177,7 @@ class TranscriptionResponse(BaseModel):
     language: str
     confidence: float = 0.0
     duration: float = 0.0
+    model: str = ""  # Whisper tier that produced the transcript
 
 
 class ChatRequest(BaseModel):
@@ -116,13 +195,16 @@ class ChatResponse(BaseModel):
 
 
 class ChatLogRequest(BaseModel):
+    # Lengths match the ai_chat_history columns, so a row is rejected here
+    # rather than failing later in a buffered bulk insert
     user_message: str
     ai_response: str
-    language_used: str = "hi"
+    language_used: str = Field("hi", max_length=10)
     is_emergency: bool = False
-    beneficiary_id: Optional[str] = None
-    intent: Optional[str] = None
-    category: Optional[str] = None
+    beneficiary_id: Optional[str] = Field(None, max_length=255)
+    intent: Optional[str] = Field(None, max_length=50)
+    category: Optional[str] = Field(None, max_length=50)
+    created_at: Optional[datetime] = None  # When the turn happened, for offline uploads
 
 
 class ChatLogResponse(BaseModel):
@@ -130,6 +212,18 @@ class ChatLogResponse(BaseModel):
     logged_at: str
 
 
+# Turns accepted by one /log/batch request
+MAX_LOG_BATCH = 500
+
+
+class ChatLogBatchRequest(BaseModel):
+    logs: List[ChatLogRequest]
+
+
+class ChatLogBatchResponse(BaseModel):
+    logged: List[ChatLogResponse]
+
+
 # ============================================================================
 # Transcription Endpoint
 # ============================================================================
@@ -139,12 +233,30 @@ async def transcribe_audio(
     audio: UploadFile = File(..., description="Audio file to transcribe"),
     language: Optional[str] = Form(None, description="Language code (hi, en, etc.)"),
     current_user: Optional[User] = Depends(get_current_user_optional),
+    quality: Optional[str] = Form(None, description="Model hint: fast, accurate or a tier name"),
 ):
     """
     Transcribe audio using OpenAI Whisper.
     
     Supports: webm, mp4, wav, ogg, mp3, m4a, flac
     Max file size: 25MB
+    
+    The model tier is chosen per request from the queue depth, the audio
+    length and the optional quality hint; the response reports it.
+    """
+    return await _transcribe_upload(audio, language, quality)
+
+
+async def _transcribe_upload(
+    audio: UploadFile,
+    language: Optional[str],
+    quality: Optional[str] = None,
+    on_chunk_text: Optional[Callable[[str], None]] = None,
+) -> TranscriptionResponse:
+    """
+    Transcribe an uploaded file. on_chunk_text, if given, is called with
+    the text of each speech chunk as soon as it is transcribed (not on a
+    cache hit).
     """
     print(f"[Transcribe] Received file: {audio.filename}, size: {audio.size}, type: {audio.content_type}")
     
@@ -154,18 +266,17 @@ async def transcribe_audio(
     if not any(content_type.startswith(t) for t in allowed_types):
         print(f"[Transcribe] Warning: Unusual content type {content_type}, proceeding anyway")
     
-    # Read file
+    # Read file in chunks, enforcing the size limit as it arrives
     try:
-        audio_data = await audio.read()
+        audio_data, digest = await _read_upload(audio)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to read audio file: {str(e)}")
     
     if len(audio_data) == 0:
         raise HTTPException(status_code=400, detail="Audio file is empty")
     
-    if len(audio_data) > 25 * 1024 * 1024:  # 25MB max
-        raise HTTPException(status_code=400, detail="Audio file too large (max 25MB)")
-    
     print(f"[Transcribe] Audio data size: {len(audio_data)} bytes")
     
     # Determine file extension
@@ -174,61 +285,87 @@ async def transcribe_audio(
     if ext not in ['.webm', '.mp4', '.wav', '.ogg', '.mp3', '.m4a', '.flac']:
         ext = '.webm'  # Default to webm
     
-    temp_input = None
-    temp_wav = None
+    # A retried upload is answered without decoding or inference
+    cached = await run_in_threadpool(_cached_transcription, digest, language)
+    if cached is not None:
+        print("[Transcribe] Cache hit")
+        return TranscriptionResponse(**cached)
+    
+    # Fail fast before decoding when the transcription queue is already full
+    if whisper_service.executor.saturated:
+        whisper_service.executor.rejected.inc()
+        raise _transcription_busy(whisper_service.executor.retry_after)
+    
+    # Reject over-long recordings from the container header when it has one
+    max_seconds = settings.VOICE_MAX_AUDIO_SECONDS
+    header_duration = await run_in_threadpool(probe_duration, audio_data, ext)
+    if header_duration is not None and header_duration > max_seconds:
+        raise _too_long()
     
     try:
-        # Get Whisper model
-        model = get_whisper_model()
-        
-        # Save audio to temp file
-        with tempfile.NamedTemporaryFile(suffix=ext, delete=False) as f:
-            f.write(audio_data)
-            temp_input = f.name
+        # Decode in memory to 16kHz mono float32 - no temp files
+        try:
+            samples = await run_in_threadpool(decode_audio, audio_data, ext, max_seconds)
+        except AudioDecodeError as e:
+            print(f"[Transcribe] Decode failed: {e}")
+            raise HTTPException(
+                status_code=400,
+                detail="Could not decode audio. Please record again and retry."
+            )
         
-        print(f"[Transcribe] Saved temp file: {temp_input}")
+        print(f"[Transcribe] Decoded {len(samples) / SAMPLE_RATE:.1f}s of audio")
+        peak_bytes = len(audio_data) + samples.nbytes
+        audio_data = None  # Only the samples are needed from here on
+        if len(samples) > max_seconds * SAMPLE_RATE:
+            raise _too_long()
         
-        # Convert to WAV for better compatibility
-        temp_wav = temp_input.replace(ext, '.wav')
-        if ext != '.wav':
-            print("[Transcribe] Converting to WAV...")
-            # Run in threadpool to avoid blocking event loop
-            is_converted = await run_in_threadpool(convert_audio_to_wav, temp_input, temp_wav)
-            if is_converted:
-                print("[Transcribe] Conversion successful")
-                transcribe_path = temp_wav
-            else:
-                print("[Transcribe] Conversion failed, using original file")
-                transcribe_path = temp_input
+        # Drop silence and split at pauses; all-silent uploads never reach Whisper
+        if settings.VOICE_VAD_ENABLED:
+            chunks = await run_in_threadpool(speech_chunks, samples)
+            if not chunks:
+                silent_uploads.inc()
+                raise HTTPException(
+                    status_code=400,
+                    detail="No speech detected. Please speak clearly and try again."
+                )
+            speech_samples = sum(len(chunk) for chunk, _ in chunks)
+            trimmed_silence.inc((len(samples) - speech_samples) / SAMPLE_RATE)
+            peak_bytes = max(peak_bytes, samples.nbytes + sum(chunk.nbytes for chunk, _ in chunks))
+            samples = None
+            print(f"[Transcribe] {speech_samples / SAMPLE_RATE:.1f}s of speech in {len(chunks)} chunk(s)")
         else:
-            transcribe_path = temp_input
+            chunks = [(samples, None)]
         
-        # Prepare transcription options
-        options = {
-            "fp16": False,  # Use FP32 for better compatibility
-        }
+        # Pick a model tier for the current load - waits off the event loop
+        # if it is still loading
+        speech_seconds = sum(len(chunk) for chunk, _ in chunks) / SAMPLE_RATE
+        tier = whisper_service.select_tier(speech_seconds, quality)
+        model = await run_in_threadpool(get_whisper_model, tier)
+        whisper_service.tier_requests[tier].inc()
+        print(f"[Transcribe] Using model tier: {tier}")
         
-        # Set language if provided
+        # Prepare transcription options
+        options = _whisper_options(language)
         if language:
-            lang_map = {
-                'hi': 'Hindi',
-                'en': 'English',
-                'hi-IN': 'Hindi',
-                'en-US': 'English',
-            }
-            if language in lang_map:
-                options['language'] = lang_map[language]
-            else:
-                options['language'] = language
             print(f"[Transcribe] Using language: {options.get('language')}")
         
         # Transcribe
         print("[Transcribe] Starting transcription...")
-        # Run in threadpool to avoid blocking event loop
-        result = await run_in_threadpool(model.transcribe, transcribe_path, **options)
+        # Run on the dedicated transcription pool
+        try:
+            results = []
+            for chunk, speech_map in chunks:
+                chunk_result = await whisper_service.transcribe(model, chunk, **options)
+                results.append((chunk_result, speech_map))
+                chunk_text = chunk_result.get("text", "").strip()
+                if on_chunk_text and chunk_text:
+                    on_chunk_text(chunk_text)
+        except ExecutorSaturated as e:
+            raise _transcription_busy(e.retry_after)
+        result = merge_results(results)
         
         transcript = result.get("text", "").strip()
-        detected_language = result.get("language", language or "unknown")
+        detected_language = result.get("language") or language or "unknown"
         
         print(f"[Transcribe] Result: {transcript[:100]}..." if len(transcript) > 100 else f"[Transcribe] Result: {transcript}")
         
@@ -243,12 +380,17 @@ async def transcribe_audio(
         if result.get("segments"):
             duration = result["segments"][-1].get("end", 0.0)
         
-        return TranscriptionResponse(
+        response = TranscriptionResponse(
             transcript=transcript,
             language=detected_language,
             confidence=0.9,  # Whisper doesn't provide confidence scores
-            duration=duration
+            duration=duration,
+            model=tier
         )
+        transcribe_peak_bytes.observe(peak_bytes)
+        cache_key = transcription_key(digest, language, whisper_service.variant(tier))
+        await run_in_threadpool(transcription_cache.set, cache_key, response.model_dump())
+        return response
         
     except HTTPException:
         raise
@@ -258,14 +400,94 @@ async def transcribe_audio(
             status_code=500,
             detail=f"Transcription failed: {str(e)}"
         )
+
+
+def _is_end_message(text: str) -> bool:
+    """True for the stream's end-of-audio control message ("end" or {"type": "end"})"""
+    text = text.strip()
+    if text.startswith("{"):
+        try:
+            text = str(json.loads(text).get("type", ""))
+        except (ValueError, AttributeError):
+            return False
+    return text.lower() in ("end", "stop")
+
+
+@router.websocket("/stream")
+async def stream_transcription(
+    websocket: WebSocket,
+    language: Optional[str] = None,
+    format: str = "webm",
+):
+    """
+    Transcribe audio while it is being recorded.
+    
+    Send audio as binary messages - MediaRecorder chunks (webm/ogg) or raw
+    16kHz mono 16-bit PCM with ?format=pcm16 - then the text message "end".
+    
+    Server messages (JSON):
+    - {"type": "partial", "text"} - current guess for the unfinished tail
+    - {"type": "final", "text", "start", "end"} - committed segment text
+    - {"type": "done", "transcript", "language", "duration"} - full result
+    - {"type": "error", "detail"}
+    """
+    await websocket.accept()
+    
+    try:
+        model = await run_in_threadpool(get_whisper_model)
+    except HTTPException as e:
+        await websocket.send_json({"type": "error", "detail": e.detail})
+        await websocket.close(code=1011)
+        return
+    
+    options = _whisper_options(language)
+    
+    async def transcribe(samples):
+        return await whisper_service.transcribe(model, samples, batch=False, **options)
+    
+    session = StreamingTranscriber(
+        transcribe,
+        input_format=format,
+        step_seconds=settings.VOICE_STREAM_STEP_SECONDS,
+        window_seconds=settings.VOICE_STREAM_WINDOW_SECONDS,
+        max_seconds=settings.VOICE_STREAM_MAX_SECONDS,
+        max_bytes=settings.VOICE_MAX_UPLOAD_BYTES
+    )
+    
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes"):
+                await session.add_chunk(message["bytes"])
+                for event in await session.step():
+                    await websocket.send_json(event)
+            elif message.get("text") is not None and _is_end_message(message["text"]):
+                break
+        
+        for event in await session.finish():
+            await websocket.send_json(event)
+        print(f"[Stream] Transcribed {session.duration:.1f}s of audio")
+    except WebSocketDisconnect:
+        return
+    except StreamTooLong as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+    except ExecutorSaturated as e:
+        await websocket.send_json({
+            "type": "error",
+            "detail": "Transcription service is busy. Please try again shortly.",
+            "retry_after": e.retry_after,
+        })
+    except AudioDecodeError as e:
+        await websocket.send_json({"type": "error", "detail": f"Could not decode audio: {str(e)}"})
+    except Exception as e:
+        print(f"[Stream] Error: {e}")
+        await websocket.send_json({"type": "error", "detail": f"Transcription failed: {str(e)}"})
     finally:
-        # Cleanup temp files
-        for temp_file in [temp_input, temp_wav]:
-            if temp_file and os.path.exists(temp_file):
-                try:
-                    os.unlink(temp_file)
-                except Exception as e:
-                    print(f"[Transcribe] Failed to cleanup {temp_file}: {e}")
+        session.close()
+    
+    await websocket.close()
 
 
 # ============================================================================
@@ -325,6 +547,50 @@ async def chat_with_asha_didi(
         )
 
 
+@router.post("/chat/stream")
+async def stream_chat_with_asha_didi(
+    request: ChatRequest,
+    current_user: Optional[User] = Depends(get_current_user_optional),
+):
+    """
+    Streaming chat with ASHA Didi over Server-Sent Events.
+    
+    Emits a `meta` event (isEmergency, intent, category), `token` events as
+    the reply is generated, and a final `done` event with the full message
+    (or `error` with a fallback message). Emergencies are answered at once.
+    """
+    if not request.message or not request.message.strip():
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+    
+    # Normalize language
+    lang = request.language.lower().strip()
+    if lang in ['hindi', 'hi-in']:
+        lang = 'hi'
+    elif lang in ['english', 'en-us']:
+        lang = 'en'
+    request.language = lang
+    
+    started = time.perf_counter()
+    
+    async def event_stream():
+        first_token = True
+        async for event, data in gemini_service.stream_chat_with_asha_didi(
+            user_message=request.message,
+            conversation_history=request.conversation_history,
+            language=request.language
+        ):
+            if event == 'token' and first_token:
+                chat_stream_ttfb.observe(time.perf_counter() - started)
+                first_token = False
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # ============================================================================
 # Voice Processing Endpoint (Transcribe + Extract Data)
 # ============================================================================
@@ -334,32 +600,57 @@ async def process_voice(
     audio: Optional[UploadFile] = File(None, description="Audio file to process"),
     transcription: Optional[str] = Form(None, description="Pre-transcribed text"),
     language: str = Form("hi", description="Language code"),
+    quality: Optional[str] = Form(None, description="Model hint: fast, accurate or a tier name"),
+    pipelined: Optional[bool] = Form(None, description="Extract while transcribing (default: server setting)"),
     current_user: Optional[User] = Depends(get_current_user_optional),
 ):
     """
     Process voice recording:
     - Option A: Upload audio file → transcribe → extract data
     - Option B: Submit transcription → extract data
+    
+    In pipelined mode, each speech chunk is sent for extraction as soon as
+    it is transcribed, and the partial results are merged at the end.
     """
     result_transcription = transcription
+    if pipelined is None:
+        pipelined = settings.VOICE_PROCESS_PIPELINED
+    partial_extractions: List[asyncio.Task] = []
     
-    # If audio file provided, transcribe it first
-    if audio and audio.filename:
-        print(f"[Process] Transcribing audio file: {audio.filename}")
-        transcribe_response = await transcribe_audio(audio, language, current_user)
-        result_transcription = transcribe_response.transcript
-    
-    if not result_transcription or not result_transcription.strip():
-        raise HTTPException(status_code=400, detail="No transcription provided or detected")
+    def extract_chunk(text: str) -> None:
+        partial_extractions.append(asyncio.create_task(gemini_service.extract_visit_data(text)))
     
-    print(f"[Process] Extracting data from: {result_transcription[:100]}...")
-    
-    # Extract structured data
     try:
-        extracted_data = await gemini_service.extract_visit_data(result_transcription)
-    except Exception as e:
-        print(f"[Process] Extraction error: {e}")
-        extracted_data = {}
+        # If audio file provided, transcribe it first
+        if audio and audio.filename:
+            print(f"[Process] Transcribing audio file: {audio.filename}")
+            transcribe_response = await _transcribe_upload(
+                audio, language, quality, extract_chunk if pipelined else None
+            )
+            result_transcription = transcribe_response.transcript
+        
+        if not result_transcription or not result_transcription.strip():
+            raise HTTPException(status_code=400, detail="No transcription provided or detected")
+        
+        print(f"[Process] Extracting data from: {result_transcription[:100]}...")
+        
+        # Extract structured data
+        extracted_data = None
+        if partial_extractions:
+            # Only the merge is left; fall back to one full extraction if a piece failed
+            parts = await asyncio.gather(*partial_extractions, return_exceptions=True)
+            if all(isinstance(part, dict) and part for part in parts):
+                extracted_data = merge_visit_data(parts)
+                print(f"[Process] Merged {len(parts)} partial extraction(s)")
+        if extracted_data is None:
+            try:
+                extracted_data = await gemini_service.extract_visit_data(result_transcription)
+            except Exception as e:
+                print(f"[Process] Extraction error: {e}")
+                extracted_data = {}
+    finally:
+        for task in partial_extractions:
+            task.cancel()
     
     # Detect missing fields for follow-up
     missing_fields = []
@@ -420,72 +711,115 @@ async def process_voice(
 async def log_chat_interaction(
     data: ChatLogRequest,
     current_user: Optional[User] = Depends(get_current_user_optional),
-    db: AsyncSession = Depends(get_db),
 ):
     """
     Log a voice/chat interaction.
     Stores the interaction for history and analytics.
+    
+    The row is queued and written in bulk shortly after; its id is
+    returned immediately.
     """
-    from app.apps.voice.models import ChatLog
+    return _queue_chat_log(data, current_user)
+
+
+@router.post("/log/batch", response_model=ChatLogBatchResponse, status_code=status.HTTP_201_CREATED)
+async def log_chat_interactions(
+    data: ChatLogBatchRequest,
+    current_user: Optional[User] = Depends(get_current_user_optional),
+):
+    """
+    Log a backlog of interactions in one request (e.g. recorded offline).
+    Set created_at on each turn to keep its original time.
+    """
+    if len(data.logs) > MAX_LOG_BATCH:
+        raise HTTPException(status_code=400, detail=f"Too many logs (max {MAX_LOG_BATCH} per request)")
     
+    return ChatLogBatchResponse(
+        logged=[_queue_chat_log(log, current_user) for log in data.logs]
+    )
+
+
+def _queue_chat_log(data: ChatLogRequest, current_user: Optional[User]) -> ChatLogResponse:
+    """Normalize a chat turn and add it to the write-behind buffer"""
     # Normalize language
     lang = data.language_used.lower().strip()
     if lang in ['hindi', 'hi-in']:
         data.language_used = 'hi'
     elif lang in ['english', 'en-us']:
         data.language_used = 'en'
-
-    try:
-        chat_log = ChatLog(
-            user_id=current_user.id if current_user else None,
-            beneficiary_id=data.beneficiary_id,
-            user_message=data.user_message,
-            ai_response=data.ai_response,
-            language_used=data.language_used,
-            is_emergency=data.is_emergency,
-            intent=data.intent,
-            category=data.category,
-        )
-        
-        db.add(chat_log)
-        await db.commit()
-        await db.refresh(chat_log)
-        
-        return ChatLogResponse(
-            id=str(chat_log.id),
-            logged_at=chat_log.created_at.isoformat()
-        )
-        
-    except Exception as e:
-        print(f"[Log] Error: {e}")
-        await db.rollback()
-        raise HTTPException(status_code=500, detail="Failed to log interaction")
+    
+    row = chat_log_buffer.add({
+        "user_id": current_user.id if current_user else None,
+        "beneficiary_id": data.beneficiary_id,
+        "user_message": data.user_message,
+        "ai_response": data.ai_response,
+        "language_used": data.language_used,
+        "is_emergency": data.is_emergency,
+        "intent": data.intent,
+        "category": data.category,
+        "created_at": data.created_at,
+    })
+    
+    return ChatLogResponse(
+        id=str(row["id"]),
+        logged_at=row["created_at"].isoformat()
+    )
 
 
 # ============================================================================
 # Chat History Endpoint
 # ============================================================================
 
+async def _require_linked_beneficiary(db: AsyncSession, current_user: User, beneficiary_id: str) -> None:
+    """
+    403 unless beneficiary_id names a beneficiary linked to this ASHA worker,
+    by profile id or by the beneficiary's user id (what their own chats log).
+    """
+    try:
+        beneficiary_uuid = uuid.UUID(beneficiary_id)
+    except ValueError:
+        beneficiary_uuid = None
+    if beneficiary_uuid is not None:
+        result = await db.execute(
+            select(BeneficiaryProfile.id).where(
+                or_(BeneficiaryProfile.id == beneficiary_uuid, BeneficiaryProfile.user_id == beneficiary_uuid),
+                BeneficiaryProfile.linked_asha_id == current_user.id
+            ).limit(1)
+        )
+        if result.scalar_one_or_none() is not None:
+            return
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="You can only view your linked beneficiaries' chats"
+    )
+
+
 @router.get("/history")
 async def get_chat_history(
+    response: Response,
     limit: int = 20,
     beneficiary_id: Optional[str] = None,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
     Get chat history for the current user.
-    ASHA workers can filter by beneficiary_id.
+    ASHA workers can filter by beneficiary_id, for their linked beneficiaries.
+    Older pages are fetched by passing the X-Next-Cursor header as `cursor`.
     """
     from app.apps.voice.models import ChatLog
     
+    sort_keys = ((ChatLog.created_at, True), (ChatLog.id, True))
+    
     try:
-        query = select(ChatLog).order_by(desc(ChatLog.created_at)).limit(limit)
+        query = select(ChatLog)
         
         # Filter based on user role
-        if current_user.role == "asha":
+        if current_user.role == "asha_worker":
             # ASHA workers see chats they logged or their beneficiaries' chats
             if beneficiary_id:
+                await _require_linked_beneficiary(db, current_user, beneficiary_id)
                 query = query.where(ChatLog.beneficiary_id == beneficiary_id)
             else:
                 query = query.where(ChatLog.user_id == current_user.id)
@@ -493,8 +827,10 @@ async def get_chat_history(
             # Beneficiaries only see their own chats
             query = query.where(ChatLog.beneficiary_id == str(current_user.id))
         
+        query = paginate(query, sort_keys, cursor, 0, limit)
         result = await db.execute(query)
         logs = result.scalars().all()
+        set_next_cursor(response, logs, sort_keys, limit)
         
         return [
             {
@@ -510,36 +846,96 @@ async def get_chat_history(
             for log in logs
         ]
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[History] Error: {e}")
         return []
 
 
+# ============================================================================
+# Chat Search Endpoint
+# ============================================================================
+
+# Roles that may search every chat (supervisors)
+SEARCH_ALL_ROLES = ("admin", "partner")
+
+
+@router.get("/search")
+async def search_chat_history(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    beneficiary_id: Optional[str] = None,
+    emergency_only: bool = False,
+    since: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Full-text search over chat history, best matches first.
+    Hindi words match in Devanagari or romanized spelling ("khoon" finds "खून").
+    Access follows /history; admins and partners can search every chat.
+    """
+    user_id = None
+    if current_user.role == "asha_worker":
+        # ASHA workers search chats they logged or their beneficiaries' chats
+        if beneficiary_id:
+            await _require_linked_beneficiary(db, current_user, beneficiary_id)
+        else:
+            user_id = current_user.id
+    elif current_user.role not in SEARCH_ALL_ROLES:
+        # Beneficiaries only search their own chats
+        beneficiary_id = str(current_user.id)
+    
+    try:
+        hits = await search_chats(
+            db, q, limit,
+            user_id=user_id,
+            beneficiary_id=beneficiary_id,
+            emergency_only=emergency_only,
+            since=since
+        )
+        
+        return [
+            {
+                "id": str(row["id"]),
+                "user_message": row["user_message"],
+                "ai_response": row["ai_response"],
+                "language": row["language_used"],
+                "is_emergency": row["is_emergency"],
+                "intent": row["intent"],
+                "category": row["category"],
+                "created_at": row["created_at"].isoformat(),
+                "rank": round(rank, 4),
+            }
+            for row, rank in hits
+        ]
+        
+    except Exception as e:
+        print(f"[Search] Error: {e}")
+        raise HTTPException(status_code=500, detail="Search failed")
+
+
 # ============================================================================
 # Emergency Count Endpoint
 # ============================================================================
 
 @router.get("/emergency-count")
 async def get_emergency_count(
+    day: Optional[date] = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
     Get count of emergency interactions for ASHA worker's dashboard.
+    All-time by default, or for one UTC day with ?day=YYYY-MM-DD.
     """
-    from app.apps.voice.models import ChatLog
-    from sqlalchemy import func
-    
-    if current_user.role != "asha":
+    if current_user.role != "asha_worker":
         raise HTTPException(status_code=403, detail="Only ASHA workers can access this endpoint")
     
     try:
-        query = select(func.count(ChatLog.id)).where(
-            ChatLog.user_id == current_user.id,
-            ChatLog.is_emergency == True
-        )
-        result = await db.execute(query)
-        count = result.scalar() or 0
+        # Maintained incrementally - no scan of the chat history
+        count = await counters.read(db, EMERGENCY_CHATS, current_user.id, day)
         
         return {"emergency_count": count}
         
@@ -0,0 +1,399 @@
+"""
+Full-text search over AI chat history.
+
+Messages mix Devanagari Hindi, romanized Hindi and English ("khoon",
+"खून", "bleeding"), so Postgres' own parsers and stemmers don't fit. Text
+is tokenized here instead. Every word is indexed as itself plus a
+phonetic key: its Latin transliteration folded so that common spellings
+meet, e.g. खून / khoon / khun. Both forms go into a stored tsvector
+column on ai_chat_history (user_message weighted A, ai_response B)
+behind a GIN index. A query matches rows containing every query word in
+either form, ranked with ts_rank_cd.
+
+Searches rank only the CHAT_SEARCH_CANDIDATES most recent matches. That
+bounds the ts_rank_cd work (which reads each row's vector) and the final
+sort, not the whole query: the candidate subquery still reads every GIN
+match and top-N sorts them by created_at, so a very common word without
+other filters costs a pass over all of its matches.
+
+Vectors are built when the chat log buffer writes rows. Rows logged
+before this existed are indexed by index_backlog() in the background; a
+partial index over the rows still missing a vector keeps that job's scan
+(and its no-op run at every later startup) proportional to the backlog.
+
+InvertedIndex is an in-process equivalent for tests and local
+development (CHAT_SEARCH_BACKEND=memory).
+"""
+import asyncio
+import math
+import re
+import unicodedata
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import cast, func, select, update
+from sqlalchemy.dialects.postgresql import TSQUERY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.database import async_session_maker
+from app.apps.voice.models import ChatLog
+
+settings = get_settings()
+
+# Columns returned for each search hit
+RESULT_COLUMNS = (
+    "id", "user_id", "beneficiary_id", "user_message", "ai_response",
+    "language_used", "is_emergency", "intent", "category", "created_at",
+)
+
+# Words: letters/digits in any script, plus Devanagari combining marks
+# (matras, virama, nukta), which Python doesn't count as word characters
+_WORD = re.compile(r"(?:[^\W_]|[ऀ-ॣ०-ॿ])+")
+_DEVANAGARI = re.compile(r"[ऀ-ॿ]")
+
+# Phonetic keys are stored with this prefix so they never collide with words
+KEY_PREFIX = "~"
+
+# Positions a tsvector keeps per lexeme
+_MAX_POSITIONS = 256
+_MAX_POSITION = 16383
+# Postgres refuses lexemes of 2048 bytes or more (to_tsvector skips such
+# words) and tsvectors of 1MB or more; stay under both
+_MAX_LEXEME_BYTES = 2047
+_MAX_VECTOR_BYTES = 1000000
+
+_CONSONANTS = {
+    "क": "k", "ख": "kh", "ग": "g", "घ": "gh", "ङ": "n",
+    "च": "ch", "छ": "chh", "ज": "j", "झ": "jh", "ञ": "n",
+    "ट": "t", "ठ": "th", "ड": "d", "ढ": "dh", "ण": "n",
+    "त": "t", "थ": "th", "द": "d", "ध": "dh", "न": "n",
+    "प": "p", "फ": "ph", "ब": "b", "भ": "bh", "म": "m",
+    "य": "y", "र": "r", "ल": "l", "व": "v",
+    "श": "sh", "ष": "sh", "स": "s", "ह": "h",
+}
+# Consonant + nukta (NFC keeps these decomposed)
+_NUKTA_CONSONANTS = {
+    "क": "q", "ख": "kh", "ग": "g", "ज": "z", "ड": "r", "ढ": "rh", "फ": "f", "य": "y",
+}
+_VOWELS = {
+    "अ": "a", "आ": "aa", "इ": "i", "ई": "ii", "उ": "u", "ऊ": "uu", "ऋ": "ri",
+    "ए": "e", "ऐ": "ai", "ओ": "o", "औ": "au", "ऑ": "o",
+}
+_MATRAS = {
+    "ा": "aa", "ि": "i", "ी": "ii", "ु": "u", "ू": "uu", "ृ": "ri",
+    "े": "e", "ै": "ai", "ो": "o", "ौ": "au", "ॉ": "o", "ॅ": "e",
+}
+_NUKTA = "़"
+_VIRAMA = "्"
+_NASALS = {"ं": "n", "ँ": "n", "ः": "h"}
+
+# Spelling variants folded by phonetic_key, applied in order
+_FOLDS = (
+    (re.compile(r"ee|ii"), "i"),
+    (re.compile(r"oo|uu"), "u"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"z"), "j"),
+    (re.compile(r"q"), "k"),
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"([bcdfgjklmnprstvxy])h"), r"\1"),  # aspiration: kh -> k, sh -> s
+)
+
+
+def transliterate(word: str) -> str:
+    """Rough Latin spelling of a Devanagari word (ITRANS-like)"""
+    out = []
+    chars = list(word)
+    i = 0
+    while i < len(chars):
+        ch = chars[i]
+        if ch in _CONSONANTS:
+            if i + 1 < len(chars) and chars[i + 1] == _NUKTA:
+                out.append(_NUKTA_CONSONANTS.get(ch, _CONSONANTS[ch]))
+                i += 1
+            else:
+                out.append(_CONSONANTS[ch])
+            # Inherent vowel unless a matra or virama follows
+            following = chars[i + 1] if i + 1 < len(chars) else ""
+            if following not in _MATRAS and following != _VIRAMA:
+                out.append("a")
+        elif ch in _VOWELS:
+            out.append(_VOWELS[ch])
+        elif ch in _MATRAS:
+            out.append(_MATRAS[ch])
+        elif ch in _NASALS:
+            out.append(_NASALS[ch])
+        elif not _DEVANAGARI.match(ch):
+            out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def phonetic_key(latin: str) -> str:
+    """
+    Fold a Latin spelling so common romanizations of one Hindi word meet:
+    long vowels and aspiration are merged, non-initial 'a' (often dropped
+    in Hindi speech and spelling) is removed and repeated letters
+    collapsed. "khoon", "khun" and खून all become "kun".
+    """
+    key = latin
+    for pattern, replacement in _FOLDS:
+        key = pattern.sub(replacement, key)
+    key = key[:1] + key[1:].replace("a", "")
+    return re.sub(r"(.)\1+", r"\1", key)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words of a message, in order"""
+    text = unicodedata.normalize("NFC", text or "").casefold()
+    text = text.replace("‌", "").replace("‍", "")  # ZWNJ/ZWJ
+    return _WORD.findall(text)
+
+
+def term_forms(token: str) -> List[str]:
+    """The lexemes a word is indexed (and searched) under, none if it is too long"""
+    forms = [token]
+    if not token.isdigit():
+        latin = transliterate(token) if _DEVANAGARI.search(token) else token
+        if latin.isascii() and len(latin) > 1:
+            key = phonetic_key(latin)
+            if len(key) > 1:
+                forms.append(KEY_PREFIX + key)
+    return [form for form in forms if len(form.encode("utf-8")) <= _MAX_LEXEME_BYTES]
+
+
+def _lexeme_positions(user_message: str, ai_response: str) -> Dict[str, List[str]]:
+    positions: Dict[str, List[str]] = {}
+    position = 0
+    size = 0  # bytes of the literal, which is never smaller than the stored vector
+    for text, weight in ((user_message, "A"), (ai_response, "B")):
+        for token in tokenize(text):
+            position = min(position + 1, _MAX_POSITION)
+            entry = f"{position}{weight}"
+            for form in term_forms(token):
+                entries = positions.get(form)
+                if entries is not None and len(entries) >= _MAX_POSITIONS:
+                    continue
+                # "'lexeme':entry " for a new lexeme, ",entry" for another position
+                cost = len(entry) + 1 + (len(_quote(form).encode("utf-8")) + 1 if entries is None else 0)
+                if size + cost > _MAX_VECTOR_BYTES:
+                    continue  # vector full
+                size += cost
+                positions.setdefault(form, []).append(entry)
+    return positions
+
+
+def _quote(lexeme: str) -> str:
+    return "'" + lexeme.replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def search_vector(user_message: str, ai_response: str) -> str:
+    """tsvector literal for a chat turn (user_message weight A, ai_response B)"""
+    return " ".join(
+        f"{_quote(lexeme)}:{','.join(entries)}"
+        for lexeme, entries in _lexeme_positions(user_message, ai_response).items()
+    )
+
+
+def parse_query(query: str) -> List[List[str]]:
+    """Search terms, each a list of alternative lexemes; all terms must match"""
+    terms = []
+    seen = set()
+    for token in tokenize(query):
+        forms = term_forms(token)
+        if token not in seen and forms:
+            seen.add(token)
+            terms.append(forms)
+    return terms
+
+
+def tsquery(terms: List[List[str]]) -> str:
+    """tsquery literal matching rows that contain every term"""
+    return " & ".join(
+        "(" + " | ".join(_quote(form) for form in forms) + ")"
+        for forms in terms
+    )
+
+
+class InvertedIndex:
+    """
+    In-process search over chat rows, with the same tokens and matching as
+    the Postgres index. Scores are tf-idf with user_message words counting
+    more than ai_response words, like the A/B weights.
+    """
+
+    WEIGHTS = {"A": 1.0, "B": 0.4}
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[Any, float]] = {}
+        self._rows: Dict[Any, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, row: Dict[str, Any]) -> None:
+        """Index a chat row (needs id, user_message and ai_response)"""
+        doc_id = row["id"]
+        self._rows[doc_id] = row
+        for lexeme, entries in _lexeme_positions(row["user_message"], row["ai_response"]).items():
+            score = sum(self.WEIGHTS[entry[-1]] for entry in entries)
+            self._postings.setdefault(lexeme, {})[doc_id] = score
+
+    def search(
+        self,
+        terms: List[List[str]],
+        limit: int = 20,
+        where: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        """Rows matching every term as (row, score), best first"""
+        if not terms:
+            return []
+        total = len(self._rows) or 1
+        scores: Optional[Dict[Any, float]] = None
+        for forms in terms:
+            term_scores: Dict[Any, float] = {}
+            for form in forms:
+                postings = self._postings.get(form, {})
+                idf = math.log(1 + total / (1 + len(postings)))
+                for doc_id, tf in postings.items():
+                    term_scores[doc_id] = max(term_scores.get(doc_id, 0.0), tf * idf)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc_id: s + term_scores[doc_id] for doc_id, s in scores.items() if doc_id in term_scores}
+            if not scores:
+                return []
+
+        results = [
+            (self._rows[doc_id], score) for doc_id, score in scores.items()
+            if where is None or where(self._rows[doc_id])
+        ]
+        results.sort(key=lambda item: (item[1], item[0].get("created_at") or datetime.min), reverse=True)
+        return results[:limit]
+
+
+# Used when CHAT_SEARCH_BACKEND is "memory"
+memory_index = InvertedIndex()
+
+
+def _utc_naive(timestamp: datetime) -> datetime:
+    """Buffered rows carry naive UTC times; compare everything that way"""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def _matches(
+    row: Dict[str, Any],
+    user_id: Any,
+    beneficiary_id: Optional[str],
+    emergency_only: bool,
+    since: Optional[datetime]
+) -> bool:
+    """The search filters applied to an in-memory row"""
+    if user_id is not None and row.get("user_id") != user_id:
+        return False
+    if beneficiary_id is not None and str(row.get("beneficiary_id")) != beneficiary_id:
+        return False
+    if emergency_only and not row.get("is_emergency"):
+        return False
+    if since is not None:
+        created_at = row.get("created_at")
+        if created_at is None or _utc_naive(created_at) < _utc_naive(since):
+            return False
+    return True
+
+
+async def search_chats(
+    db: AsyncSession,
+    query: str,
+    limit: int = 20,
+    user_id: Any = None,
+    beneficiary_id: Optional[str] = None,
+    emergency_only: bool = False,
+    since: Optional[datetime] = None
+) -> List[Tuple[Dict[str, Any], float]]:
+    """
+    Chat turns matching every word of `query`, as (row, rank) best first.
+    Rows are dicts of RESULT_COLUMNS; user_id/beneficiary_id restrict
+    whose chats are searched.
+    """
+    terms = parse_query(query)
+    if not terms:
+        return []
+
+    if settings.CHAT_SEARCH_BACKEND == "memory":
+        return memory_index.search(
+            terms, limit,
+            where=lambda row: _matches(row, user_id, beneficiary_id, emergency_only, since)
+        )
+
+    ts_query = cast(tsquery(terms), TSQUERY)
+    conditions = [ChatLog.search_vector.op("@@")(ts_query)]
+    if user_id is not None:
+        conditions.append(ChatLog.user_id == user_id)
+    if beneficiary_id is not None:
+        conditions.append(ChatLog.beneficiary_id == beneficiary_id)
+    if emergency_only:
+        conditions.append(ChatLog.is_emergency == True)
+    if since is not None:
+        conditions.append(ChatLog.created_at >= since)
+
+    candidates = (
+        select(ChatLog.id)
+        .where(*conditions)
+        .order_by(ChatLog.created_at.desc())
+        .limit(settings.CHAT_SEARCH_CANDIDATES)
+        .subquery()
+    )
+    rank = func.ts_rank_cd(ChatLog.search_vector, ts_query).label("rank")
+    result = await db.execute(
+        select(*(getattr(ChatLog, column) for column in RESULT_COLUMNS), rank)
+        .join(candidates, ChatLog.id == candidates.c.id)
+        .order_by(rank.desc(), ChatLog.created_at.desc())
+        .limit(limit)
+    )
+    return [
+        ({column: row[i] for i, column in enumerate(RESULT_COLUMNS)}, row[-1])
+        for row in result.all()
+    ]
+
+
+async def index_backlog(batch_size: int = 500, pause: float = 0.1) -> int:
+    """
+    Build search vectors for rows that don't have one yet, in small
+    committed batches walked in id order through the partial index
+    ix_ai_chat_history_unindexed. Rows locked by another worker running
+    the same job are skipped. Returns the number of rows indexed.
+    """
+    indexed = 0
+    last_id = None
+    try:
+        while True:
+            async with async_session_maker() as session:
+                query = (
+                    select(ChatLog.id, ChatLog.user_message, ChatLog.ai_response)
+                    .where(ChatLog.search_vector.is_(None))
+                    .order_by(ChatLog.id)
+                    .limit(batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+                if last_id is not None:
+                    query = query.where(ChatLog.id > last_id)
+                rows = (await session.execute(query)).all()
+                if not rows:
+                    break
+                await session.execute(update(ChatLog), [
+                    {"id": row.id, "search_vector": search_vector(row.user_message, row.ai_response)}
+                    for row in rows
+                ])
+                await session.commit()
+            indexed += len(rows)
+            last_id = rows[-1].id
+            await asyncio.sleep(pause)
+    except Exception as e:
+        print(f"[ChatSearch] Backfill stopped after {indexed} row(s): {e}")
+        return indexed
+    if indexed:
+        print(f"[ChatSearch] Indexed {indexed} existing chat row(s)")
+    return indexed
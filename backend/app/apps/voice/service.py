@@ -0,0 +1,258 @@
+"""
+Whisper speech-to-text model management.
+
+The model is loaded once per process, normally in the background right
+after startup so the first /voice/transcribe request doesn't pay for the
+torch model load. A lock guarantees a single load even when startup and
+early requests race, and the load status feeds the /ready endpoint.
+
+Inference runs on a dedicated, bounded worker pool rather than Starlette's
+shared thread pool, so Whisper jobs can't oversubscribe the CPU or starve
+other blocking calls; when the queue is full new jobs are rejected at once.
+With WHISPER_BATCH_SIZE > 1, short clips are micro-batched before they reach
+the pool (see batching.py).
+
+With WHISPER_TIERS set, several model sizes are held at once and each
+request is served by the tier that fits the current load (select_tier).
+WHISPER_QUANTIZE loads every tier as an INT8 model (see quantization.py).
+"""
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core import metrics
+from app.core.concurrency import BoundedExecutor
+from app.core.config import get_settings
+from app.apps.voice.batching import WINDOW_SAMPLES, TranscriptionBatcher, decode_batch
+from app.apps.voice.cache import TranscriptionCache
+
+settings = get_settings()
+
+# Inference can take from a fraction of a second to minutes
+INFERENCE_BUCKETS = (0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+# Load states reported by /ready
+NOT_LOADED = "not_loaded"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+# Client hints for select_tier
+FAST = "fast"
+ACCURATE = "accurate"
+
+
+def model_memory_bytes(model) -> int:
+    """Bytes held by a model's weights, including INT8 packed weights"""
+    total = 0
+    for value in model.state_dict().values():
+        tensors = value if isinstance(value, tuple) else (value,)
+        total += sum(t.numel() * t.element_size() for t in tensors if hasattr(t, "numel"))
+    return total
+
+
+class WhisperService:
+    """Owns the process-wide Whisper models, one per tier"""
+
+    def __init__(self, model_name: str, tiers: Optional[List[str]] = None):
+        # Tiers are ordered fastest first; the default model is always one
+        self.model_name = model_name
+        self.quantize = settings.WHISPER_QUANTIZE
+        self.tiers = list(tiers or [model_name])
+        if model_name not in self.tiers:
+            self.tiers.append(model_name)
+        self.status = NOT_LOADED
+        self.error: Optional[str] = None
+        self._models: Dict[str, Any] = {}
+        self._memory: Dict[str, int] = {}
+        self._locks = {tier: threading.Lock() for tier in self.tiers}
+        self._background_loads: Dict[str, asyncio.Task] = {}
+        self._failed_tiers: Set[str] = set()
+        self.tier_requests = {
+            tier: metrics.counter(f"transcription_tier_{tier}_total", f"Requests served by {tier}")
+            for tier in self.tiers
+        }
+        self.executor = BoundedExecutor(
+            "transcription",
+            max_workers=settings.WHISPER_WORKERS,
+            max_queue=settings.WHISPER_MAX_QUEUE,
+            retry_after=settings.WHISPER_RETRY_AFTER_SECONDS,
+            on_create=self._set_torch_threads,
+            run_buckets=INFERENCE_BUCKETS
+        )
+        self.batcher: Optional[TranscriptionBatcher] = None
+        if settings.WHISPER_BATCH_SIZE > 1:
+            self.batcher = TranscriptionBatcher(
+                self._decode_batch,
+                max_batch_size=settings.WHISPER_BATCH_SIZE,
+                max_wait_ms=settings.WHISPER_BATCH_WAIT_MS
+            )
+
+    @staticmethod
+    def _set_torch_threads() -> None:
+        # torch's intra-op pool is process-wide: every worker's jobs share it
+        if settings.WHISPER_TORCH_THREADS > 0:
+            import torch
+            torch.set_num_threads(settings.WHISPER_TORCH_THREADS)
+
+    @property
+    def is_ready(self) -> bool:
+        return self.model_name in self._models
+
+    def load(self, warm_up: bool = False, tier: Optional[str] = None):
+        """
+        Return the model for a tier (default: WHISPER_MODEL), loading it
+        first if needed. Blocking - call from a worker thread. Concurrent
+        callers wait for the same load.
+        """
+        tier = tier or self.model_name
+        model = self._models.get(tier)
+        if model is not None:
+            return model
+
+        is_default = tier == self.model_name
+        with self._locks[tier]:
+            if tier not in self._models:
+                if is_default:
+                    self.status = LOADING
+                try:
+                    print(f"[Whisper] Loading model: {tier}")
+                    if self.quantize:
+                        from app.apps.voice.quantization import load_quantized
+                        model = load_quantized(tier, settings.WHISPER_QUANTIZED_CACHE_DIR)
+                    else:
+                        import whisper
+                        model = whisper.load_model(tier)
+                    if warm_up:
+                        self._warm_up(model)
+                    self._memory[tier] = model_memory_bytes(model)
+                    self._models[tier] = model
+                    if is_default:
+                        self.status = READY
+                        self.error = None
+                    print(f"[Whisper] Model {tier} loaded ({self._memory[tier] / 2**20:.0f} MB)")
+                except Exception as e:
+                    if is_default:
+                        self.status = FAILED
+                        self.error = str(e)
+                    raise
+        return self._models[tier]
+
+    @staticmethod
+    def _warm_up(model) -> None:
+        """Run one inference on a second of silence to initialise kernels"""
+        import numpy as np
+        print("[Whisper] Warming up...")
+        model.transcribe(np.zeros(16000, dtype=np.float32), fp16=False, language="en")
+
+    def variant(self, tier: str) -> str:
+        """Name of the weights a tier runs with, for cache keys"""
+        return f"{tier}-int8" if self.quantize else tier
+
+    def select_tier(self, audio_seconds: float, hint: Optional[str] = None) -> str:
+        """
+        Pick the tier for a request. Starts from the default model (or the
+        client's hint), then steps down one tier for every
+        WHISPER_TIER_QUEUE_STEP jobs already queued and once more for audio
+        longer than WHISPER_TIER_LONG_AUDIO_SECONDS. While any tier is
+        loaded, the nearest loaded tier is used instead of waiting for a load,
+        and the chosen tier starts loading in the background so later
+        requests get it (tiers load lazily when WHISPER_PRELOAD is off).
+        """
+        if len(self.tiers) == 1:
+            return self.model_name
+
+        if hint in self.tiers:
+            index = self.tiers.index(hint)
+        elif hint == FAST:
+            index = 0
+        elif hint == ACCURATE:
+            index = len(self.tiers) - 1
+        else:
+            index = self.tiers.index(self.model_name)
+
+        if settings.WHISPER_TIER_QUEUE_STEP > 0:
+            index -= self.executor.queue_depth // settings.WHISPER_TIER_QUEUE_STEP
+        if audio_seconds > settings.WHISPER_TIER_LONG_AUDIO_SECONDS:
+            index -= 1
+        index = max(0, index)
+
+        loaded = [i for i, tier in enumerate(self.tiers) if tier in self._models]
+        if loaded and index not in loaded:
+            self._load_in_background(self.tiers[index])
+            # Prefer the faster of two equally distant tiers
+            index = min(loaded, key=lambda i: (abs(i - index), i))
+        return self.tiers[index]
+
+    def _load_in_background(self, tier: str) -> None:
+        """Start loading a tier unless it's loading already or failed before"""
+        if tier in self._background_loads or tier in self._failed_tiers:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        async def load() -> None:
+            try:
+                await run_in_threadpool(self.load, settings.WHISPER_WARMUP, tier)
+            except Exception as e:
+                self._failed_tiers.add(tier)
+                print(f"[Whisper] Background load of {tier} failed: {e}")
+            finally:
+                del self._background_loads[tier]
+
+        self._background_loads[tier] = loop.create_task(load())
+
+    async def transcribe(self, model, audio, batch: bool = True, **options: Any) -> Dict[str, Any]:
+        """
+        Run model.transcribe on the transcription pool, batching clips that
+        fit in one Whisper window when batching is enabled. Pass
+        batch=False when per-segment timestamps are needed.
+        Raises ExecutorSaturated when the queue is full.
+        """
+        if batch and self.batcher is not None and len(audio) <= WINDOW_SAMPLES:
+            return await self.batcher.submit(model, audio, options)
+        return await self.executor.run(model.transcribe, audio, **options)
+
+    async def _decode_batch(self, model, clips, options: Dict[str, Any]):
+        return await self.executor.run(decode_batch, model, clips, options)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False)
+
+    async def preload(self, warm_up: bool = False) -> None:
+        """Load (and optionally warm up) every tier without blocking the event loop"""
+        # Default first so /ready turns green as early as possible
+        for tier in [self.model_name] + [t for t in self.tiers if t != self.model_name]:
+            try:
+                await run_in_threadpool(self.load, warm_up, tier)
+            except Exception as e:
+                print(f"[Whisper] Preload of {tier} failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Loaded tiers and the memory each one holds"""
+        return {
+            "default": self.model_name,
+            "quantized": self.quantize,
+            "tiers": {
+                tier: {
+                    "loaded": tier in self._models,
+                    "memory_bytes": self._memory.get(tier, 0),
+                }
+                for tier in self.tiers
+            },
+            "total_memory_bytes": sum(self._memory.values()),
+        }
+
+
+# Singleton instances
+whisper_service = WhisperService(settings.WHISPER_MODEL, settings.whisper_tiers_list)
+metrics.register_collector("whisper_models", whisper_service.stats)
+transcription_cache = TranscriptionCache(
+    settings.TRANSCRIPTION_CACHE_SIZE,
+    settings.TRANSCRIPTION_CACHE_DIR
+)
+metrics.register_collector("transcription_cache", transcription_cache.stats)
@@ -0,0 +1,184 @@
+"""
+Incremental transcription for the /voice/stream WebSocket.
+
+Audio arrives in small chunks while the ASHA worker is still speaking.
+After every few seconds of new audio, the uncommitted tail (the sliding
+window) is transcribed and returned as a partial transcript. Once the
+window is long enough, every Whisper segment except the last one is
+committed as final and the window moves past it. Each pass therefore
+stays short, and most of the recording has been transcribed by the time
+it ends.
+
+Two input formats are accepted:
+- "pcm16": raw 16 kHz mono little-endian 16-bit samples, appended as-is
+- anything else (webm/ogg from MediaRecorder): the chunks together form
+  one growing container file, which is fed to a single ffmpeg process for
+  the whole connection, so every byte is decoded once
+
+Only the uncommitted window is kept in memory, and new samples are joined
+onto it when a pass is due rather than on every chunk.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.core.concurrency import ExecutorSaturated
+from app.apps.voice.audio import SAMPLE_RATE, FFmpegStreamDecoder
+
+PCM16 = "pcm16"
+
+Transcribe = Callable[[np.ndarray], Awaitable[Dict[str, Any]]]
+
+
+class StreamTooLong(Exception):
+    """Raised when a stream exceeds its byte or duration limit"""
+
+
+class StreamingTranscriber:
+    """
+    Per-connection sliding-window transcription state.
+
+    `add_chunk()` buffers audio, `step()` returns partial/final events when
+    enough new audio has arrived, and `finish()` finalizes the rest.
+    `close()` stops the connection's ffmpeg process if it's still running.
+    """
+
+    def __init__(
+        self,
+        transcribe: Transcribe,
+        input_format: str = "webm",
+        step_seconds: float = 2.0,
+        window_seconds: float = 20.0,
+        max_seconds: float = 600.0,
+        max_bytes: int = 25 * 1024 * 1024
+    ):
+        self._transcribe = transcribe
+        self.input_format = input_format
+        self.step_samples = int(step_seconds * SAMPLE_RATE)
+        self.window_samples = int(window_seconds * SAMPLE_RATE)
+        self.max_samples = int(max_seconds * SAMPLE_RATE)
+        self.max_bytes = max_bytes
+
+        self._decoder = None if input_format == PCM16 else FFmpegStreamDecoder()
+        self._pcm_remainder = b""       # odd trailing byte of a pcm16 chunk
+        self._received_bytes = 0
+
+        self._new: List[np.ndarray] = []  # decoded samples not yet in the window
+        self._window = np.zeros(0, dtype=np.float32)  # samples from _offset on
+        self._total = 0                 # samples decoded so far
+        self._offset = 0                # first uncommitted sample
+        self._last_pass = 0             # sample count at the previous pass
+        self.final_text: List[str] = []
+        self.language: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return self._total / SAMPLE_RATE
+
+    @property
+    def transcript(self) -> str:
+        return " ".join(self.final_text)
+
+    def _append(self, samples: np.ndarray) -> None:
+        if not len(samples):
+            return
+        self._new.append(samples)
+        self._total += len(samples)
+        if self._total > self.max_samples:
+            raise StreamTooLong("Audio stream too long")
+
+    async def add_chunk(self, chunk: bytes) -> None:
+        """
+        Buffer an audio chunk. Raises StreamTooLong past the limits and
+        AudioDecodeError when ffmpeg rejects the stream.
+        """
+        self._received_bytes += len(chunk)
+        if self._received_bytes > self.max_bytes:
+            raise StreamTooLong("Audio stream too large")
+
+        if self._decoder is None:
+            data = self._pcm_remainder + chunk
+            usable = len(data) - len(data) % 2
+            self._pcm_remainder = data[usable:]
+            self._append(np.frombuffer(data[:usable], dtype="<i2").astype(np.float32) / 32768.0)
+        else:
+            await self._decoder.feed(chunk)
+            self._append(self._decoder.take())
+
+    def _merge(self) -> None:
+        if self._new:
+            self._window = np.concatenate([self._window, *self._new])
+            self._new = []
+
+    async def _pass(self) -> Dict[str, Any]:
+        self._merge()
+        self._last_pass = self._total
+        result = await self._transcribe(self._window)
+        self.language = result.get("language") or self.language
+        return result
+
+    def _commit(self, segments: List[Dict[str, Any]], upto: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Mark segments as final and move the window to `upto` seconds into it"""
+        text = " ".join(s.get("text", "").strip() for s in segments).strip()
+        start = self._offset / SAMPLE_RATE
+        if upto is None:
+            self._offset = self._total
+            self._window = self._window[:0]
+        else:
+            shift = int(upto * SAMPLE_RATE)
+            self._offset += shift
+            self._window = self._window[shift:]
+        if not text:
+            return None
+        self.final_text.append(text)
+        return {
+            "type": "final",
+            "text": text,
+            "start": round(start + segments[0].get("start", 0.0), 2),
+            "end": round(start + segments[-1].get("end", 0.0), 2),
+        }
+
+    async def step(self) -> List[Dict[str, Any]]:
+        """Transcribe the window if enough new audio has arrived since the last pass"""
+        if self._total - self._last_pass < self.step_samples:
+            return []
+
+        try:
+            result = await self._pass()
+        except ExecutorSaturated:
+            # Skip this partial; the next chunk will try again
+            return []
+
+        events = []
+        segments = result.get("segments") or []
+        partial = result.get("text", "").strip()
+        if self._total - self._offset >= self.window_samples and len(segments) > 1:
+            event = self._commit(segments[:-1], upto=segments[-1].get("start", 0.0))
+            if event:
+                events.append(event)
+            partial = segments[-1].get("text", "").strip()
+        events.append({"type": "partial", "text": partial})
+        return events
+
+    async def finish(self) -> List[Dict[str, Any]]:
+        """Finalize everything left in the window"""
+        if self._decoder is not None:
+            self._append(await self._decoder.close())
+        events = []
+        if self._total > self._offset:
+            result = await self._pass()
+            event = self._commit(result.get("segments") or [{"text": result.get("text", "")}])
+            if event:
+                events.append(event)
+        events.append({
+            "type": "done",
+            "transcript": self.transcript,
+            "language": self.language or "unknown",
+            "duration": round(self.duration, 2),
+        })
+        return events
+
+    def close(self) -> None:
+        """Release the decoder (safe to call more than once)"""
+        if self._decoder is not None:
+            self._decoder.kill()
@@ -0,0 +1,177 @@
+"""
+Energy-based voice activity detection for Whisper input.
+
+Field recordings often have long stretches of silence: before the ASHA
+worker starts speaking, after they stop, and during pauses. This pre-pass
+finds the speech regions from short-frame energy, drops the silence
+between them, and splits long recordings at pauses into chunks no longer
+than one Whisper window. Each chunk keeps a SpeechMap, so timestamps in
+the trimmed audio can be translated back to the original recording.
+"""
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.apps.voice.audio import SAMPLE_RATE
+
+FRAME_SAMPLES = 480             # 30 ms frames
+MIN_SPEECH_DB = -50.0           # Anything quieter is silence, whatever the noise floor
+SPEECH_MARGIN_DB = 10.0         # Speech must be this far above the noise floor...
+PEAK_MARGIN_DB = 25.0           # ...but never needs to be within this of the peak
+MIN_SPEECH_FRAMES = 8           # 240 ms - shorter bursts are clicks/noise
+MIN_SILENCE_FRAMES = 17         # ~500 ms - shorter gaps are kept inside a region
+PAD_FRAMES = 7                  # ~200 ms kept around each region
+MAX_CHUNK_SECONDS = 30          # One Whisper window
+SPLIT_SEARCH_SECONDS = 5        # Over-long regions are cut at the quietest frame this close to the limit
+
+
+class Region(NamedTuple):
+    start: int  # sample offsets in the original audio
+    end: int
+
+
+class SpeechMap:
+    """Maps times in trimmed audio back to the original recording"""
+
+    def __init__(self, regions: List[Region]):
+        self.regions = regions
+        self._out_starts: List[int] = []
+        position = 0
+        for region in regions:
+            self._out_starts.append(position)
+            position += region.end - region.start
+
+    def to_source(self, seconds: float, end: bool = False) -> float:
+        """
+        Original-recording time for a time in the trimmed audio. With
+        end=True, a time on a region boundary resolves to the end of the
+        earlier region instead of the start of the next one.
+        """
+        if not self.regions:
+            return seconds
+        sample = seconds * SAMPLE_RATE
+        find = bisect_left if end else bisect_right
+        index = max(0, find(self._out_starts, sample) - 1)
+        region = self.regions[index]
+        source = region.start + min(sample - self._out_starts[index], region.end - region.start)
+        return source / SAMPLE_RATE
+
+
+def frame_energy_db(samples: np.ndarray) -> np.ndarray:
+    """RMS level of each 30 ms frame in dBFS"""
+    count = -(-len(samples) // FRAME_SAMPLES)
+    padded = np.zeros(count * FRAME_SAMPLES, dtype=np.float32)
+    padded[:len(samples)] = samples
+    frames = padded.reshape(count, FRAME_SAMPLES)
+    rms = np.sqrt(np.mean(frames * frames, axis=1) + 1e-10)
+    return 20.0 * np.log10(rms)
+
+
+def _runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """(start, end) frame ranges where mask is True"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+def detect_speech(samples: np.ndarray) -> List[Region]:
+    """Speech regions (in samples) of a 16 kHz recording; empty if all silent"""
+    if len(samples) == 0:
+        return []
+    energy = frame_energy_db(samples)
+    noise_floor = float(np.percentile(energy, 10))
+    peak = float(energy.max())
+    threshold = max(MIN_SPEECH_DB, min(noise_floor + SPEECH_MARGIN_DB, peak - PEAK_MARGIN_DB))
+
+    # Merge runs separated by short gaps, then drop short bursts
+    merged: List[List[int]] = []
+    for start, end in _runs(energy > threshold):
+        if merged and start - merged[-1][1] < MIN_SILENCE_FRAMES:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    regions: List[Region] = []
+    for start, end in merged:
+        if end - start < MIN_SPEECH_FRAMES:
+            continue
+        start = max(0, start - PAD_FRAMES) * FRAME_SAMPLES
+        end = min(len(samples), (end + PAD_FRAMES) * FRAME_SAMPLES)
+        if regions and start <= regions[-1].end:
+            regions[-1] = Region(regions[-1].start, end)
+        else:
+            regions.append(Region(start, end))
+    return regions
+
+
+def _split_region(samples: np.ndarray, region: Region, max_samples: int) -> List[Region]:
+    """
+    Cut a region longer than max_samples into pieces that fit. Each cut
+    goes at the quietest frame in the last SPLIT_SEARCH_SECONDS before the
+    limit - usually a breath or a short pause between words.
+    """
+    search = min(int(SPLIT_SEARCH_SECONDS * SAMPLE_RATE), max_samples // 2)
+    pieces: List[Region] = []
+    start = region.start
+    while region.end - start > max_samples:
+        limit = start + max_samples
+        low = limit - search
+        quietest = int(np.argmin(frame_energy_db(samples[low:limit])))
+        cut = min(limit, low + quietest * FRAME_SAMPLES + FRAME_SAMPLES // 2)
+        pieces.append(Region(start, cut))
+        start = cut
+    pieces.append(Region(start, region.end))
+    return pieces
+
+
+def speech_chunks(
+    samples: np.ndarray,
+    max_seconds: float = MAX_CHUNK_SECONDS
+) -> List[Tuple[np.ndarray, SpeechMap]]:
+    """
+    Trim silence and split at pauses into chunks of at most max_seconds.
+    Returns an empty list when the recording has no speech.
+    """
+    max_samples = int(max_seconds * SAMPLE_RATE)
+
+    # Regions longer than a chunk are cut at their quietest point near the limit
+    regions: List[Region] = []
+    for region in detect_speech(samples):
+        regions.extend(_split_region(samples, region, max_samples))
+
+    chunks: List[List[Region]] = []
+    length = 0
+    for region in regions:
+        size = region.end - region.start
+        if not chunks or length + size > max_samples:
+            chunks.append([])
+            length = 0
+        chunks[-1].append(region)
+        length += size
+
+    return [
+        (np.concatenate([samples[r.start:r.end] for r in chunk]), SpeechMap(chunk))
+        for chunk in chunks
+    ]
+
+
+def merge_results(results: List[Tuple[Dict[str, Any], Optional[SpeechMap]]]) -> Dict[str, Any]:
+    """
+    Combine per-chunk transcribe results into one, with segment
+    timestamps restored to the original recording.
+    """
+    texts = []
+    segments = []
+    language = None
+    for result, speech_map in results:
+        text = result.get("text", "").strip()
+        if text:
+            texts.append(text)
+        language = language or result.get("language")
+        for segment in result.get("segments") or []:
+            segment = dict(segment, id=len(segments))
+            if speech_map is not None:
+                segment["start"] = speech_map.to_source(segment.get("start", 0.0))
+                segment["end"] = speech_map.to_source(segment.get("end", 0.0), end=True)
+            segments.append(segment)
+    return {"text": " ".join(texts), "language": language, "segments": segments}
@@ -4,12 +4,15 @@ from app.core.database import get_db, Base, engine, async_session_maker
 from app.core.security import (
     verify_password,
     get_password_hash,
+    verify_password_async,
+    get_password_hash_async,
     create_access_token,
     create_refresh_token,
     decode_token,
     get_current_user,
     get_current_user_optional,
-    require_roles
+    require_roles,
+    invalidate_cached_user
 )
 
 __all__ = [
@@ -21,10 +24,13 @@ __all__ = [
     "async_session_maker",
     "verify_password",
     "get_password_hash",
+    "verify_password_async",
+    "get_password_hash_async",
     "create_access_token",
     "create_refresh_token",
     "decode_token",
     "get_current_user",
     "get_current_user_optional",
-    "require_roles"
+    "require_roles",
+    "invalidate_cached_user"
 ]
@@ -0,0 +1,112 @@
+"""
+In-process caches shared by the API.
+
+Each worker process keeps its own copy, so cached values can be stale for
+up to their TTL after a change made through another worker.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire after a time-to-live.
+
+    When full, the least recently used entry is evicted. Entries may set
+    their own TTL, e.g. to expire together with the token they were
+    derived from. With `max_bytes`, entries are also evicted to keep the
+    total of `sizeof(value)` under that budget. Hit/miss counters are kept
+    for metrics.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof if max_bytes is not None else None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._data: "OrderedDict[Hashable, Tuple[Optional[float], Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remove(self, key: Hashable) -> Optional[Tuple[Optional[float], Any, int]]:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+        return entry
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing/expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value, _ = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Cache value under key for ttl seconds (default: the cache TTL)"""
+        if self.maxsize <= 0:
+            return
+        size = self._sizeof(value) if self._sizeof else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._remove(key)
+            self._data[key] = (expires_at, value, size)
+            self.bytes += size
+            while len(self._data) > self.maxsize or (
+                self.max_bytes is not None and self.bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> Any:
+        """Remove key from the cache, returning its value if present"""
+        with self._lock:
+            entry = self._remove(key)
+        return entry[1] if entry else None
+
+    def clear(self) -> int:
+        """Remove every entry, returning how many were dropped"""
+        with self._lock:
+            count = len(self._data)
+            self._data.clear()
+            self.bytes = 0
+        return count
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Size and hit/miss counters"""
+        lookups = self.hits + self.misses
+        stats = {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+        if self.max_bytes is not None:
+            stats["bytes"] = self.bytes
+            stats["max_bytes"] = self.max_bytes
+        return stats
@@ -0,0 +1,129 @@
+"""
+Dedicated worker pools for blocking, CPU-heavy work.
+
+Offloading to Starlette's shared thread pool keeps the event loop free but
+lets one kind of job crowd out every other blocking call, with no limit on
+how much work piles up. A BoundedExecutor gives a job type its own
+threads and a bounded queue: once full, new jobs are rejected at once so
+the caller can answer with backpressure (429/503 + Retry-After) instead of
+making everyone wait.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from app.core import metrics
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a BoundedExecutor's queue is full"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name} queue is full")
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """
+    Thread pool with a capped number of queued jobs.
+
+    Reports `<name>_queue_depth`, `<name>_in_flight`, `<name>_rejected_total`,
+    `<name>_queue_wait_seconds` and `<name>_run_seconds` metrics.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_workers: int,
+        max_queue: int,
+        retry_after: int = 1,
+        on_create: Optional[Callable[[], None]] = None,
+        run_buckets=metrics.DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._on_create = on_create  # called once, when the threads are first needed
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0  # queued + running
+        self._running = 0
+        self._lock = threading.Lock()
+
+        self.queue_depth_gauge = metrics.gauge(f"{name}_queue_depth", "Jobs waiting for a worker")
+        self.in_flight_gauge = metrics.gauge(f"{name}_in_flight", "Jobs currently running")
+        self.rejected = metrics.counter(f"{name}_rejected_total", "Jobs rejected with a full queue")
+        self.queue_wait = metrics.histogram(f"{name}_queue_wait_seconds", "Time from submit to start")
+        self.run_time = metrics.histogram(f"{name}_run_seconds", "Job run time", run_buckets)
+
+    @property
+    def queue_depth(self) -> int:
+        """Jobs submitted but not yet picked up by a worker"""
+        return max(0, self._pending - self._running)
+
+    @property
+    def pending(self) -> int:
+        """Jobs queued or running"""
+        return self._pending
+
+    @property
+    def saturated(self) -> bool:
+        """True when the next run() would be rejected"""
+        return self._pending >= self.max_workers + self.max_queue
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            if self._on_create is not None:
+                self._on_create()
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix=self.name
+            )
+        return self._executor
+
+    def _update_gauges(self) -> None:
+        self.queue_depth_gauge.set(self.queue_depth)
+        self.in_flight_gauge.set(self._running)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run fn(*args, **kwargs) on the pool, or raise ExecutorSaturated"""
+        if self.saturated:
+            self.rejected.inc()
+            raise ExecutorSaturated(self.name, self.retry_after)
+
+        submitted = time.perf_counter()
+
+        def job() -> Any:
+            started = time.perf_counter()
+            self.queue_wait.observe(started - submitted)
+            with self._lock:
+                self._running += 1
+            self._update_gauges()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.run_time.observe(time.perf_counter() - started)
+                with self._lock:
+                    self._running -= 1
+
+        future = self._get_executor().submit(job)
+        with self._lock:
+            self._pending += 1
+        self._update_gauges()
+        # Release the slot when the job itself finishes (or is cancelled before
+        # it starts), not when the caller stops waiting: a cancelled caller
+        # leaves its job running, and it still occupies the pool until then
+        future.add_done_callback(self._job_done)
+        return await asyncio.wrap_future(future)
+
+    def _job_done(self, future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+        self._update_gauges()
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
-from typing import List
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -16,11 +16,64 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     
+    # Authenticated user cache (per process)
+    AUTH_USER_CACHE_TTL_SECONDS: int = 60
+    AUTH_USER_CACHE_MAX_SIZE: int = 10000
+    AUTH_TOKEN_CACHE_MAX_SIZE: int = 10000
+    
+    # Password hashing pool - bcrypt is CPU bound, keep it off the event loop
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 2
+    
     # Gemini API
     GEMINI_API_URL: str = "http://localhost:8001/generate"
+    GEMINI_HTTP2: bool = False  # Requires the h2 package
+    GEMINI_MAX_CONNECTIONS: int = 20
+    GEMINI_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    GEMINI_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    GEMINI_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    GEMINI_READ_TIMEOUT_SECONDS: float = 30.0
+    GEMINI_WRITE_TIMEOUT_SECONDS: float = 10.0
+    GEMINI_POOL_TIMEOUT_SECONDS: float = 5.0
+    
+    # Response cache for deterministic AI endpoints (per process)
+    AI_CACHE_TTL_SECONDS: int = 86400
+    AI_CACHE_MAX_ENTRIES: int = 5000
+    AI_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
     
     # Whisper STT Settings
     WHISPER_MODEL: str = "base"  # Options: tiny, base, small, medium, large
+    WHISPER_PRELOAD: bool = True  # Load the model in the background at startup
+    WHISPER_WARMUP: bool = True  # Run one silent inference after loading
+    WHISPER_WORKERS: int = 1  # Concurrent transcriptions per process
+    WHISPER_TORCH_THREADS: int = 0  # torch intra-op threads for the whole process (shared by all workers), 0 = torch default
+    WHISPER_MAX_QUEUE: int = 8  # Waiting jobs before uploads are rejected
+    WHISPER_RETRY_AFTER_SECONDS: int = 5
+    WHISPER_BATCH_SIZE: int = 1  # Clips decoded together, 1 disables batching
+    WHISPER_BATCH_WAIT_MS: int = 50  # How long a clip waits for others to batch with
+    WHISPER_QUANTIZE: bool = False  # INT8 dynamic quantization of Linear layers (CPU)
+    WHISPER_QUANTIZED_CACHE_DIR: Optional[str] = None  # Default: whisper's download root
+    WHISPER_TIERS: str = ""  # e.g. "tiny,base,small" (fastest first); empty = WHISPER_MODEL only
+    WHISPER_TIER_QUEUE_STEP: int = 2  # Step down one tier per this many queued jobs, 0 = never
+    WHISPER_TIER_LONG_AUDIO_SECONDS: float = 60.0  # Longer audio steps down one tier
+    VOICE_MAX_UPLOAD_BYTES: int = 25 * 1024 * 1024  # Uploads are cut off past this
+    VOICE_MAX_AUDIO_SECONDS: int = 600  # Longest recording accepted by /voice/transcribe
+    VOICE_PROCESS_PIPELINED: bool = False  # Extract each transcribed chunk while the rest transcribes
+    CHAT_LOG_BUFFER_MAX_ROWS: int = 200  # Flush chat logs once this many are queued...
+    CHAT_LOG_FLUSH_SECONDS: float = 1.0  # ...or this often
+    CHAT_LOG_BUFFER_LIMIT: int = 20000  # Rows kept while the database is unreachable
+    COUNTER_DAILY_BUCKETS: bool = True  # Keep per-day dashboard counts as well as totals
+    COUNTER_RECONCILE_SECONDS: int = 6 * 3600  # Recompute counters from source rows, 0 = never
+    CHAT_SEARCH_BACKEND: str = "postgres"  # "postgres" (GIN index) or "memory" (in-process, for tests/dev)
+    CHAT_SEARCH_CANDIDATES: int = 1000  # Most recent matches ranked per search
+    CHAT_SEARCH_BACKFILL: bool = True  # Index chat rows logged before search existed, in the background
+    TRANSCRIPTION_CACHE_SIZE: int = 256  # Cached transcription results, 0 disables
+    TRANSCRIPTION_CACHE_DIR: Optional[str] = None  # Persist results here when set
+    VOICE_VAD_ENABLED: bool = True  # Trim silence and split at pauses before Whisper
+    VOICE_STREAM_STEP_SECONDS: float = 2.0  # New audio between partial transcripts
+    VOICE_STREAM_WINDOW_SECONDS: float = 20.0  # Window length before segments are finalized
+    VOICE_STREAM_MAX_SECONDS: int = 600  # Longest /voice/stream recording
     
     # App Settings
     DEBUG: bool = True
@@ -31,6 +84,10 @@ class Settings(BaseSettings):
     def cors_origins_list(self) -> List[str]:
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
     
+    @property
+    def whisper_tiers_list(self) -> List[str]:
+        return [tier.strip() for tier in self.WHISPER_TIERS.split(",") if tier.strip()]
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
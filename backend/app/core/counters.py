@@ -0,0 +1,248 @@
+"""
+Incrementally maintained counts for dashboards.
+
+Dashboards used to COUNT(*) over tables that grow without bound (chat
+history, alerts). Instead, a row in activity_counters holds the running
+count for each (counter, subject), plus one row per UTC day when
+COUNTER_DAILY_BUCKETS is on. Writers call increment() in the same
+transaction as the rows they add, and reads are a primary-key lookup.
+
+Each counter is registered with the query that defines it
+(CounterSource). reconcile() recomputes a counter from that query, which
+corrects any drift (direct SQL edits, deletes), and run_reconciler()
+does this periodically - once per cluster, whichever worker claims the
+run first.
+
+Reconciling never blocks writers. The source rows and the counter rows
+are read from one snapshot; since every increment commits together with
+the rows it counts, the two agree except for drift, and only the
+difference is added to the live counters. Increments that commit while
+the source is being counted are therefore kept.
+"""
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import BigInteger, Date, DateTime, String, cast, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.config import get_settings
+from app.core.database import Base, async_session_maker
+
+settings = get_settings()
+
+# Bucket holding the all-time count
+TOTAL = "total"
+
+# Rows per transaction when correcting a counter, to keep row locks short
+_INSERT_BATCH = 1000
+
+
+class ActivityCounter(Base):
+    """Running count of events per subject, all-time and per UTC day"""
+    __tablename__ = "activity_counters"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    subject: Mapped[str] = mapped_column(String(255), primary_key=True)
+    bucket: Mapped[str] = mapped_column(String(10), primary_key=True)  # TOTAL or YYYY-MM-DD
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ActivityCounter {self.name}/{self.subject}/{self.bucket}={self.count}>"
+
+
+class CounterReconciliation(Base):
+    """When each counter was last claimed for reconciling, cluster-wide"""
+    __tablename__ = "counter_reconciliations"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    reconciled_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<CounterReconciliation {self.name} at {self.reconciled_at}>"
+
+
+class CounterSource(NamedTuple):
+    """The rows a counter counts: one per row of `model` matching `condition`"""
+    model: Any
+    subject: Any      # column identifying who the count belongs to
+    timestamp: Any    # timestamptz column used for day buckets
+    condition: Any = None
+
+
+_sources: Dict[str, CounterSource] = {}
+
+
+def register_source(name: str, source: CounterSource) -> None:
+    """Declare what a counter counts, so reconcile() can recompute it"""
+    _sources[name] = source
+
+
+def day_bucket(timestamp: Optional[datetime]) -> str:
+    """UTC day bucket for an event time (naive times are taken as UTC)"""
+    timestamp = timestamp or datetime.utcnow()
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc)
+    return timestamp.date().isoformat()
+
+
+def _rows(name: str, counts: Dict[Tuple[str, Optional[str]], int]) -> List[Dict[str, Any]]:
+    """Counter rows for {(subject, day or None): count}, adding the totals"""
+    totals: Dict[str, int] = {}
+    rows = []
+    for (subject, day), count in counts.items():
+        totals[subject] = totals.get(subject, 0) + count
+        if day is not None and settings.COUNTER_DAILY_BUCKETS:
+            rows.append({"name": name, "subject": subject, "bucket": day, "count": count})
+    rows.extend(
+        {"name": name, "subject": subject, "bucket": TOTAL, "count": count}
+        for subject, count in totals.items()
+    )
+    return rows
+
+
+async def _add(db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    """Add each row's count to the stored count, creating missing rows"""
+    # Same row order in every writer, so concurrent upserts can't deadlock
+    rows = sorted(rows, key=lambda row: (row["subject"], row["bucket"]))
+    stmt = insert(ActivityCounter).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ActivityCounter.name, ActivityCounter.subject, ActivityCounter.bucket],
+        set_={"count": ActivityCounter.count + stmt.excluded.count}
+    )
+    await db.execute(stmt)
+
+
+async def increment(
+    db: AsyncSession,
+    name: str,
+    events: Iterable[Tuple[Any, Optional[datetime]]]
+) -> None:
+    """
+    Count (subject, timestamp) events. Runs in the caller's transaction
+    and doesn't commit, so the counts land together with the rows.
+    """
+    counts: Dict[Tuple[str, Optional[str]], int] = {}
+    for subject, timestamp in events:
+        if subject is None:
+            continue
+        key = (str(subject), day_bucket(timestamp))
+        counts[key] = counts.get(key, 0) + 1
+    if not counts:
+        return
+
+    await _add(db, _rows(name, counts))
+
+
+async def read(db: AsyncSession, name: str, subject: Any, day: Optional[date] = None) -> int:
+    """Current count for a subject, all-time or for one UTC day"""
+    bucket = day.isoformat() if day else TOTAL
+    result = await db.execute(
+        select(ActivityCounter.count).where(
+            ActivityCounter.name == name,
+            ActivityCounter.subject == str(subject),
+            ActivityCounter.bucket == bucket
+        )
+    )
+    return result.scalar() or 0
+
+
+async def reconcile(name: str, session_maker=async_session_maker) -> int:
+    """
+    Recompute a counter from its source rows and correct the stored
+    counts. Returns the number of counter rows corrected.
+
+    The recount runs in a REPEATABLE READ snapshot without locks; the
+    corrections are then applied as deltas in short transactions.
+    """
+    source = _sources[name]
+    day = cast(func.timezone("UTC", source.timestamp), Date)
+    query = (
+        select(cast(source.subject, String), day, func.count())
+        .where(source.subject.isnot(None))
+        .group_by(source.subject, day)
+    )
+    if source.condition is not None:
+        query = query.where(source.condition)
+
+    async with session_maker() as snapshot:
+        await snapshot.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        counts = {
+            (subject, bucket.isoformat() if bucket else None): count
+            for subject, bucket, count in (await snapshot.execute(query)).all()
+        }
+        stored = {
+            (subject, bucket): count
+            for subject, bucket, count in (await snapshot.execute(
+                select(ActivityCounter.subject, ActivityCounter.bucket, ActivityCounter.count)
+                .where(ActivityCounter.name == name)
+            )).all()
+        }
+        await snapshot.rollback()
+
+    deltas = {(row["subject"], row["bucket"]): row["count"] for row in _rows(name, counts)}
+    for key, count in stored.items():
+        deltas[key] = deltas.get(key, 0) - count
+    rows = [
+        {"name": name, "subject": subject, "bucket": bucket, "count": delta}
+        for (subject, bucket), delta in deltas.items()
+        if delta
+    ]
+
+    async with session_maker() as db:
+        for start in range(0, len(rows), _INSERT_BATCH):
+            await _add(db, rows[start:start + _INSERT_BATCH])
+            await db.commit()
+        if rows:
+            await db.execute(delete(ActivityCounter).where(
+                ActivityCounter.name == name,
+                ActivityCounter.count == 0
+            ))
+            await db.commit()
+    return len(rows)
+
+
+async def claim_reconcile(name: str, interval: float, session_maker=async_session_maker) -> bool:
+    """
+    Claim this interval's reconcile of a counter. Returns False when
+    another worker already reconciled it within the last `interval` seconds.
+    """
+    now = datetime.now(timezone.utc)
+    async with session_maker() as db:
+        await db.execute(
+            insert(CounterReconciliation)
+            .values(name=name, reconciled_at=datetime.min.replace(tzinfo=timezone.utc))
+            .on_conflict_do_nothing(index_elements=[CounterReconciliation.name])
+        )
+        result = await db.execute(
+            update(CounterReconciliation)
+            .where(
+                CounterReconciliation.name == name,
+                CounterReconciliation.reconciled_at <= now - timedelta(seconds=interval)
+            )
+            .values(reconciled_at=now)
+            .returning(CounterReconciliation.name)
+        )
+        claimed = result.scalar() is not None
+        await db.commit()
+    return claimed
+
+
+async def run_reconciler(interval: float) -> None:
+    """
+    Every `interval` seconds, reconcile each registered counter that no
+    other worker has reconciled within the last interval.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        for name in list(_sources):
+            try:
+                # A little slack so workers whose timers drift still take turns
+                if not await claim_reconcile(name, interval * 0.9):
+                    continue
+                corrected = await reconcile(name)
+                print(f"[Counters] Reconciled {name} ({corrected} rows corrected)")
+            except Exception as e:
+                print(f"[Counters] Reconciling {name} failed: {e}")
@@ -0,0 +1,55 @@
+"""
+Request body size limits enforced while the body arrives.
+
+FastAPI parses a multipart form in full - spooling file parts to temporary
+files - before the route handler runs, so a handler can only reject an
+oversized upload after it has been received. This middleware stops it at
+the door instead: a request whose Content-Length is over the limit gets
+413 without its body being read, and a request without one (chunked) is
+cut off with 413 as soon as the bytes received pass the limit.
+"""
+from typing import Iterable
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class BodySizeLimitMiddleware:
+    """Caps the body of requests to the given path prefixes at max_bytes"""
+
+    def __init__(self, app: ASGIApp, paths: Iterable[str], max_bytes: int, detail: str = "Request body too large"):
+        self.app = app
+        self.paths = tuple(paths)
+        self.max_bytes = max_bytes
+        self.detail = detail
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = 0
+                if declared > self.max_bytes:
+                    response = JSONResponse({"detail": self.detail}, status_code=413)
+                    await response(scope, receive, send)
+                    return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside the body parser; FastAPI turns it into the response
+                    raise HTTPException(status_code=413, detail=self.detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,130 @@
+"""
+Minimal in-process metrics registry.
+
+Modules create counters, gauges and histograms by name at import time and
+update them on their hot paths; components that already keep their own
+statistics (caches, connection pools) register a collector instead. The
+current values of everything are served as JSON at /metrics (admins only:
+it exposes queue depths, cache sizes and upstream error strings).
+"""
+import threading
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Sequence
+
+# Upper bounds in seconds, suited to request and job latencies
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Counter:
+    """Monotonically increasing count"""
+
+    def __init__(self, description: str = ""):
+        self.description = description
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self) -> Any:
+        return self.value
+
+
+class Gauge:
+    """Value that can go up and down"""
+
+    def __init__(self, description: str = ""):
+        self.description = description
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def snapshot(self) -> Any:
+        return self.value
+
+
+class Histogram:
+    """Distribution of observed values over fixed buckets"""
+
+    def __init__(self, description: str = "", buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self) -> Any:
+        with self._lock:
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(self.buckets, self.counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            buckets["+Inf"] = self.count
+            return {
+                "count": self.count,
+                "sum": round(self.sum, 6),
+                "avg": round(self.sum / self.count, 6) if self.count else 0.0,
+                "buckets": buckets,
+            }
+
+
+_metrics: Dict[str, Any] = {}
+_collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+_registry_lock = threading.Lock()
+
+
+def _get_or_create(name: str, factory: Callable[[], Any]) -> Any:
+    with _registry_lock:
+        if name not in _metrics:
+            _metrics[name] = factory()
+        return _metrics[name]
+
+
+def counter(name: str, description: str = "") -> Counter:
+    """Get or create the counter registered under name"""
+    return _get_or_create(name, lambda: Counter(description))
+
+
+def gauge(name: str, description: str = "") -> Gauge:
+    """Get or create the gauge registered under name"""
+    return _get_or_create(name, lambda: Gauge(description))
+
+
+def histogram(name: str, description: str = "", buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    """Get or create the histogram registered under name"""
+    return _get_or_create(name, lambda: Histogram(description, buckets))
+
+
+def register_collector(name: str, collect: Callable[[], Dict[str, Any]]) -> None:
+    """Report the dict returned by collect() under name on every snapshot"""
+    _collectors[name] = collect
+
+
+def snapshot() -> Dict[str, Any]:
+    """Current value of every metric and collector"""
+    data = {name: metric.snapshot() for name, metric in sorted(_metrics.items())}
+    for name, collect in sorted(_collectors.items()):
+        try:
+            data[name] = collect()
+        except Exception as e:
+            data[name] = {"error": str(e)}
+    return data
@@ -0,0 +1,202 @@
+"""
+Keyset (cursor) pagination shared by the list endpoints.
+
+Offset pagination makes the database walk and discard every skipped row,
+so deep pages get slower the further a client goes. In cursor mode the
+client instead passes back an opaque cursor holding the sort key values
+of the last row it received, and the next page starts right after it:
+
+    WHERE (sort_key, id) > (:last_sort_key, :last_id)
+
+Cursor mode is opt-in. Every paginated response includes the cursor for
+the following page, either as a ``next_cursor`` field or, for endpoints
+that return a bare list, in the ``X-Next-Cursor`` header. Requests that
+send a ``cursor`` ignore ``skip``.
+
+Sort keys must end with the primary key so that the ordering is total.
+The other keys can't be assumed NOT NULL whatever the models say -
+migration 001 created created_at and the date columns nullable - and a
+cursor holding NULL would turn into `col < NULL`, matching nothing and
+silently ending the listing. Date and timestamp keys are therefore
+sorted as COALESCE(col, '-infinity'): NULL rows come last in
+newest-first listings and the cursor holds the sentinel instead of NULL.
+When all keys sort in one direction the condition is a single row
+comparison, which an index on the same expressions serves as a range
+scan (see migration 006). Any other nullable key sorts NULLS LAST and
+is compared with explicit IS NULL branches.
+"""
+import base64
+import binascii
+import enum
+import json
+import uuid
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import Date, DateTime, Select, and_, cast, func, literal_column, or_, tuple_
+
+# (column, descending) pairs describing the ORDER BY of a list endpoint
+SortKeys = Sequence[Tuple[Any, bool]]
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode_value(value: Any) -> Any:
+    """Tag values JSON can't carry so they decode back to the same type"""
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, uuid.UUID):
+        return {"u": str(value)}
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        if "u" in value:
+            return uuid.UUID(value["u"])
+        raise ValueError("Unknown cursor value")
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode sort key values as an opaque, URL-safe cursor"""
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Decode a cursor produced by encode_cursor for `size` sort keys"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("Cursor does not match sort keys")
+        return [_decode_value(v) for v in values]
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def _is_primary_key(column) -> bool:
+    return bool(getattr(column, "primary_key", False))
+
+
+def _coalesced(column) -> bool:
+    """Date/timestamp keys sort with NULL as '-infinity' (see module docstring)"""
+    return not _is_primary_key(column) and isinstance(column.type, (Date, DateTime))
+
+
+def _sentinel(column):
+    # Rendered as a constant, not a bind parameter, so it matches the
+    # expression indexes of migration 006
+    return cast(literal_column("'-infinity'"), column.type)
+
+
+def sort_expression(column):
+    """The expression a sort key is ordered and compared by"""
+    if _coalesced(column):
+        return func.coalesce(column, _sentinel(column))
+    return column
+
+
+def _cursor_value(column, value):
+    """A cursor value as an SQL operand for the key's sort expression"""
+    if value is None and _coalesced(column):
+        return _sentinel(column)
+    return value
+
+
+def _order_by(column, descending: bool):
+    expression = sort_expression(column)
+    order = expression.desc() if descending else expression.asc()
+    if _is_primary_key(column) or _coalesced(column):
+        return order
+    return order.nulls_last()
+
+
+def _equal(column, value):
+    if value is None and not _coalesced(column):
+        return column.is_(None)
+    return sort_expression(column) == _cursor_value(column, value)
+
+
+def _after(column, descending: bool, value):
+    """Rows whose key sorts strictly after `value`, or None if none can"""
+    if value is None and not _coalesced(column):
+        # NULLs sort last, so nothing comes after one in this key
+        return None
+    expression = sort_expression(column)
+    operand = _cursor_value(column, value)
+    after = expression < operand if descending else expression > operand
+    if _is_primary_key(column) or _coalesced(column):
+        return after
+    return or_(after, column.is_(None))
+
+
+def keyset_condition(keys: SortKeys, values: Sequence[Any]):
+    """
+    Condition selecting rows strictly after `values` in the order given by
+    `keys`. A single row comparison when every key sorts the same way and
+    none needs NULL branches; otherwise OR-ed prefix comparisons so mixed
+    ASC/DESC keys work.
+    """
+    directions = {descending for _, descending in keys}
+    if len(directions) == 1 and all(
+        _is_primary_key(column) or _coalesced(column) for column, _ in keys
+    ):
+        left = tuple_(*(sort_expression(column) for column, _ in keys))
+        right = tuple_(*(_cursor_value(column, value) for (column, _), value in zip(keys, values)))
+        return left < right if directions.pop() else left > right
+
+    clauses = []
+    for i, (column, descending) in enumerate(keys):
+        after = _after(column, descending, values[i])
+        if after is None:
+            continue
+        clauses.append(and_(
+            *(_equal(keys[j][0], values[j]) for j in range(i)),
+            after
+        ))
+    return or_(*clauses)
+
+
+def paginate(
+    query: Select,
+    keys: SortKeys,
+    cursor: Optional[str],
+    skip: int,
+    limit: int
+) -> Select:
+    """Order `query` by `keys` and page it by cursor if given, else by offset"""
+    query = query.order_by(*(_order_by(column, descending) for column, descending in keys))
+    if cursor:
+        query = query.where(keyset_condition(keys, decode_cursor(cursor, len(keys))))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+def next_cursor(items: Sequence[Any], keys: SortKeys, limit: int) -> Optional[str]:
+    """Cursor for the page after `items`, or None if this was the last page"""
+    if len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor([getattr(last, column.key) for column, _ in keys])
+
+
+def set_next_cursor(response: Response, items: Sequence[Any], keys: SortKeys, limit: int) -> None:
+    """Expose the next page cursor of a bare-list response as a header"""
+    cursor = next_cursor(items, keys, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
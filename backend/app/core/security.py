@@ -1,12 +1,18 @@
+import hashlib
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, event
+from sqlalchemy.orm import make_transient_to_detached
 
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.concurrency import BoundedExecutor, ExecutorSaturated
 from app.core.config import get_settings
 from app.core.database import get_db
 from app.apps.users.models import User
@@ -16,9 +22,50 @@ settings = get_settings()
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt takes ~250ms of CPU per call; run it on a dedicated pool so the
+# morning login spike can't stall the event loop for everyone else
+password_executor = BoundedExecutor(
+    "password_hashing",
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    retry_after=settings.PASSWORD_HASH_RETRY_AFTER_SECONDS
+)
+
 # Bearer token scheme
 security = HTTPBearer()
 
+# Column snapshots of authenticated users keyed by user id, so a warm
+# request resolves its user without a database round trip
+user_cache = TTLCache(
+    maxsize=settings.AUTH_USER_CACHE_MAX_SIZE,
+    ttl=settings.AUTH_USER_CACHE_TTL_SECONDS
+)
+
+
+# Verified JWT payloads keyed by a digest of the token; each entry expires
+# at the token's own `exp`, so a cached token is never valid for longer
+token_cache = TTLCache(maxsize=settings.AUTH_TOKEN_CACHE_MAX_SIZE)
+
+
+def _user_snapshot(user: User) -> Dict[str, Any]:
+    return {attr.key: getattr(user, attr.key) for attr in User.__mapper__.column_attrs}
+
+
+def invalidate_cached_user(user_id) -> None:
+    """Drop a user from the auth cache after their row has changed"""
+    user_cache.pop(str(user_id))
+
+
+metrics.register_collector("auth_user_cache", user_cache.stats)
+metrics.register_collector("auth_token_cache", token_cache.stats)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_on_change(mapper, connection, target: User) -> None:
+    # Covers role changes and any other update made through the ORM
+    invalidate_cached_user(target.id)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
@@ -30,6 +77,27 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def _run_password_job(fn, *args):
+    try:
+        return await password_executor.run(fn, *args)
+    except ExecutorSaturated as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many sign-in requests right now. Please try again shortly.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the hashing pool (429 when saturated)"""
+    return await _run_password_job(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the hashing pool (429 when saturated)"""
+    return await _run_password_job(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -53,15 +121,26 @@ def create_refresh_token(data: dict) -> str:
 
 def decode_token(token: str) -> dict:
     """Decode and validate a JWT token"""
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is not None:
+        return dict(payload)
+    
     try:
         payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
-        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        remaining = exp - time.time()
+        if remaining > 0:
+            token_cache.set(key, dict(payload), ttl=remaining)
+    return payload
 
 
 async def get_current_user(
@@ -85,6 +164,14 @@ async def get_current_user(
             detail="Invalid token payload"
         )
     
+    snapshot = user_cache.get(user_id)
+    if snapshot is not None:
+        # Rebuild a persistent instance without a SELECT so routes can
+        # still modify and commit the current user
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return await db.merge(user, load=False)
+    
     result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
     
@@ -94,6 +181,7 @@ async def get_current_user(
             detail="User not found"
         )
     
+    user_cache.set(user_id, _user_snapshot(user))
     return user
 
 
@@ -1,9 +1,18 @@
-from fastapi import FastAPI
+import asyncio
+
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
+from app.core import counters, metrics
 from app.core.config import get_settings
 from app.core.database import engine
+from app.core.limits import BodySizeLimitMiddleware
+from app.core.security import password_executor, require_roles
+from app.apps.ai.service import gemini_service
+from app.apps.voice.log_buffer import chat_log_buffer
+from app.apps.voice.search import index_backlog
+from app.apps.voice.service import whisper_service
 
 # Import all routers
 from app.apps.users.router import router as auth_router
@@ -20,15 +29,39 @@ from app.apps.voice.router import router as voice_router
 
 settings = get_settings()
 
+# Multipart overhead allowed on top of VOICE_MAX_UPLOAD_BYTES
+UPLOAD_FORM_SLACK_BYTES = 64 * 1024
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler"""
     # Startup
     print("🚀 ASHA AI Backend Starting...")
+    await gemini_service.startup()
+    chat_log_buffer.start()
+    reconciler = None
+    if settings.COUNTER_RECONCILE_SECONDS > 0:
+        reconciler = asyncio.create_task(counters.run_reconciler(settings.COUNTER_RECONCILE_SECONDS))
+    search_backfill = None
+    if settings.CHAT_SEARCH_BACKFILL and settings.CHAT_SEARCH_BACKEND == "postgres":
+        search_backfill = asyncio.create_task(index_backlog())
+    if settings.WHISPER_PRELOAD:
+        # Load in the background; /ready reports progress to the load balancer
+        app.state.whisper_preload = asyncio.create_task(
+            whisper_service.preload(warm_up=settings.WHISPER_WARMUP)
+        )
     yield
     # Shutdown
     print("👋 ASHA AI Backend Shutting Down...")
+    if reconciler is not None:
+        reconciler.cancel()
+    if search_backfill is not None:
+        search_backfill.cancel()
+    password_executor.shutdown()
+    whisper_service.shutdown()
+    await chat_log_buffer.stop()
+    await gemini_service.aclose()
     await engine.dispose()
 
 
@@ -43,6 +76,16 @@ app = FastAPI(
     redirect_slashes=False  # Prevent 307 redirects
 )
 
+# Cut audio uploads off while they arrive, before the form is spooled to disk
+# (the slack covers multipart framing and the other form fields). Added
+# before CORS so the 413 still carries CORS headers.
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    paths=("/api/v1/voice/transcribe", "/api/v1/voice/process"),
+    max_bytes=settings.VOICE_MAX_UPLOAD_BYTES + UPLOAD_FORM_SLACK_BYTES,
+    detail=f"Audio file too large (max {settings.VOICE_MAX_UPLOAD_BYTES // (1024 * 1024)}MB)"
+)
+
 # Configure CORS - Allow all origins in development
 # In production, restrict this to your frontend domain
 origins = ["*"] if settings.DEBUG else settings.cors_origins_list
@@ -90,6 +133,26 @@ async def health_check():
     }
 
 
+@app.get("/ready")
+async def readiness_check(response: Response):
+    """Readiness probe - 503 until the Whisper model is loaded and warm"""
+    whisper_status = whisper_service.status
+    ready = whisper_service.is_ready or not settings.WHISPER_PRELOAD
+    if not ready:
+        response.status_code = 503
+    return {
+        "status": "ready" if ready else whisper_status,
+        "whisper": whisper_status,
+        "whisper_error": whisper_service.error
+    }
+
+
+@app.get("/metrics", dependencies=[Depends(require_roles('admin'))])
+async def get_metrics():
+    """In-process metrics (queues, caches, latencies) for this worker (admin only)"""
+    return metrics.snapshot()
+
+
 @app.get("/api/v1")
 async def api_info():
     """API information endpoint"""
@@ -0,0 +1,77 @@
+"""
+Per-request authentication overhead with and without the auth caches.
+
+Times get_current_user for one bearer token in three configurations:
+- no caches: JWT verification and a user SELECT on every call;
+- token cache only: the verified payload is reused;
+- token and user caches: no verification and no SELECT.
+
+    python -m benchmarks.auth [--number 2000]
+
+The user table lives in in-memory SQLite, so the "SELECT" rows understate
+a real round trip to Postgres. The gap between the first two rows is the
+JWT verification cost alone.
+"""
+import argparse
+import asyncio
+
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from benchmarks.common import best_of, best_of_async, print_table
+from app.apps.users.models import User
+from app.core import security
+from app.core.database import Base
+
+
+async def main(args) -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[User.__table__])
+        async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+            user = User(email="asha@example.com", password_hash="x", role="asha_worker")
+            db.add(user)
+            await db.commit()
+            token = security.create_access_token({"sub": str(user.id)})
+            credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+            async def uncached():
+                security.token_cache.clear()
+                security.user_cache.clear()
+                await security.get_current_user(credentials, db)
+
+            async def token_cached():
+                security.user_cache.clear()
+                await security.get_current_user(credentials, db)
+
+            async def fully_cached():
+                await security.get_current_user(credentials, db)
+
+            results = {}
+            for name, fn in (
+                ("no caches", uncached),
+                ("token cache", token_cached),
+                ("token + user cache", fully_cached),
+            ):
+                await fn()  # warm
+                results[name] = await best_of_async(fn, args.number)
+                db.expunge_all()
+            print_table("get_current_user, mean per call:", results)
+
+            def verify():
+                security.token_cache.clear()
+                security.decode_token(token)
+
+            print_table("decode_token, mean per call:", {
+                "verify (cache miss)": best_of(verify, args.number),
+                "cache hit": best_of(lambda: security.decode_token(token), args.number),
+            })
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--number", type=int, default=2000, help="calls per run")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,95 @@
+"""
+Whisper micro-batching: throughput versus latency by batch size.
+
+Decodes the same set of short clips with decode_batch at each batch size
+(default 1, 2, 4 and 8) on CPU and reports clips per second and the time
+one batch takes - the latency every clip in it sees, on top of
+WHISPER_BATCH_WAIT_MS. Batch size 1 is the unbatched baseline.
+
+    python -m benchmarks.batching [--model tiny] [--clips DIR] [--batch-sizes 1,2,4,8]
+
+--clips takes a directory of audio files (anything ffmpeg reads); each is
+cut to one 30 second window. Without it a synthetic 8 second clip (a
+gliding tone over noise) is used, which measures the encoder and the
+shortest decodes only: real speech makes the decoder loop run longer.
+openai-whisper downloads the model weights on first use.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from benchmarks.common import print_table
+from app.apps.voice.audio import SAMPLE_RATE, decode_audio
+from app.apps.voice.batching import WINDOW_SAMPLES, decode_batch
+
+
+def synthetic_clip(seconds: float = 8.0, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    tone = 0.3 * np.sin(2 * np.pi * (200 + 150 * np.sin(2 * np.pi * 0.5 * t)) * t)
+    return (tone + 0.02 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def load_clips(directory: str):
+    clips = []
+    for name in sorted(os.listdir(directory)):
+        ext = os.path.splitext(name)[1].lower()
+        if not ext:
+            continue
+        with open(os.path.join(directory, name), "rb") as f:
+            clips.append(decode_audio(f.read(), ext)[:WINDOW_SAMPLES])
+    return clips
+
+
+def main(args) -> None:
+    import torch
+    import whisper
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    model = whisper.load_model(args.model, device="cpu")
+    sizes = [int(size) for size in args.batch_sizes.split(",")]
+
+    clips = load_clips(args.clips) if args.clips else [synthetic_clip()]
+    # Same work at every batch size: a multiple of the largest batch
+    total = max(args.total, max(sizes))
+    total += -total % max(sizes)
+    work = [clips[i % len(clips)] for i in range(total)]
+    options = {"fp16": False, "language": args.language}
+
+    decode_batch(model, work[:1], options)  # warm up
+    latency = {}
+    throughput = {}
+    for size in sizes:
+        best = float("inf")
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            for start in range(0, total, size):
+                decode_batch(model, work[start:start + size], options)
+            best = min(best, time.perf_counter() - started)
+        latency[f"B={size}"] = best / (total // size)
+        throughput[f"B={size}"] = total / best
+
+    print_table(
+        f"{args.model} on CPU ({torch.get_num_threads()} threads), {total} clips, time per batch:",
+        latency,
+        unit="ms"
+    )
+    print("clips per second:")
+    for name, rate in throughput.items():
+        print(f"  {name:<{max(map(len, throughput))}}  {rate:10.2f}  "
+              f"({rate / throughput[next(iter(throughput))]:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--model", default="tiny")
+    parser.add_argument("--clips", help="directory of audio files (default: synthetic clip)")
+    parser.add_argument("--language", default="hi")
+    parser.add_argument("--batch-sizes", default="1,2,4,8")
+    parser.add_argument("--total", type=int, default=16, help="clips decoded per batch size")
+    parser.add_argument("--threads", type=int, default=0, help="torch threads, 0 = torch default")
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
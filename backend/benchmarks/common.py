@@ -0,0 +1,58 @@
+"""Helpers shared by the benchmark scripts"""
+import time
+import uuid
+from typing import Callable, Dict
+
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+
+import app.main  # noqa: F401  (registers every model)
+
+
+@compiles(UUID, "sqlite")
+def _uuid_as_char(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+_uuid_bind_processor = UUID.bind_processor
+
+
+def _sqlite_uuid_bind_processor(self, dialect):
+    # Accept string ids (e.g. a token's `sub`) on SQLite, as asyncpg does
+    process = _uuid_bind_processor(self, dialect)
+    if dialect.name != "sqlite" or process is None:
+        return process
+    return lambda value: process(uuid.UUID(value) if isinstance(value, str) else value)
+
+
+UUID.bind_processor = _sqlite_uuid_bind_processor
+
+
+def best_of(fn: Callable[[], object], number: int, repeat: int = 5) -> float:
+    """Best mean seconds per call of fn over `repeat` runs of `number` calls"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - started) / number)
+    return best
+
+
+async def best_of_async(fn, number: int, repeat: int = 5) -> float:
+    """best_of for a coroutine function"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            await fn()
+        best = min(best, (time.perf_counter() - started) / number)
+    return best
+
+
+def print_table(title: str, rows: Dict[str, float], unit: str = "us") -> None:
+    scale = {"us": 1e6, "ms": 1e3, "s": 1.0}[unit]
+    print(title)
+    width = max(len(name) for name in rows)
+    for name, seconds in rows.items():
+        print(f"  {name:<{width}}  {seconds * scale:10.2f} {unit}")
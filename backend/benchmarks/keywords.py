@@ -0,0 +1,109 @@
+"""
+Emergency and intent detection: per-keyword substring scan vs compiled matcher.
+
+Builds a corpus of chat-length messages (Devanagari, romanized Hindi and
+English, 40-600 characters) from sentence fragments and times both
+detectors over it. The substring scan is the implementation that the
+matcher replaced (one `in` test per keyword); "matcher" is what the chat
+handlers now run (emergency check, then the first intent), and
+"scan_message" is the variant that collects every intent.
+
+    python -m benchmarks.keywords [--messages 5000]
+"""
+import argparse
+import random
+
+from benchmarks.common import best_of, print_table
+from app.apps.ai.service import (
+    EMERGENCY_KEYWORDS,
+    INTENT_KEYWORDS,
+    detect_emergency,
+    detect_intent,
+    scan_message,
+)
+
+SENTENCES = [
+    "मुझे कल रात से पेट में हल्का दर्द हो रहा है और नींद भी नहीं आती",
+    "didi mera mahina is baar late hai kya karu",
+    "I am 7 months pregnant and feel tired after walking to the well",
+    "बच्चा ठीक से दूध पी रहा है पर रात को रोता है",
+    "sarkari yojana ka paisa abhi tak nahi aaya",
+    "what should I eat to increase iron, I don't like spinach",
+    "आयरन की गोली खाने के बाद उल्टी जैसा लगता है",
+    "kal se halka bukhar hai aur sir me dard",
+    "next ANC checkup kab hai, ASHA didi ne bataya tha",
+    "मेरी सास कहती है कि गर्भ में लड़का है",
+    "my mother-in-law says I should not drink water at night",
+    "khana khane ke baad bahut jalan hoti hai",
+]
+
+
+def substring_emergency(message: str) -> bool:
+    lower_message = message.lower()
+    return any(keyword.lower() in lower_message for keyword in EMERGENCY_KEYWORDS)
+
+
+def substring_intent(message: str) -> str:
+    lower_message = message.lower()
+    for intent, words in INTENT_KEYWORDS:
+        if any(word in lower_message for word in words):
+            return intent
+    return 'general_query'
+
+
+def substring_scan(message: str):
+    # The chat handlers called detect_emergency and detect_intent in turn
+    return substring_emergency(message), substring_intent(message)
+
+
+def matcher_scan(message: str):
+    return detect_emergency(message), detect_intent(message)
+
+
+def full_scan(message: str):
+    scan = scan_message(message)
+    return scan.is_emergency, scan.intents[0] if scan.intents else 'general_query'
+
+
+def corpus(size: int, seed: int = 7):
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(size):
+        target = rng.randint(40, 600)
+        parts = []
+        while sum(len(p) + 1 for p in parts) < target:
+            parts.append(rng.choice(SENTENCES))
+        messages.append(" ".join(parts)[:target])
+    return messages
+
+
+def main(args) -> None:
+    messages = corpus(args.messages)
+    mismatches = sum(
+        substring_scan(m) != matcher_scan(m) or substring_scan(m) != full_scan(m)
+        for m in messages
+    )
+    mean_length = sum(map(len, messages)) / len(messages)
+
+    def run(scan):
+        for message in messages:
+            scan(message)
+
+    results = {
+        "substring scan": best_of(lambda: run(substring_scan), 1, args.repeat) / len(messages),
+        "matcher": best_of(lambda: run(matcher_scan), 1, args.repeat) / len(messages),
+        "scan_message": best_of(lambda: run(full_scan), 1, args.repeat) / len(messages),
+    }
+    print_table(
+        f"{len(messages)} messages, mean {mean_length:.0f} chars, mean time per message:",
+        results
+    )
+    print(f"  speedup {results['substring scan'] / results['matcher']:.2f}x, "
+          f"{mismatches} mismatching result(s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
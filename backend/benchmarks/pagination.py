@@ -0,0 +1,99 @@
+"""
+Page latency by depth: offset pagination versus cursor pagination.
+
+Fills the alerts table with synthetic rows and times fetching one page at
+increasing depths through the same paginate() helper the list endpoints
+use. Offset latency grows with depth; cursor latency should stay flat.
+
+    python -m benchmarks.pagination                      # in-memory SQLite
+    python -m benchmarks.pagination --rows 1000000 \\
+        --database-url postgresql+asyncpg://localhost/asha_bench
+
+The target database must be disposable: the alerts table is dropped and
+recreated. Use Postgres for real numbers. SQLite can't seek an expression
+index with a row comparison (EXPLAIN shows a SCAN), so there the cursor
+column grows with depth too and the default run is only a smoke test.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import Index, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import benchmarks.common  # noqa: F401  (SQLite support for the models)
+from app.apps.alerts.models import Alert
+from app.apps.alerts.router import ALERT_SORT_KEYS
+from app.core.pagination import next_cursor, paginate, sort_expression
+
+
+async def _fill(engine, rows: int) -> None:
+    table = Alert.__table__
+    # The index the keyset query walks (as in migration 006); attached to the
+    # table, so created with it
+    Index(
+        "ix_bench_alerts_keyset",
+        sort_expression(table.c.created_at).desc(),
+        table.c.id.desc()
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync: table.drop(sync, checkfirst=True))
+        await conn.run_sync(lambda sync: table.create(sync))
+        start = datetime(2025, 1, 1)
+        beneficiary_id = uuid.uuid4()
+        batch = 10000
+        for offset in range(0, rows, batch):
+            await conn.execute(insert(Alert), [
+                {
+                    "id": uuid.uuid4(),
+                    "beneficiary_id": beneficiary_id,
+                    "type": "sos",
+                    "severity": "high",
+                    "status": "open",
+                    "created_at": start + timedelta(seconds=i),
+                }
+                for i in range(offset, min(offset + batch, rows))
+            ])
+
+
+async def _time(session, cursor, skip, limit, repeat):
+    query = paginate(select(Alert), ALERT_SORT_KEYS, cursor, skip, limit)
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = (await session.execute(query)).scalars().all()
+        best = min(best, time.perf_counter() - started)
+        session.expunge_all()
+    return best, rows
+
+
+async def main(args) -> None:
+    engine = create_async_engine(args.database_url)
+    try:
+        print(f"Filling {args.rows} rows...")
+        await _fill(engine, args.rows)
+
+        print(f"{'page depth':>12} {'offset ms':>10} {'cursor ms':>10}")
+        async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+            depth = args.limit
+            while depth < args.rows:
+                # Cursor of the row just before this depth, as a client would hold it
+                _, before = await _time(session, None, depth - args.limit, args.limit, 1)
+                cursor = next_cursor(before, ALERT_SORT_KEYS, args.limit)
+                offset_s, _ = await _time(session, None, depth, args.limit, args.repeat)
+                cursor_s, _ = await _time(session, cursor, 0, args.limit, args.repeat)
+                print(f"{depth:>12} {offset_s * 1000:>10.2f} {cursor_s * 1000:>10.2f}")
+                depth *= 4
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (best is kept)")
+    parser.add_argument("--database-url", default="sqlite+aiosqlite://")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,118 @@
+"""
+INT8 quantized versus FP32 Whisper on CPU: speed (RTF) and accuracy (WER).
+
+Transcribes a directory of clips with both variants of one model and
+reports the real-time factor (processing time / audio duration, lower is
+faster) and the word error rate against reference transcripts.
+
+    python -m benchmarks.quantization CLIPS_DIR [--model base] [--threads 4]
+
+CLIPS_DIR holds audio files (anything ffmpeg reads) each with a reference
+transcript next to it: `visit01.webm` + `visit01.txt`. Subdirectories
+named after a language code (`hi/`, `en/`) are scored separately and
+passed to Whisper as that language; files directly in CLIPS_DIR use
+--language. Fixtures are not shipped with the repo - record a few field
+clips in each language. openai-whisper downloads the weights on first use.
+"""
+import argparse
+import os
+import time
+from typing import Dict, List, Tuple
+
+from app.apps.voice.audio import SAMPLE_RATE, decode_audio
+
+Clip = Tuple[str, object, str]  # name, samples, reference text
+
+
+def load_clips(directory: str) -> List[Clip]:
+    clips = []
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        reference = os.path.join(directory, f"{stem}.txt")
+        if ext.lower() == ".txt" or not os.path.isfile(reference):
+            continue
+        with open(os.path.join(directory, name), "rb") as f:
+            samples = decode_audio(f.read(), ext.lower())
+        with open(reference, encoding="utf-8") as f:
+            clips.append((name, samples, f.read()))
+    return clips
+
+
+def word_errors(reference: List[str], hypothesis: List[str]) -> int:
+    """Word-level edit distance (substitutions + deletions + insertions)"""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word),
+            ))
+        previous = current
+    return previous[-1]
+
+
+def evaluate(model, clips: List[Clip], language: str, normalize) -> Dict[str, float]:
+    audio_seconds = 0.0
+    busy_seconds = 0.0
+    errors = 0
+    words = 0
+    for _, samples, reference in clips:
+        started = time.perf_counter()
+        result = model.transcribe(samples, fp16=False, language=language)
+        busy_seconds += time.perf_counter() - started
+        audio_seconds += len(samples) / SAMPLE_RATE
+        ref_words = normalize(reference).split()
+        errors += word_errors(ref_words, normalize(result["text"]).split())
+        words += len(ref_words)
+    return {
+        "rtf": busy_seconds / audio_seconds if audio_seconds else 0.0,
+        "wer": errors / words if words else 0.0,
+    }
+
+
+def main(args) -> None:
+    import torch
+    import whisper
+    from whisper.normalizers import BasicTextNormalizer
+
+    from app.apps.voice.quantization import load_quantized
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    clips: Dict[str, List[Clip]] = {args.language: load_clips(args.clips)}
+    for entry in sorted(os.listdir(args.clips)):
+        path = os.path.join(args.clips, entry)
+        if os.path.isdir(path):
+            clips.setdefault(entry, []).extend(load_clips(path))
+    clips = {language: found for language, found in clips.items() if found}
+    if not clips:
+        raise SystemExit(f"No clips with reference transcripts in {args.clips}")
+
+    variants = {
+        "fp32": lambda: whisper.load_model(args.model, device="cpu"),
+        "int8": lambda: load_quantized(args.model, args.cache_dir),
+    }
+    normalize = BasicTextNormalizer()
+    print(f"{args.model} on CPU ({torch.get_num_threads()} threads)")
+    print(f"  {'variant':<8}{'language':<10}{'clips':>6}{'RTF':>8}{'WER':>8}")
+    for variant, load in variants.items():
+        model = load()
+        model.transcribe(clips[next(iter(clips))][0][1][:SAMPLE_RATE], fp16=False)  # warm up
+        for language, found in clips.items():
+            scores = evaluate(model, found, language, normalize)
+            print(f"  {variant:<8}{language:<10}{len(found):>6}"
+                  f"{scores['rtf']:>8.3f}{scores['wer'] * 100:>7.1f}%")
+        del model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("clips", help="directory of clips and .txt reference transcripts")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--language", default="hi", help="language of clips directly in the directory")
+    parser.add_argument("--threads", type=int, default=0, help="torch threads, 0 = torch default")
+    parser.add_argument("--cache-dir", help="quantized model cache (default: whisper's download root)")
+    main(parser.parse_args())
@@ -0,0 +1,62 @@
+"""
+Shared test helpers.
+
+Tests run without Postgres: database-backed tests use an in-memory SQLite
+database (aiosqlite) holding only the tables they need.
+"""
+import asyncio
+import contextlib
+from typing import List
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+
+# Importing the app registers every model, so mappers can be configured
+import app.main  # noqa: F401
+from app.core.database import Base
+
+
+@compiles(UUID, "sqlite")
+def _uuid_as_char(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+def run(coro):
+    """Run a coroutine to completion (the suite doesn't need pytest-asyncio)"""
+    return asyncio.run(coro)
+
+
+@contextlib.asynccontextmanager
+async def sqlite_session(*models):
+    """An AsyncSession on a fresh in-memory database with the models' tables"""
+    pytest.importorskip("aiosqlite")
+    engine = create_async_engine("sqlite+aiosqlite://")
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(
+                Base.metadata.create_all,
+                tables=[model.__table__ for model in models]
+            )
+        async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+            yield session
+    finally:
+        await engine.dispose()
+
+
+@contextlib.contextmanager
+def recorded_statements(session: AsyncSession):
+    """Collect the SQL statements a session sends while the block runs"""
+    statements: List[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,98 @@
+"""Identical concurrent prompts share one upstream Gemini request"""
+import asyncio
+import json
+
+import httpx
+
+from app.apps.ai import service as ai_service
+from app.apps.ai.service import GeminiService
+
+from tests.conftest import run
+
+
+class GeminiStandIn:
+    """Local stand-in for the Gemini HTTP endpoint that counts calls"""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.calls = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        prompt = json.loads(request.content)["text"]
+        self.calls.append(prompt)
+        await asyncio.sleep(self.delay)
+        return httpx.Response(200, json={"response": f"answer to {prompt}"})
+
+
+def _service(upstream: GeminiStandIn) -> GeminiService:
+    service = GeminiService()
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(upstream))
+    return service
+
+
+def test_concurrent_identical_prompts_make_one_upstream_call():
+    upstream = GeminiStandIn()
+    coalesced_before = ai_service.coalesced_requests.value
+
+    async def scenario():
+        service = _service(upstream)
+        try:
+            results = await asyncio.gather(*(service.generate("khoon aa raha hai") for _ in range(50)))
+        finally:
+            await service.aclose()
+        return service, results
+
+    service, results = run(scenario())
+    assert upstream.calls == ["khoon aa raha hai"]
+    assert {r.response for r in results} == {"answer to khoon aa raha hai"}
+    assert all(r.success for r in results)
+    assert ai_service.coalesced_requests.value - coalesced_before == 49
+    assert service.pool_stats()["distinct_pending_prompts"] == 0
+
+
+def test_distinct_prompts_are_not_coalesced():
+    upstream = GeminiStandIn()
+
+    async def scenario():
+        service = _service(upstream)
+        try:
+            await asyncio.gather(*(service.generate(f"prompt {i % 3}") for i in range(30)))
+        finally:
+            await service.aclose()
+
+    run(scenario())
+    assert sorted(upstream.calls) == ["prompt 0", "prompt 1", "prompt 2"]
+
+
+def test_later_identical_prompt_makes_a_new_call():
+    upstream = GeminiStandIn(delay=0)
+
+    async def scenario():
+        service = _service(upstream)
+        try:
+            await service.generate("same")
+            await service.generate("same")
+        finally:
+            await service.aclose()
+
+    run(scenario())
+    assert upstream.calls == ["same", "same"]
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_request():
+    upstream = GeminiStandIn(delay=0.1)
+
+    async def scenario():
+        service = _service(upstream)
+        try:
+            leaver = asyncio.ensure_future(service.generate("shared"))
+            stayer = asyncio.ensure_future(service.generate("shared"))
+            await asyncio.sleep(0.02)
+            leaver.cancel()
+            return await stayer
+        finally:
+            await service.aclose()
+
+    result = run(scenario())
+    assert result.response == "answer to shared"
+    assert upstream.calls == ["shared"]
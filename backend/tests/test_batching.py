@@ -0,0 +1,48 @@
+"""Batched Whisper decoding keeps model.transcribe's temperature fallback"""
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.apps.voice import batching
+
+whisper = pytest.importorskip("whisper")
+
+
+def _result(compression_ratio=1.5, avg_logprob=-0.3, no_speech_prob=0.1):
+    return SimpleNamespace(
+        compression_ratio=compression_ratio,
+        avg_logprob=avg_logprob,
+        no_speech_prob=no_speech_prob,
+    )
+
+
+def test_only_clips_that_need_it_are_decoded_again(monkeypatch):
+    # Clip 0 is fine, clip 1 loops until 0.4, clip 2 is silence, clip 3 never recovers
+    outcomes = {
+        0: lambda t: _result(),
+        1: lambda t: _result(compression_ratio=3.0 if t < 0.4 else 1.2),
+        2: lambda t: _result(avg_logprob=-2.0, no_speech_prob=0.9),
+        3: lambda t: _result(avg_logprob=-1.5),
+    }
+    calls = []
+
+    def fake_decode(model, mel, options):
+        calls.append((list(mel), options.temperature, options.beam_size))
+        return [outcomes[int(clip)](options.temperature) for clip in mel]
+
+    monkeypatch.setattr(whisper, "decode", fake_decode)
+    decoded = batching._decode_with_fallback(None, np.arange(4), {"fp16": False, "beam_size": 5})
+
+    assert [(clips, t) for clips, t, _ in calls] == [
+        ([0, 1, 2, 3], 0.0),
+        ([1, 3], 0.2),
+        ([1, 3], 0.4),
+        ([3], 0.6),
+        ([3], 0.8),
+        ([3], 1.0),
+    ]
+    # Sampling replaces beam search above temperature 0
+    assert [beam for _, _, beam in calls] == [5, None, None, None, None, None]
+    assert decoded[1].compression_ratio == 1.2
+    assert decoded[3].avg_logprob == -1.5
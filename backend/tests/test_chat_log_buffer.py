@@ -0,0 +1,107 @@
+"""Bulk chat-log writes drop only the rows the database rejects"""
+import uuid
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.compiler import compiles
+
+from app.apps.users.models import User
+from app.apps.voice import log_buffer
+from app.apps.voice.log_buffer import ChatLogBuffer
+from app.apps.voice.models import ChatLog
+
+from tests.conftest import run, sqlite_session
+
+
+@compiles(TSVECTOR, "sqlite")
+def _tsvector_as_text(type_, compiler, **kw):
+    return "TEXT"
+
+
+def _row(user_id, message="khoon aa raha hai"):
+    return {"user_id": user_id, "user_message": message, "ai_response": "ASHA didi ko bulao"}
+
+
+def test_bad_rows_are_dropped_without_blocking_the_rest(monkeypatch):
+    async def scenario():
+        async with sqlite_session(User, ChatLog) as session:
+            await session.execute(text("PRAGMA foreign_keys=ON"))
+            user = User(email="ben@example.com", password_hash="x", role="beneficiary")
+            session.add(user)
+            await session.commit()
+            monkeypatch.setattr(log_buffer, "async_session_maker", async_sessionmaker(session.bind))
+            rejected_before = log_buffer.rejected_rows.value
+
+            buffer = ChatLogBuffer(max_rows=100, flush_seconds=1, limit=1000)
+            deleted_user = uuid.uuid4()  # FK violation
+            for i in range(10):
+                buffer.add(_row(deleted_user if i in (3, 7) else user.id, f"message {i}"))
+
+            written = await buffer.flush()
+            stored = (await session.execute(
+                select(ChatLog.user_message).order_by(ChatLog.user_message)
+            )).scalars().all()
+            return written, stored, len(buffer), log_buffer.rejected_rows.value - rejected_before
+
+    written, stored, queued, rejected = run(scenario())
+    assert written == 8
+    assert stored == [f"message {i}" for i in range(10) if i not in (3, 7)]
+    assert queued == 0
+    assert rejected == 2
+
+
+def test_rows_are_requeued_in_order_when_the_database_is_down(monkeypatch):
+    async def failing_insert(rows):
+        raise ConnectionRefusedError("database unavailable")
+
+    dropped_before = log_buffer.dropped_rows.value
+    buffer = ChatLogBuffer(max_rows=100, flush_seconds=1, limit=5)
+    monkeypatch.setattr(buffer, "_insert", failing_insert)
+    for i in range(5):
+        buffer.add(_row(None, f"message {i}"))
+
+    assert run(buffer.flush()) == 0
+    assert [row["user_message"] for row in buffer._rows] == [f"message {i}" for i in range(5)]
+    # Overflow while requeueing is counted like any other drop
+    buffer._rows.append(_row(None, "late"))
+    run(buffer.flush())
+    assert len(buffer) == 5
+    assert log_buffer.dropped_rows.value - dropped_before == 1
+
+
+def test_rows_the_server_refuses_with_a_plain_dbapi_error_are_dropped(monkeypatch):
+    # What asyncpg raises for e.g. a NUL byte in a text column
+    inserted = []
+
+    async def picky_insert(rows):
+        if any("\u0000" in row["user_message"] for row in rows):
+            raise DBAPIError("INSERT", None, Exception("invalid byte sequence for encoding UTF8: 0x00"))
+        inserted.extend(row["user_message"] for row in rows)
+
+    rejected_before = log_buffer.rejected_rows.value
+    buffer = ChatLogBuffer(max_rows=100, flush_seconds=1, limit=1000)
+    monkeypatch.setattr(buffer, "_insert", picky_insert)
+    for i in range(6):
+        buffer.add(_row(None, "bad\u0000" if i == 4 else f"message {i}"))
+
+    assert run(buffer.flush()) == 5
+    assert inserted == [f"message {i}" for i in range(6) if i != 4]
+    assert len(buffer) == 0
+    assert log_buffer.rejected_rows.value - rejected_before == 1
+
+
+def test_connection_errors_from_the_driver_are_retried(monkeypatch):
+    async def failing_insert(rows):
+        raise OperationalError("INSERT", None, ConnectionResetError("connection lost"))
+
+    rejected_before = log_buffer.rejected_rows.value
+    buffer = ChatLogBuffer(max_rows=100, flush_seconds=1, limit=1000)
+    monkeypatch.setattr(buffer, "_insert", failing_insert)
+    for i in range(3):
+        buffer.add(_row(None, f"message {i}"))
+
+    assert run(buffer.flush()) == 0
+    assert len(buffer) == 3
+    assert log_buffer.rejected_rows.value == rejected_before
@@ -0,0 +1,161 @@
+"""Chat history search: tokens, phonetic keys, ranking and access rules"""
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.apps.beneficiaries.models import BeneficiaryProfile
+from app.apps.users.models import User
+from app.apps.voice import search
+from app.apps.voice.router import search_chat_history
+from app.apps.voice.search import (
+    InvertedIndex, parse_query, phonetic_key, search_vector, tokenize, transliterate
+)
+
+from tests.conftest import run, sqlite_session
+
+
+def test_tokenize_keeps_devanagari_words_whole():
+    assert tokenize("मुझे  खून आ रहा है, Doctor!") == ["मुझे", "खून", "आ", "रहा", "है", "doctor"]
+    # Zero-width joiners and decomposed forms don't split or change a word
+    assert tokenize("ख\u200cून") == tokenize("खून")
+
+
+@pytest.mark.parametrize("spellings", [
+    ("खून", "khoon", "khun"),
+    ("बुखार", "bukhar", "bukhaar"),
+    ("दर्द", "dard"),
+])
+def test_spellings_of_one_word_share_a_phonetic_key(spellings):
+    keys = {
+        phonetic_key(transliterate(word) if not word.isascii() else word)
+        for word in spellings
+    }
+    assert len(keys) == 1
+
+
+def test_different_words_keep_different_keys():
+    assert phonetic_key("khoon") != phonetic_key("kaan")
+
+
+def test_search_vector_stays_within_postgres_limits():
+    # Postgres refuses lexemes of 2048+ bytes and vectors of 1MB+
+    long_word = "a" * 3000
+    vector = search_vector(f"{long_word} khoon", "ok")
+    assert long_word not in vector
+    assert "'khoon'" in vector
+    assert parse_query(long_word) == []
+
+    huge = " ".join(f"w{i}x{'y' * 40}" for i in range(40000))
+    assert len(search_vector(huge, "").encode("utf-8")) < 1024 * 1024
+
+
+def _row(message, response="", **fields):
+    row = {
+        "id": uuid.uuid4(),
+        "user_id": None,
+        "beneficiary_id": None,
+        "user_message": message,
+        "ai_response": response,
+        "language_used": "hi",
+        "is_emergency": False,
+        "intent": None,
+        "category": None,
+        "created_at": datetime(2026, 10, 1),
+    }
+    row.update(fields)
+    return row
+
+
+def test_inverted_index_ranks_user_message_matches_first():
+    index = InvertedIndex()
+    in_reply = _row("mujhe chakkar aa raha hai", "khoon ki kami ho sakti hai")
+    in_message = _row("खून आ रहा है", "turant ASHA didi ko bulao")
+    unrelated = _row("khana kab khana hai", "din me teen baar")
+    for row in (in_reply, in_message, unrelated):
+        index.add(row)
+
+    hits = index.search(parse_query("khoon"))
+    assert [row["id"] for row, _ in hits] == [in_message["id"], in_reply["id"]]
+    # Every query word has to match
+    assert index.search(parse_query("khoon chakkar"))[0][0]["id"] == in_reply["id"]
+    assert index.search(parse_query("khoon baar")) == []
+
+
+@pytest.fixture
+def memory_search(monkeypatch):
+    index = InvertedIndex()
+    monkeypatch.setattr(search.settings, "CHAT_SEARCH_BACKEND", "memory")
+    monkeypatch.setattr(search, "memory_index", index)
+    return index
+
+
+def _search(user, **params):
+    params = {"limit": 20, "beneficiary_id": None, "emergency_only": False, "since": None, **params}
+    hits = run(search_chat_history(q="khoon", current_user=user, db=None, **params))
+    return {hit["user_message"] for hit in hits}
+
+
+def test_search_access_follows_history(memory_search):
+    asha = SimpleNamespace(id=uuid.uuid4(), role="asha_worker")
+    other_asha = SimpleNamespace(id=uuid.uuid4(), role="asha_worker")
+    beneficiary = SimpleNamespace(id=uuid.uuid4(), role="beneficiary")
+    admin = SimpleNamespace(id=uuid.uuid4(), role="admin")
+    now = datetime.utcnow()
+    for row in (
+        _row("khoon 1", user_id=asha.id, beneficiary_id="b-1", created_at=now),
+        _row("khoon 2", user_id=other_asha.id, beneficiary_id="b-1", is_emergency=True),
+        _row("khoon 3", user_id=other_asha.id, beneficiary_id=str(beneficiary.id),
+             created_at=now - timedelta(days=30)),
+    ):
+        memory_search.add(row)
+
+    # ASHA workers search what they logged (beneficiary filters: see below)
+    assert _search(asha) == {"khoon 1"}
+    # Beneficiaries only ever see their own, whatever they ask for
+    assert _search(beneficiary) == {"khoon 3"}
+    assert _search(beneficiary, beneficiary_id="b-1") == {"khoon 3"}
+    # Supervisors search everything, with the optional filters
+    assert _search(admin) == {"khoon 1", "khoon 2", "khoon 3"}
+    assert _search(admin, emergency_only=True) == {"khoon 2"}
+    assert _search(admin, since=now - timedelta(days=1)) == {"khoon 1"}
+
+
+def test_asha_workers_only_search_linked_beneficiaries(memory_search):
+    async def scenario():
+        async with sqlite_session(User, BeneficiaryProfile) as db:
+            asha = User(email="asha@example.com", password_hash="x", role="asha_worker")
+            other_asha = User(email="asha2@example.com", password_hash="x", role="asha_worker")
+            mother = User(email="ben@example.com", password_hash="x", role="beneficiary")
+            db.add_all([asha, other_asha, mother])
+            await db.flush()
+            profile = BeneficiaryProfile(user_id=mother.id, name="Sita", linked_asha_id=asha.id)
+            db.add(profile)
+            await db.commit()
+            for beneficiary_id in (str(mother.id), str(profile.id)):
+                memory_search.add(_row(f"khoon {beneficiary_id}", beneficiary_id=beneficiary_id))
+
+            results = {}
+            for name, user, beneficiary_id in (
+                ("by user id", asha, str(mother.id)),
+                ("by profile id", asha, str(profile.id)),
+                ("not linked", other_asha, str(mother.id)),
+                ("not an id", asha, "b-1"),
+            ):
+                try:
+                    results[name] = await search_chat_history(
+                        q="khoon", limit=20, beneficiary_id=beneficiary_id, emergency_only=False,
+                        since=None, current_user=user, db=db
+                    )
+                except HTTPException as e:
+                    results[name] = e.status_code
+            return results, mother.id, profile.id
+
+    results, mother_id, profile_id = run(scenario())
+    assert [hit["user_message"] for hit in results["by user id"]] == [f"khoon {mother_id}"]
+    assert [hit["user_message"] for hit in results["by profile id"]] == [f"khoon {profile_id}"]
+    # An ASHA worker can't read another worker's beneficiaries, or arbitrary ids
+    assert results["not linked"] == 403
+    assert results["not an id"] == 403
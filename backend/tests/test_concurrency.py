@@ -0,0 +1,46 @@
+"""BoundedExecutor keeps its bound when callers give up waiting"""
+import asyncio
+import threading
+
+import pytest
+
+from app.core.concurrency import BoundedExecutor, ExecutorSaturated
+
+from tests.conftest import run
+
+
+def test_cancelled_callers_keep_their_slots_until_the_job_ends():
+    release = threading.Event()
+    executor = BoundedExecutor("test_pool", max_workers=1, max_queue=1)
+
+    async def scenario():
+        running = asyncio.create_task(executor.run(release.wait))
+        queued = asyncio.create_task(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        running.cancel()
+        await asyncio.gather(running, return_exceptions=True)
+
+        # The running job can't be stopped, so it still counts against the bound
+        assert executor.pending == 2
+        assert executor.saturated
+        with pytest.raises(ExecutorSaturated):
+            await executor.run(release.wait)
+
+        # A job cancelled before it starts frees its slot straight away
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert executor.pending == 1
+
+        release.set()
+        for _ in range(100):
+            if executor.pending == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert executor.pending == 0
+
+    try:
+        run(scenario())
+    finally:
+        release.set()
+        executor.shutdown()
@@ -0,0 +1,86 @@
+"""The keyword matcher gives the same answers as the per-keyword substring scan"""
+import random
+
+import pytest
+
+from app.apps.ai.keywords import KeywordMatcher
+from app.apps.ai.service import (
+    EMERGENCY_KEYWORDS,
+    INTENT_KEYWORDS,
+    detect_emergency,
+    detect_intent,
+    scan_message,
+)
+
+
+def substring_emergency(message: str) -> bool:
+    """detect_emergency before the keyword matcher"""
+    lower_message = message.lower()
+    return any(keyword.lower() in lower_message for keyword in EMERGENCY_KEYWORDS)
+
+
+def substring_intent(message: str) -> str:
+    """detect_intent before the keyword matcher"""
+    lower_message = message.lower()
+    for intent, words in INTENT_KEYWORDS:
+        if any(word in lower_message for word in words):
+            return intent
+    return 'general_query'
+
+
+ALL_KEYWORDS = EMERGENCY_KEYWORDS + [word for _, words in INTENT_KEYWORDS for word in words]
+FILLER = list("abcdefghijklmnopqrstuvwxyz     ") + list("कखगचजटडतदनपबमयरलवसहािीुूेैोौंँ़् ")
+
+
+def _random_message(rng: random.Random) -> str:
+    parts = []
+    for _ in range(rng.randint(0, 8)):
+        choice = rng.random()
+        if choice < 0.3:
+            keyword = rng.choice(ALL_KEYWORDS)
+            # Whole keywords, fragments and case changes
+            if rng.random() < 0.3:
+                start = rng.randrange(len(keyword))
+                keyword = keyword[start:start + rng.randint(1, len(keyword))]
+            parts.append(keyword.upper() if rng.random() < 0.2 else keyword)
+        else:
+            parts.append("".join(rng.choice(FILLER) for _ in range(rng.randint(1, 12))))
+    return rng.choice(["", " ", "-"]).join(parts)
+
+
+def test_every_keyword_alone():
+    for keyword in ALL_KEYWORDS:
+        for message in (keyword, keyword.upper(), f"xx {keyword} yy", keyword[:-1]):
+            assert detect_emergency(message) == substring_emergency(message), message
+            assert detect_intent(message) == substring_intent(message), message
+
+
+def test_parity_on_random_messages():
+    rng = random.Random(20261016)
+    for _ in range(20000):
+        message = _random_message(rng)
+        assert detect_emergency(message) == substring_emergency(message), message
+        assert detect_intent(message) == substring_intent(message), message
+
+
+def test_scan_returns_every_matched_intent_in_priority_order():
+    scan = scan_message("Pregnant hoon, khana aur IFA goli kab leni hai? खून भी आ रहा है")
+    assert scan.is_emergency
+    assert scan.intents == ('pregnancy_query', 'nutrition_query', 'ifa_query')
+
+
+@pytest.mark.parametrize("patterns,text,expected", [
+    ([("he", "a"), ("she", "b"), ("his", "c"), ("hers", "d")], "ushers", {"a", "b", "d"}),
+    ([("abcd", "x"), ("bc", "y")], "abcx", {"y"}),
+    ([("aa", "x")], "a", set()),
+    ([("", "x"), ("दर्द", "pain")], "बहुत दर्द है", {"pain"}),
+])
+def test_matcher_finds_overlapping_keywords(patterns, text, expected):
+    assert set(KeywordMatcher(patterns).labels(text)) == expected
+
+
+def test_first_returns_the_earliest_label_in_pattern_order():
+    matcher = KeywordMatcher([("goli", "ifa"), ("khana", "nutrition"), ("tablet", "ifa")])
+    assert matcher.first("khana ke baad tablet") == "ifa"
+    assert matcher.first("khana kab") == "nutrition"
+    assert matcher.first("kuch nahi") is None
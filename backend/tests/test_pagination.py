@@ -0,0 +1,80 @@
+"""Cursor pagination walks every row exactly once, NULL sort keys included"""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select, update
+
+from app.apps.alerts.models import Alert
+from app.apps.alerts.router import ALERT_SORT_KEYS
+from app.core.pagination import decode_cursor, encode_cursor, next_cursor, paginate
+
+from tests.conftest import run, sqlite_session
+
+
+async def _seed(session, timestamps):
+    beneficiary_id = uuid.uuid4()
+    session.add_all([
+        Alert(
+            beneficiary_id=beneficiary_id, type="sos", severity="high",
+            created_at=created_at, reason=None if created_at else "legacy"
+        )
+        for created_at in timestamps
+    ])
+    await session.flush()
+    # The model default would fill in created_at, so blank it out afterwards
+    await session.execute(update(Alert).where(Alert.reason == "legacy").values(created_at=None))
+    await session.commit()
+
+
+async def _walk(session, limit):
+    """Ids of every page fetched by cursor, in order"""
+    seen, cursor = [], None
+    while True:
+        rows = (await session.execute(
+            paginate(select(Alert), ALERT_SORT_KEYS, cursor, 0, limit)
+        )).scalars().all()
+        seen.extend(row.id for row in rows)
+        cursor = next_cursor(rows, ALERT_SORT_KEYS, limit)
+        if cursor is None:
+            return seen
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 7, 50])
+def test_cursor_pages_match_offset_order_with_null_sort_keys(limit, monkeypatch):
+    # The model says NOT NULL, but migration 001 created the column nullable
+    monkeypatch.setattr(Alert.__table__.c.created_at, "nullable", True)
+    start = datetime(2026, 1, 1)
+    # Duplicate timestamps and NULLs (rows from before created_at had a default)
+    timestamps = [start + timedelta(hours=i // 2) for i in range(12)] + [None] * 5
+
+    async def scenario():
+        async with sqlite_session(Alert) as session:
+            await _seed(session, timestamps)
+            expected = (await session.execute(
+                paginate(select(Alert.id), ALERT_SORT_KEYS, None, 0, 100)
+            )).scalars().all()
+            walked = await _walk(session, limit)
+            assert walked == expected
+            assert len(set(walked)) == len(timestamps)
+
+            # Newest first, NULLs last
+            rows = (await session.execute(
+                paginate(select(Alert), ALERT_SORT_KEYS, None, 0, 100)
+            )).scalars().all()
+            assert rows[0].created_at == start + timedelta(hours=5)
+            assert all(row.created_at is None for row in rows[-5:])
+
+    run(scenario())
+
+
+def test_cursor_round_trip():
+    values = [datetime(2026, 3, 1, 12, 30), None, uuid.uuid4()]
+    assert decode_cursor(encode_cursor(values), 3) == values
+
+
+def test_malformed_cursor_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        decode_cursor("not-a-cursor", 2)
+    assert error.value.status_code == 400
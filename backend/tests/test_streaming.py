@@ -0,0 +1,90 @@
+"""Sliding-window transcription for /voice/stream"""
+import asyncio
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+from app.apps.voice.audio import SAMPLE_RATE
+from app.apps.voice.streaming import PCM16, StreamingTranscriber, StreamTooLong
+
+from tests.conftest import run
+
+
+class FakeWhisper:
+    """Returns one segment per second of audio and records window lengths"""
+
+    def __init__(self):
+        self.windows = []
+
+    async def __call__(self, samples):
+        self.windows.append(len(samples))
+        seconds = len(samples) // SAMPLE_RATE
+        segments = [
+            {"text": f"s{i}", "start": float(i), "end": float(i + 1)}
+            for i in range(seconds)
+        ]
+        return {"text": " ".join(s["text"] for s in segments), "segments": segments, "language": "hi"}
+
+
+def _pcm16(seconds: float) -> bytes:
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype="<i2").tobytes()
+
+
+def test_window_slides_and_only_new_audio_triggers_a_pass():
+    whisper = FakeWhisper()
+    session = StreamingTranscriber(whisper, input_format=PCM16, step_seconds=2, window_seconds=4)
+
+    async def scenario():
+        events = []
+        for _ in range(16):  # 8 seconds in half-second chunks, one odd byte split off
+            chunk = _pcm16(0.5)
+            await session.add_chunk(chunk[:101])
+            await session.add_chunk(chunk[101:])
+            events += await session.step()
+        events += await session.finish()
+        return events
+
+    events = run(scenario())
+    # A pass every 2 seconds; the window never grows past window + step
+    assert len(whisper.windows) == 5
+    assert max(whisper.windows) <= 6 * SAMPLE_RATE
+    done = events[-1]
+    assert done["type"] == "done"
+    assert done["duration"] == 8.0
+    finals = [e for e in events if e["type"] == "final"]
+    assert finals and finals[0]["start"] == 0.0
+    assert " ".join(e["text"] for e in finals) == done["transcript"]
+
+
+def test_stream_past_the_duration_limit_is_rejected():
+    session = StreamingTranscriber(FakeWhisper(), input_format=PCM16, max_seconds=1)
+    with pytest.raises(StreamTooLong):
+        run(session.add_chunk(_pcm16(1.5)))
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_container_stream_is_decoded_incrementally():
+    webm = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-f", "lavfi",
+         "-i", "sine=frequency=440:duration=6", "-c:a", "libopus", "-f", "webm", "pipe:1"],
+        capture_output=True, check=True
+    ).stdout
+    whisper = FakeWhisper()
+    session = StreamingTranscriber(whisper, input_format="webm", step_seconds=2)
+
+    async def scenario():
+        try:
+            for start in range(0, len(webm), 2000):
+                await session.add_chunk(webm[start:start + 2000])
+                await asyncio.sleep(0.01)  # let ffmpeg's output be read
+                await session.step()
+            return await session.finish()
+        finally:
+            session.close()
+
+    events = run(scenario())
+    # Partials ran while the stream was still arriving
+    assert len(whisper.windows) > 1
+    assert events[-1]["duration"] == pytest.approx(6.0, abs=0.05)
@@ -0,0 +1,53 @@
+"""Oversized uploads are rejected while they arrive, not after spooling"""
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app.core.limits import BodySizeLimitMiddleware
+
+LIMIT = 1024
+
+
+def _client(received):
+    app = FastAPI()
+    app.add_middleware(BodySizeLimitMiddleware, paths=("/upload",), max_bytes=LIMIT)
+
+    @app.post("/upload")
+    async def upload(audio: UploadFile = File(...)):
+        received.append(len(await audio.read()))
+        return {"ok": True}
+
+    @app.post("/other")
+    async def other(audio: UploadFile = File(...)):
+        received.append(len(await audio.read()))
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def test_declared_size_over_the_limit_is_rejected_before_the_body_is_read():
+    received = []
+    response = _client(received).post("/upload", files={"audio": ("a.webm", b"x" * 4 * LIMIT)})
+    assert response.status_code == 413
+    assert received == []
+
+
+def test_chunked_body_is_cut_off_at_the_limit():
+    received = []
+    def body():
+        for _ in range(64):
+            yield b"x" * 256
+
+    response = _client(received).post(
+        "/upload", content=body(),
+        headers={"Content-Type": "multipart/form-data; boundary=b"}
+    )
+    assert response.status_code == 413
+    assert received == []
+
+
+def test_small_uploads_and_other_paths_pass():
+    received = []
+    client = _client(received)
+    assert client.post("/upload", files={"audio": ("a.webm", b"x" * 100)}).status_code == 200
+    assert client.post("/other", files={"audio": ("a.webm", b"x" * 4 * LIMIT)}).status_code == 200
+    assert received == [100, 4 * LIMIT]
@@ -0,0 +1,40 @@
+"""Silence trimming and chunking before Whisper"""
+import numpy as np
+
+from app.apps.voice.audio import SAMPLE_RATE
+from app.apps.voice.vad import speech_chunks
+
+
+def _speech(seconds: float, seed: int = 3) -> np.ndarray:
+    """Noise at speech level with a syllable-rate envelope"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)
+    return (0.2 * envelope * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def test_long_speech_is_cut_at_a_short_pause_near_the_limit():
+    audio = _speech(45)
+    # A 200 ms breath: too short to end the region, the natural place to cut
+    breath = slice(int(27.0 * SAMPLE_RATE), int(27.2 * SAMPLE_RATE))
+    audio[breath] *= 0.001
+
+    chunks = speech_chunks(audio)
+
+    assert len(chunks) == 2
+    first, first_map = chunks[0]
+    assert len(first) <= 30 * SAMPLE_RATE
+    cut = first_map.regions[-1].end
+    assert breath.start <= cut <= breath.stop
+    # Nothing is lost or duplicated at the cut
+    assert sum(len(chunk) for chunk, _ in chunks) == len(audio)
+
+
+def test_silence_only_gives_no_chunks():
+    assert speech_chunks(np.zeros(5 * SAMPLE_RATE, dtype=np.float32)) == []
+
+
+def test_very_long_speech_fits_every_chunk_in_one_window():
+    chunks = speech_chunks(_speech(95))
+    assert all(len(chunk) <= 30 * SAMPLE_RATE for chunk, _ in chunks)
+    assert sum(len(chunk) for chunk, _ in chunks) == 95 * SAMPLE_RATE
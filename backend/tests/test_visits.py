@@ -0,0 +1,90 @@
+"""Visit listing issues a fixed number of SQL statements per request"""
+from datetime import date, timedelta
+
+import pytest
+
+from app.apps.beneficiaries.models import BeneficiaryProfile
+from app.apps.users.models import User
+from app.apps.visits.models import Visit, VisitStatus
+from app.apps.visits.router import get_overdue_visits, get_today_visits, list_visits
+
+from tests.conftest import recorded_statements, run, sqlite_session
+
+
+async def _seed(session, visits: int) -> User:
+    """An ASHA worker with `visits` visits, one due today and the rest overdue"""
+    asha = User(email="asha@example.com", password_hash="x", full_name="Sunita", role="asha_worker")
+    owner = User(email="ben@example.com", password_hash="x", role="beneficiary")
+    session.add_all([asha, owner])
+    await session.flush()
+    profile = BeneficiaryProfile(user_id=owner.id, name="Meena", address="Ward 4")
+    session.add(profile)
+    await session.flush()
+    today = date.today()
+    session.add_all([
+        Visit(
+            beneficiary_id=profile.id,
+            asha_worker_id=asha.id,
+            scheduled_date=today - timedelta(days=i),
+            status=VisitStatus.SCHEDULED
+        )
+        for i in range(visits)
+    ])
+    await session.commit()
+    return asha
+
+
+async def _list(session, asha: User, limit: int = 100):
+    return await list_visits(
+        status=None, beneficiary_id=None, from_date=None, to_date=None,
+        skip=0, limit=limit, cursor=None, current_user=asha, db=session
+    )
+
+
+@pytest.mark.parametrize("visits", [1, 5, 40])
+def test_list_visits_is_one_statement_regardless_of_page_size(visits):
+    async def scenario():
+        async with sqlite_session(User, BeneficiaryProfile, Visit) as session:
+            asha = await _seed(session, visits)
+            with recorded_statements(session) as statements:
+                response = await _list(session, asha)
+            assert len(statements) == 1
+            assert response.total == visits
+            assert response.today_count == 1
+            assert response.overdue_count == visits - 1
+            assert {v.beneficiary_name for v in response.visits} == {"Meena"}
+            assert {v.asha_worker_name for v in response.visits} == {"Sunita"}
+
+    run(scenario())
+
+
+def test_cursor_page_adds_only_the_count_query():
+    async def scenario():
+        async with sqlite_session(User, BeneficiaryProfile, Visit) as session:
+            asha = await _seed(session, 10)
+            first = await _list(session, asha, limit=4)
+            with recorded_statements(session) as statements:
+                second = await list_visits(
+                    status=None, beneficiary_id=None, from_date=None, to_date=None,
+                    skip=0, limit=4, cursor=first.next_cursor, current_user=asha, db=session
+                )
+            assert len(statements) == 2
+            assert second.total == 10
+            assert not {v.id for v in first.visits} & {v.id for v in second.visits}
+
+    run(scenario())
+
+
+def test_today_and_overdue_are_one_statement_each():
+    async def scenario():
+        async with sqlite_session(User, BeneficiaryProfile, Visit) as session:
+            asha = await _seed(session, 12)
+            with recorded_statements(session) as statements:
+                today = await get_today_visits(current_user=asha, db=session)
+                overdue = await get_overdue_visits(current_user=asha, db=session)
+            assert len(statements) == 2
+            assert len(today) == 1
+            assert len(overdue) == 11
+            assert all(v.beneficiary_name == "Meena" for v in today + overdue)
+
+    run(scenario())
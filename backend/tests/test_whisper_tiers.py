@@ -0,0 +1,53 @@
+"""Load-adaptive Whisper tier selection"""
+import asyncio
+
+from app.apps.voice.service import ACCURATE, FAST, WhisperService
+
+from tests.conftest import run
+
+
+def _service(loaded):
+    service = WhisperService("base", ["tiny", "base", "small"])
+    service._models = {tier: object() for tier in loaded}
+    loads = []
+
+    def load(warm_up=False, tier=None):
+        loads.append(tier)
+        service._models[tier] = object()
+        return service._models[tier]
+
+    service.load = load
+    return service, loads
+
+
+def test_unloaded_tier_is_served_by_nearest_and_loaded_in_background():
+    service, loads = _service(["base"])
+
+    async def scenario():
+        first = service.select_tier(5.0, ACCURATE)
+        again = service.select_tier(5.0, ACCURATE)
+        await asyncio.gather(*service._background_loads.values())
+        return first, again, service.select_tier(5.0, ACCURATE)
+
+    first, again, after = run(scenario())
+    assert (first, again, after) == ("base", "base", "small")
+    assert loads == ["small"]  # one load, however many requests asked for it
+
+
+def test_failed_background_load_is_not_retried():
+    service, _ = _service(["base"])
+    attempts = []
+
+    def failing_load(warm_up=False, tier=None):
+        attempts.append(tier)
+        raise RuntimeError("out of memory")
+
+    service.load = failing_load
+
+    async def scenario():
+        for _ in range(3):
+            assert service.select_tier(5.0, FAST) == "base"
+            await asyncio.gather(*service._background_loads.values())
+
+    run(scenario())
+    assert attempts == ["tiny"]